@@ -12,10 +12,31 @@ import cv2
 import numpy as np
 import re
 import os
-from datetime import datetime
+import math
+import io
+import csv
+import json
+import tempfile
+import bisect
+import threading
+import time
+import uuid
+import itertools
+import mmap
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+from contextlib import contextmanager
+import sqlite3
+from collections import OrderedDict
+from datetime import datetime, date
 from werkzeug.utils import secure_filename
 import logging
-from flask import Flask, request, jsonify, session, redirect, url_for
+from abc import ABC, abstractmethod
+from flask import Flask, request, jsonify, session, redirect, url_for, Response, stream_with_context
+from flask import Request as FlaskRequest
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
@@ -25,11 +46,18 @@ from email.mime.text import MIMEText
 
 # PDF Support (Optional)
 try:
-    from pdf2image import convert_from_path
+    from pdf2image import convert_from_path, convert_from_bytes, pdfinfo_from_path, pdfinfo_from_bytes
     PDF_SUPPORT = True
 except ImportError:
     PDF_SUPPORT = False
 
+# In-process Tesseract binding (Optional)
+try:
+    import tesserocr
+    TESSEROCR_SUPPORT = True
+except ImportError:
+    TESSEROCR_SUPPORT = False
+
 # Initialize Flask app
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -45,737 +73,3533 @@ CORS(app, resources={
 })
 
 # File upload configuration
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+
+# Set Tesseract path
+import platform
+if platform.system() == "Windows":
+    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+elif platform.system() == "Darwin":
+    if os.path.exists('/opt/homebrew/bin/tesseract'):
+        pytesseract.pytesseract.tesseract_cmd = '/opt/homebrew/bin/tesseract'
+
+# ============================================================================
+# COLUMNAR ELIGIBILITY ENGINE
+# ============================================================================
+
+def _build_bitmask(value_lists):
+    """Pack per-scholarship value lists into an (n, words) uint64 bitmask"""
+    vocabulary = {}
+    for values in value_lists:
+        for value in values:
+            vocabulary.setdefault(value, len(vocabulary))
+    
+    words = max(1, (len(vocabulary) + 63) // 64)
+    bits = np.zeros((len(value_lists), words), dtype=np.uint64)
+    for row, values in enumerate(value_lists):
+        for value in values:
+            position = vocabulary[value]
+            bits[row, position // 64] |= np.uint64(1) << np.uint64(position % 64)
+    
+    return vocabulary, bits
+
+def _bitmask_contains(vocabulary, bits, value):
+    """Boolean array: which rows of the bitmask contain value"""
+    position = vocabulary.get(value)
+    if position is None:
+        return np.zeros(bits.shape[0], dtype=bool)
+    word = bits[:, position // 64]
+    return (word >> np.uint64(position % 64)) & np.uint64(1) == np.uint64(1)
+
+class EligibilityEngine:
+    """Columnar view of the catalog, built once when the catalog loads.
+    
+    Evaluates one student profile against every scholarship with a handful
+    of NumPy operations instead of a per-scholarship Python loop.
+    """
+    
+    # First failing check per scholarship, in the order match_scholarships applies them
+    PASS, FAIL_PERCENTAGE, FAIL_INCOME, FAIL_CATEGORY, FAIL_STATE, FAIL_STREAM = range(6)
+    
+    def __init__(self, scholarships):
+        self.scholarships = scholarships
+        self.size = len(scholarships)
+        
+        self.min_percentage = np.array([s["min_percentage"] for s in scholarships], dtype=np.float64)
+        self.max_income = np.array([s["max_income"] for s in scholarships], dtype=np.float64)
+        self.amount = np.array([s.get("amount", 0) for s in scholarships], dtype=np.int64)
+        self.position_by_id = {s["id"]: i for i, s in enumerate(scholarships)}
+        
+        self.category_vocab, self.category_bits = _build_bitmask(
+            [s["category"] for s in scholarships])
+        self.state_vocab, self.state_bits = _build_bitmask(
+            [s.get("states", ["All States"]) for s in scholarships])
+        self.stream_vocab, self.stream_bits = _build_bitmask(
+            [s.get("eligible_streams", ["All"]) for s in scholarships])
+        
+        self.all_states = _bitmask_contains(self.state_vocab, self.state_bits, "All States")
+        self.all_streams = _bitmask_contains(self.stream_vocab, self.stream_bits, "All")
+        
+        # Distinct thresholds: profiles between two neighbours match identically
+        self.percentage_thresholds = np.unique(self.min_percentage)
+        self.income_thresholds = np.unique(self.max_income)
+    
+    def profile_key(self, student_data):
+        """Canonical key: equal keys get identical eligibility against this catalog.
+        
+        Percentage and income are replaced by how many catalog thresholds they
+        clear, and unknown category/state/stream values share one sentinel.
+        """
+        percentage = student_data.get("percentage")
+        income = student_data.get("income")
+        category = student_data.get("category") or None
+        state = student_data.get("state") or None
+        stream = student_data.get("stream") or None
+        
+        return (
+            int(np.searchsorted(self.percentage_thresholds, percentage, side="right")) if percentage else None,
+            int(np.searchsorted(self.income_thresholds, income, side="left")) if income else None,
+            category if category is None or category in self.category_vocab else "?",
+            state if state is None or state in self.state_vocab else "?",
+            stream if stream is None or stream in self.stream_vocab else "?",
+        )
+    
+    def evaluate(self, percentage=None, income=None, category=None, state=None, stream=None):
+        """Return an int8 array with the first failing check for every scholarship"""
+        failures = np.full(self.size, self.PASS, dtype=np.int8)
+        
+        # Assign in reverse order so the earliest failing check wins
+        if stream:
+            in_stream = _bitmask_contains(self.stream_vocab, self.stream_bits, stream)
+            failures[~self.all_streams & ~in_stream] = self.FAIL_STREAM
+        if state:
+            in_state = _bitmask_contains(self.state_vocab, self.state_bits, state)
+            failures[~self.all_states & ~in_state] = self.FAIL_STATE
+        if category:
+            in_category = _bitmask_contains(self.category_vocab, self.category_bits, category)
+            failures[~in_category] = self.FAIL_CATEGORY
+        if income:
+            failures[income > self.max_income] = self.FAIL_INCOME
+        if percentage:
+            failures[percentage < self.min_percentage] = self.FAIL_PERCENTAGE
+        
+        return failures
+    
+    def _membership_rows(self, vocabulary, bits, values):
+        """(len(values), n) membership matrix; rows for missing values are all True"""
+        rows = {}
+        index = np.empty(len(values), dtype=np.intp)
+        for i, value in enumerate(values):
+            key = value or None
+            if key not in rows:
+                rows[key] = len(rows)
+            index[i] = rows[key]
+        
+        table = np.empty((len(rows), self.size), dtype=bool)
+        for key, row in rows.items():
+            table[row] = True if key is None else _bitmask_contains(vocabulary, bits, key)
+        return table[index]
+    
+    def evaluate_batch(self, profiles):
+        """Return an (m, n) int8 matrix of first failing checks for m profiles"""
+        failures = np.full((len(profiles), self.size), self.PASS, dtype=np.int8)
+        
+        # Missing/zero numeric fields become NaN, which never fails a comparison
+        percentages = np.array([p.get("percentage") or np.nan for p in profiles], dtype=np.float64)
+        incomes = np.array([p.get("income") or np.nan for p in profiles], dtype=np.float64)
+        
+        in_stream = self._membership_rows(self.stream_vocab, self.stream_bits, [p.get("stream") for p in profiles])
+        failures[~self.all_streams & ~in_stream] = self.FAIL_STREAM
+        in_state = self._membership_rows(self.state_vocab, self.state_bits, [p.get("state") for p in profiles])
+        failures[~self.all_states & ~in_state] = self.FAIL_STATE
+        in_category = self._membership_rows(self.category_vocab, self.category_bits, [p.get("category") for p in profiles])
+        failures[~in_category] = self.FAIL_CATEGORY
+        failures[incomes[:, None] > self.max_income] = self.FAIL_INCOME
+        failures[percentages[:, None] < self.min_percentage] = self.FAIL_PERCENTAGE
+        
+        return failures
+
+# ============================================================================
+# DEADLINE INDEX
+# ============================================================================
+
+class DeadlineIndex:
+    """Deadlines parsed once when the catalog loads, sorted for range lookups.
+    
+    Urgency buckets only depend on the calendar day, so they are computed for
+    the whole catalog once per day and shared by every request.
+    """
+    
+    # (days_left upper bound, urgency, status); anything beyond is "low"
+    URGENCY_BUCKETS = [
+        (0, "expired", "Deadline Passed"),
+        (7, "critical", "Apply Now!"),
+        (30, "high", "Closing Soon"),
+        (90, "medium", "Open"),
+        (None, "low", "Open"),
+    ]
+    UNKNOWN_STATUS = (None, "unknown", "Check Website")
+    # Tie-break rank when ordering matches of equal amount
+    SORT_RANK = {"critical": 0, "high": 1}
+    
+    def __init__(self, scholarships):
+        self.scholarships = scholarships
+        self.ordinals = np.full(len(scholarships), -1, dtype=np.int64)
+        
+        for i, scholarship in enumerate(scholarships):
+            try:
+                self.ordinals[i] = datetime.strptime(scholarship["deadline"], "%d-%m-%Y").toordinal()
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Invalid deadline for scholarship {scholarship.get('id')}: {scholarship.get('deadline')!r}")
+        
+        dated = np.flatnonzero(self.ordinals >= 0)
+        self.by_deadline = dated[np.argsort(self.ordinals[dated], kind="stable")]
+        self.sorted_ordinals = self.ordinals[self.by_deadline].tolist()
+        self._statuses = None
+    
+    def _for_today(self):
+        """(day, statuses, sort ranks) for today, recomputed when the day changes"""
+        today = date.today().toordinal()
+        cached = self._statuses
+        
+        if cached is None or cached[0] != today:
+            # Deadlines are midnight at the start of the date, so the deadline
+            # day itself already counts as passed (days_left == -1)
+            days_left = self.ordinals - today - 1
+            bounds = [bound for bound, _, _ in self.URGENCY_BUCKETS[:-1]]
+            buckets = np.searchsorted(bounds, days_left, side="right")
+            
+            statuses = []
+            for days, bucket, ordinal in zip(days_left.tolist(), buckets.tolist(), self.ordinals.tolist()):
+                if ordinal < 0:
+                    statuses.append(self.UNKNOWN_STATUS)
+                else:
+                    _, urgency, status = self.URGENCY_BUCKETS[bucket]
+                    statuses.append((days, urgency, status))
+            
+            ranks = np.array([self.SORT_RANK.get(urgency, 2) for _, urgency, _ in statuses], dtype=np.int8)
+            
+            # Swap in one assignment so concurrent requests see a complete state
+            cached = (today, statuses, ranks)
+            self._statuses = cached
+        
+        return cached
+    
+    def statuses(self):
+        """(days_left, urgency, status) per scholarship for today"""
+        return self._for_today()[1]
+    
+    def sort_ranks(self):
+        """Urgency tie-break rank per scholarship: critical, high, then the rest"""
+        return self._for_today()[2]
+    
+    def upcoming(self, within_days):
+        """Catalog indices with 0 <= days_left <= within_days, soonest first"""
+        today = date.today().toordinal()
+        lo = bisect.bisect_left(self.sorted_ordinals, today + 1)
+        hi = bisect.bisect_right(self.sorted_ordinals, today + within_days + 1)
+        return self.by_deadline[lo:hi]
+
+# ============================================================================
+# FILTER INDEX
+# ============================================================================
+
+class FilterIndex:
+    """Inverted bitmap indexes behind the /scholarships listing filters.
+    
+    Each state, category and stream value maps to a packed bitmap over the
+    catalog, and amounts are kept sorted for binary-search range lookups, so
+    any combination of filters is a few intersections of n/8-byte bitmaps.
+    """
+    
+    def __init__(self, scholarships, deadline_index):
+        self.scholarships = scholarships
+        self.size = len(scholarships)
+        self.deadlines = deadline_index
+        self.all = np.packbits(np.ones(self.size, dtype=bool))
+        self.none = np.packbits(np.zeros(self.size, dtype=bool))
+        
+        self.by_state = self._invert([s.get("states", []) for s in scholarships])
+        self.by_category = self._invert([s.get("category", []) for s in scholarships])
+        self.by_stream = self._invert([s.get("eligible_streams", ["All"]) for s in scholarships])
+        
+        amounts = np.array([s.get("amount", 0) for s in scholarships], dtype=np.int64)
+        self.by_amount = np.argsort(amounts, kind="stable")
+        self.sorted_amounts = amounts[self.by_amount]
+    
+    def _invert(self, value_lists):
+        """Map each value to the packed bitmap of scholarships listing it"""
+        positions = {}
+        for i, values in enumerate(value_lists):
+            for value in values:
+                positions.setdefault(value, []).append(i)
+        return {value: self._bitmap(rows) for value, rows in positions.items()}
+    
+    def _bitmap(self, positions):
+        """Packed bitmap with the given catalog positions set"""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions] = True
+        return np.packbits(mask)
+    
+    def select(self, state=None, category=None, stream=None, min_amount=None, max_amount=None, deadline_before=None):
+        """Packed bitmap of scholarships passing every given filter.
+        
+        state and category match listed values exactly; stream also matches
+        scholarships open to all streams. deadline_before is a date ordinal.
+        """
+        bitmap = self.all
+        
+        if state:
+            bitmap = bitmap & self.by_state.get(state, self.none)
+        if category:
+            bitmap = bitmap & self.by_category.get(category, self.none)
+        if stream:
+            bitmap = bitmap & (self.by_stream.get(stream, self.none) | self.by_stream.get("All", self.none))
+        
+        if min_amount is not None or max_amount is not None:
+            lo = 0 if min_amount is None else np.searchsorted(self.sorted_amounts, min_amount, side="left")
+            hi = self.size if max_amount is None else np.searchsorted(self.sorted_amounts, max_amount, side="right")
+            bitmap = bitmap & self._bitmap(self.by_amount[lo:hi])
+        
+        if deadline_before is not None:
+            hi = bisect.bisect_left(self.deadlines.sorted_ordinals, deadline_before)
+            bitmap = bitmap & self._bitmap(self.deadlines.by_deadline[:hi])
+        
+        return bitmap
+    
+    def positions(self, bitmap):
+        """Catalog positions set in a packed bitmap, in catalog order"""
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.size))
+
+# ============================================================================
+# CATALOG AGGREGATES
+# ============================================================================
+
+class CatalogAggregates:
+    """Catalog-wide counts and amount distribution, computed once per snapshot"""
+    
+    AMOUNT_BUCKETS = [5000, 10000, 25000, 50000, 100000]
+    AMOUNT_PERCENTILES = [25, 50, 75, 90]
+    
+    def __init__(self, scholarships):
+        self.total = len(scholarships)
+        self.by_category = {}
+        self.by_state = {}
+        self.by_stream = {}
+        self.sc_st = 0
+        
+        for s in scholarships:
+            for category in s["category"]:
+                self.by_category[category] = self.by_category.get(category, 0) + 1
+            for state in s.get("states", []):
+                self.by_state[state] = self.by_state.get(state, 0) + 1
+            for stream in s.get("eligible_streams", ["All"]):
+                self.by_stream[stream] = self.by_stream.get(stream, 0) + 1
+            if "SC" in s["category"] or "ST" in s["category"]:
+                self.sc_st += 1
+        
+        self.west_bengal = np.array(["West Bengal" in s.get("states", []) for s in scholarships], dtype=bool)
+        self.wb_count = int(self.west_bengal.sum())
+        self.national_count = self.total - self.wb_count
+        
+        amounts = np.array([s["amount"] for s in scholarships], dtype=np.int64)
+        self.amounts = self._distribution(amounts)
+    
+    def _distribution(self, amounts):
+        """Summary and bucket counts for scholarship amounts"""
+        if not len(amounts):
+            return {"total": 0, "min": None, "max": None, "mean": None, "percentiles": {}, "buckets": {}}
+        
+        bounds = self.AMOUNT_BUCKETS
+        labels = [f"<{bounds[0]}"] + [f"{lo}-{hi - 1}" for lo, hi in zip(bounds, bounds[1:])] + [f"{bounds[-1]}+"]
+        counts = np.bincount(np.searchsorted(bounds, amounts, side="right"), minlength=len(labels))
+        percentiles = np.percentile(amounts, self.AMOUNT_PERCENTILES)
+        
+        return {
+            "total": int(amounts.sum()),
+            "min": int(amounts.min()),
+            "max": int(amounts.max()),
+            "mean": round(float(amounts.mean()), 2),
+            "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(self.AMOUNT_PERCENTILES, percentiles)},
+            "buckets": dict(zip(labels, counts.tolist()))
+        }
+    
+    def to_dict(self):
+        return {
+            "total_scholarships": self.total,
+            "wb_scholarships": self.wb_count,
+            "national_scholarships": self.national_count,
+            "sc_st_scholarships": self.sc_st,
+            "by_category": self.by_category,
+            "by_state": self.by_state,
+            "by_stream": self.by_stream,
+            "amounts": self.amounts
+        }
+
+# ============================================================================
+# CATALOG SEARCH
+# ============================================================================
+
+# Fields indexed for full-text search, each with how many times its terms count
+SEARCH_FIELDS = {
+    "name": 3,
+    "name_hi": 3,
+    "description": 1,
+    "description_hi": 1,
+    "eligibility": 2,
+    "documents": 1,
+    "states": 2,
+    "eligible_streams": 1,
+    "category": 1
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+SEARCH_DEFAULT_RESULTS = 10
+SEARCH_MAX_RESULTS = 50
+# Words, including Devanagari and Bengali ones with their vowel signs
+SEARCH_TOKEN = re.compile(r'[\w\u0900-\u097F\u0980-\u09FF]+')
+SEARCH_STOPWORDS = frozenset("""
+a about all am an and any are available be can do does for from get give how i in is it list me much my need of on
+or please show some tell the there to want what when where which who with
+और का की के को क्या कौन चाहिए दिखाओ बताओ मुझे में मेरी मेरे लिए से है हैं
+""".split())
+
+def search_terms(text):
+    """Lowercased search terms of a text, with stopwords and single letters dropped and English plurals folded"""
+    terms = []
+    for token in SEARCH_TOKEN.findall(text.lower()):
+        if token in SEARCH_STOPWORDS or (len(token) == 1 and token.isascii()):
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss") and token.isascii():
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+class SearchIndex:
+    """BM25 inverted index over the text fields of a catalog.
+    
+    Postings are kept term by term in two flat arrays (catalog positions and
+    precomputed BM25 weights), so a query is one vectorised scatter-add per
+    query term and a partial sort. Each entry's term ids and counts are
+    remembered by entry content, and the vocabulary only ever grows, so
+    building from the previous snapshot's index tokenizes just the entries
+    that were added or changed since and assembles the rest with NumPy.
+    """
+    
+    def __init__(self, scholarships, previous=None):
+        started = time.perf_counter()
+        known = previous.entry_terms if previous is not None else {}
+        self.vocabulary = dict(previous.vocabulary) if previous is not None else {}
+        self.size = len(scholarships)
+        self.entry_terms = {}
+        self.tokenized = 0
+        
+        entries = []
+        for scholarship in scholarships:
+            key = self._entry_key(scholarship)
+            entry = self.entry_terms.get(key) or known.get(key)
+            if entry is None:
+                entry = self._count_terms(scholarship)
+                self.tokenized += 1
+            self.entry_terms[key] = entry
+            entries.append(entry)
+        
+        lengths = np.array([len(term_ids) for term_ids, _ in entries], dtype=np.int64)
+        term_ids = np.concatenate([term_ids for term_ids, _ in entries] or [np.empty(0, np.int64)])
+        counts = np.concatenate([counts for _, counts in entries] or [np.empty(0)])
+        positions = np.repeat(np.arange(self.size), lengths)
+        
+        doc_freq = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self.offsets = np.concatenate(([0], np.cumsum(doc_freq)))
+        idf = np.log(1 + (self.size - doc_freq + 0.5) / (doc_freq + 0.5))
+        doc_lengths = np.bincount(positions, weights=counts, minlength=self.size)
+        average = doc_lengths.mean() if self.size else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / (average or 1.0))
+        weights = idf[term_ids] * counts * (BM25_K1 + 1) / (counts + norm[positions])
+        
+        order = np.argsort(term_ids, kind="stable")
+        self.postings = positions[order]
+        self.weights = weights[order]
+        # BM25 scores tie a lot, which makes argpartition crawl; a vanishing
+        # offset makes every score distinct and earlier entries win ties
+        self.tie_break = np.arange(self.size) * -1e-12
+        self.build_ms = round((time.perf_counter() - started) * 1000, 2)
+    
+    @staticmethod
+    def _entry_key(scholarship):
+        return tuple(tuple(value) if isinstance(value, list) else value
+                     for value in (scholarship.get(field) for field in SEARCH_FIELDS))
+    
+    def _count_terms(self, scholarship):
+        """(term ids, weighted counts) arrays of an entry, adding new terms to the vocabulary"""
+        counts = {}
+        for field, weight in SEARCH_FIELDS.items():
+            value = scholarship.get(field)
+            if not value:
+                continue
+            for term in search_terms(" ".join(value) if isinstance(value, list) else value):
+                counts[term] = counts.get(term, 0) + weight
+        term_ids = np.array([self.vocabulary.setdefault(term, len(self.vocabulary)) for term in counts], dtype=np.int64)
+        return term_ids, np.array(list(counts.values()), dtype=np.float64)
+    
+    def search(self, query, limit=10):
+        """(catalog position, score) pairs of the best matches for a query, best first"""
+        scores = None
+        for term in set(search_terms(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            if scores is None:
+                scores = self.tie_break.copy()
+            lo, hi = self.offsets[term_id], self.offsets[term_id + 1]
+            scores[self.postings[lo:hi]] += self.weights[lo:hi]
+        if scores is None or limit <= 0:
+            return []
+        
+        top = np.argpartition(scores, self.size - limit)[-limit:] if self.size > limit else np.arange(self.size)
+        top = top[scores[top] > 0]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), round(float(scores[i]), 4)) for i in top]
+    
+    def stats(self):
+        return {
+            "terms": len(self.vocabulary),
+            "postings": int(len(self.postings)),
+            "tokenized_entries": self.tokenized,
+            "build_ms": self.build_ms
+        }
+
+# ============================================================================
+# SCHOLARSHIP CATALOG
+# ============================================================================
+
+CATALOG_PATH = os.getenv('SCHOLARSHIP_CATALOG', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scholarships.json'))
+CATALOG_CHECK_INTERVAL = float(os.getenv('CATALOG_CHECK_INTERVAL', 5))
+
+# field: (accepted types, required)
+SCHOLARSHIP_SCHEMA = {
+    "id": ((int,), True),
+    "name": ((str,), True),
+    "name_hi": ((str,), False),
+    "min_percentage": ((int, float), True),
+    "max_income": ((int, float), True),
+    "category": ((list,), True),
+    "amount": ((int, float), True),
+    "deadline": ((str,), True),
+    "description": ((str,), False),
+    "description_hi": ((str,), False),
+    "apply_url": ((str,), False),
+    "eligibility": ((list,), False),
+    "documents": ((list,), False),
+    "eligible_streams": ((list,), False),
+    "states": ((list,), False),
+}
+
+class CatalogError(ValueError):
+    """Raised when a catalog file is unreadable or fails schema validation"""
+
+def validate_catalog(data):
+    """Check a parsed catalog document; returns (version, scholarships)"""
+    if not isinstance(data, dict) or not isinstance(data.get("scholarships"), list):
+        raise CatalogError("Catalog must be an object with a 'scholarships' list")
+    if not data["scholarships"]:
+        raise CatalogError("Catalog has no scholarships")
+    
+    errors = []
+    seen_ids = set()
+    for n, scholarship in enumerate(data["scholarships"]):
+        if not isinstance(scholarship, dict):
+            errors.append(f"entry {n}: not an object")
+            continue
+        
+        for field, (types, required) in SCHOLARSHIP_SCHEMA.items():
+            if field not in scholarship:
+                if required:
+                    errors.append(f"entry {n}: missing '{field}'")
+                continue
+            value = scholarship[field]
+            if isinstance(value, bool) or not isinstance(value, types):
+                errors.append(f"entry {n}: '{field}' has type {type(value).__name__}")
+            elif isinstance(value, list) and not all(isinstance(item, str) for item in value):
+                errors.append(f"entry {n}: '{field}' must be a list of strings")
+        
+        if scholarship.get("id") in seen_ids:
+            errors.append(f"entry {n}: duplicate id {scholarship['id']}")
+        seen_ids.add(scholarship.get("id"))
+    
+    if errors:
+        raise CatalogError("Invalid catalog: " + "; ".join(errors[:10]))
+    
+    return str(data.get("version", "")), data["scholarships"]
+
+class CatalogSnapshot:
+    """One catalog version together with every index derived from it.
+    
+    Snapshots are never mutated after construction. Requests take the current
+    snapshot once and use it throughout, so a reload never exposes a
+    half-built state.
+    """
+    
+    def __init__(self, scholarships, version, previous=None):
+        self.scholarships = scholarships
+        self.version = version
+        self.engine = EligibilityEngine(scholarships)
+        self.deadlines = DeadlineIndex(scholarships)
+        self.filters = FilterIndex(scholarships, self.deadlines)
+        self.aggregates = CatalogAggregates(scholarships)
+        # Reuses the previous snapshot's work for entries that did not change
+        self.search = SearchIndex(scholarships, previous.search if previous is not None else None)
+        self._rank_order = None
+    
+    def rank_order(self):
+        """(order, place) for today: catalog positions in ranked match order, and each position's place in it.
+        
+        Matches rank by amount, then deadline urgency, then catalog position.
+        Urgency changes with the day, so the order is rebuilt whenever the
+        deadline index hands out new sort ranks.
+        """
+        ranks = self.deadlines.sort_ranks()
+        cached = self._rank_order
+        if cached is None or cached[0] is not ranks:
+            order = np.lexsort((np.arange(self.engine.size), ranks, -self.engine.amount))
+            place = np.empty_like(order)
+            place[order] = np.arange(order.size)
+            # Swap in one assignment so concurrent requests see a complete state
+            cached = (ranks, order, place)
+            self._rank_order = cached
+        return cached[1], cached[2]
+
+def load_catalog(path, previous=None):
+    """Read, validate and index a catalog file; previous is the snapshot it replaces, if any"""
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+    except (OSError, ValueError) as e:
+        raise CatalogError(f"Cannot read catalog {path}: {e}") from e
+    
+    version, scholarships = validate_catalog(data)
+    # Unversioned files are stamped with a content hash
+    version = version or hashlib.sha256(raw).hexdigest()[:12]
+    return CatalogSnapshot(scholarships, version, previous)
+
+class CatalogReloader:
+    """Keeps the current snapshot and hot-reloads it when the file changes.
+    
+    Requests only stat the file (at most once per check interval). Parsing,
+    validation and index building run on a background thread, and the new
+    snapshot replaces the old one in a single assignment.
+    """
+    
+    def __init__(self, path, check_interval):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = self._stat()
+        self._next_check = time.monotonic() + check_interval
+        self._reloading = False
+        self.catalog = load_catalog(path)
+        logger.info(f"Loaded catalog {self.catalog.version} ({len(self.catalog.scholarships)} scholarships)")
+    
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def maybe_reload(self):
+        """Schedule a background reload if the catalog file changed"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        
+        with self._lock:
+            if now < self._next_check or self._reloading:
+                return
+            self._next_check = now + self.check_interval
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                return
+            self._signature = signature
+            self._reloading = True
+        
+        threading.Thread(target=self._reload, name="catalog-reload", daemon=True).start()
+    
+    def _reload(self):
+        try:
+            catalog = load_catalog(self.path, self.catalog)
+            self.catalog = catalog
+            logger.info(f"Reloaded catalog {catalog.version} ({len(catalog.scholarships)} scholarships)")
+        except CatalogError as e:
+            # Keep serving the previous snapshot until the file is fixed
+            logger.error(f"Catalog reload failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._reloading = False
+
+CATALOG_RELOADER = CatalogReloader(CATALOG_PATH, CATALOG_CHECK_INTERVAL)
+
+def current_catalog():
+    """The catalog snapshot to use for the current request"""
+    CATALOG_RELOADER.maybe_reload()
+    return CATALOG_RELOADER.catalog
+
+# ============================================================================
+# MATCH RESULT CACHE
+# ============================================================================
+
+MATCH_CACHE_SIZE = int(os.getenv('MATCH_CACHE_SIZE', 4096))
+MATCH_CACHE_TTL = int(os.getenv('MATCH_CACHE_TTL', 3600))
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit-rate counters"""
+    
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+    
+    def validate(self, generation):
+        """Drop every entry when the generation (catalog, day, ...) changes"""
+        with self._lock:
+            if generation != self._generation:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._generation = generation
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+MATCH_CACHE = LRUCache(MATCH_CACHE_SIZE, MATCH_CACHE_TTL)
+
+def evaluate_profile(student_data, catalog):
+    """(failures, candidates, statistics) for a profile, memoized; candidates are in ranked order.
+    
+    Only profile-independent results are cached: the per-scholarship failure
+    codes and the statistics. Reasons that quote the student's own values are
+    rendered per request, so cached responses are exact. Entries are dropped
+    when the catalog version or the calendar day changes.
+    """
+    engine = catalog.engine
+    generation = (catalog, date.today().toordinal())
+    MATCH_CACHE.validate(generation)
+    
+    key = (generation, engine.profile_key(student_data))
+    cached = MATCH_CACHE.get(key)
+    if cached is None:
+        failures = engine.evaluate(
+            student_data.get("percentage"),
+            student_data.get("income"),
+            student_data.get("category"),
+            student_data.get("state"),
+            student_data.get("stream")
+        )
+        failures.setflags(write=False)
+        passed = failures == EligibilityEngine.PASS
+        order, _ = catalog.rank_order()
+        cached = (failures, order[np.flatnonzero(passed[order])], match_statistics(passed[None, :], catalog)[0])
+        MATCH_CACHE.put(key, cached)
+    
+    failures, candidates, statistics = cached
+    return failures, candidates, dict(statistics)
+
+# ============================================================================
+# ENHANCED MATCHING ALGORITHM
+# ============================================================================
+
+EXPLAIN_MODES = ("full", "codes", "off")
+
+# Check name for each EligibilityEngine failure code
+REASON_FIELDS = {
+    EligibilityEngine.FAIL_PERCENTAGE: "percentage",
+    EligibilityEngine.FAIL_INCOME: "income",
+    EligibilityEngine.FAIL_CATEGORY: "category",
+    EligibilityEngine.FAIL_STATE: "state",
+    EligibilityEngine.FAIL_STREAM: "stream",
+}
+
+# Prose for (required, actual) pairs, only rendered when explain="full"
+REJECTION_TEMPLATES = {
+    "percentage": lambda required, actual: f"Marks too low: {actual:.1f}% < {required}% required",
+    "income": lambda required, actual: f"Income too high: ₹{actual:,} > ₹{required:,}",
+    "category": lambda required, actual: f"Category mismatch: {actual} not in {', '.join(required)}",
+    "state": lambda required, actual: f"State not eligible: {actual} (Only for: {', '.join(required)})",
+    "stream": lambda required, actual: f"Stream not eligible: {actual} (Only: {', '.join(required)})",
+}
+MATCH_TEMPLATES = {
+    "percentage": lambda required, actual: f"✓ Marks: {actual:.1f}% (Required: {required}%+)",
+    "income": lambda required, actual: f"✓ Income: ₹{actual:,} (Limit: ₹{required:,})",
+    "category": lambda required, actual: f"✓ Category: {actual} eligible",
+    "state": lambda required, actual: f"✓ State: {actual} eligible",
+    "stream": lambda required, actual: f"✓ Stream: {actual} eligible",
+}
+SCHOLARSHIP_FIELDS = {
+    "percentage": "min_percentage",
+    "income": "max_income",
+    "category": "category",
+    "state": "states",
+    "stream": "eligible_streams",
+}
+
+def reason_code(field, scholarship, student_data):
+    """Compact reason: the checked field, the scholarship's requirement and the student's value"""
+    return {
+        "field": field,
+        "required": scholarship[SCHOLARSHIP_FIELDS[field]],
+        "actual": student_data.get(field)
+    }
+
+def render_reason(code, matched=False):
+    """Human-readable text for a reason code"""
+    templates = MATCH_TEMPLATES if matched else REJECTION_TEMPLATES
+    return templates[code["field"]](code["required"], code["actual"])
+
+PROFILE_FIELDS = ("name", "percentage", "income", "category", "stream", "state")
+
+def _coerce_profile(raw):
+    """Normalize a submitted row (JSON object or CSV dict) into a student profile"""
+    if not isinstance(raw, dict):
+        raise ValueError("Each row must be an object with profile fields")
+    
+    profile = {}
+    for field in PROFILE_FIELDS:
+        value = raw.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+        elif value is not None and field not in ("percentage", "income"):
+            raise ValueError(f"{field} must be a string")
+        elif isinstance(value, bool):
+            # bool is an int subclass: true would be scored as 1% or ₹1
+            raise ValueError(f"{field} must be a number")
+        profile[field] = value
+    
+    try:
+        if profile["percentage"] is not None:
+            profile["percentage"] = float(profile["percentage"])
+            if not math.isfinite(profile["percentage"]):
+                raise OverflowError
+        if profile["income"] is not None:
+            profile["income"] = int(float(profile["income"]))
+    except (TypeError, OverflowError) as e:
+        raise ValueError("percentage and income must be finite numbers") from e
+    return profile
+
+def encode_cursor(scholarship_id):
+    """Opaque pagination cursor pointing just past a scholarship"""
+    raw = json.dumps({"after": scholarship_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Scholarship id a cursor points past; raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return json.loads(raw)["after"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def _pagination_args(params):
+    """(limit, after_id) from request parameters; both None when not paginating"""
+    limit = params.get("limit")
+    if limit is not None:
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError("limit must be a positive integer")
+    
+    cursor = params.get("cursor")
+    return limit, decode_cursor(cursor) if cursor else None
+
+def _rank_matches(catalog, candidates, limit=None, after=None):
+    """One page of matched positions, taken from candidates already in ranked order.
+    
+    Match percentage is the same for every match of one profile, so it never
+    decides the order. With a limit only the first `limit` entries ranked
+    after scholarship id `after` are returned.
+    """
+    if after is not None:
+        position = catalog.engine.position_by_id.get(after)
+        if position is None:
+            raise ValueError("Invalid cursor")
+        _, place = catalog.rank_order()
+        candidates = candidates[np.searchsorted(place[candidates], place[position], side="right"):]
+    return candidates[:limit].tolist()
+
+def match_statistics(passed, catalog):
+    """calculate_statistics-equivalent dicts for each row of an (m, n) match mask"""
+    engine = catalog.engine
+    if engine.size == 0:
+        return [calculate_statistics([]) for _ in range(passed.shape[0])]
+    ranks = catalog.deadlines.sort_ranks()
+    
+    # One matrix product accumulates count, amount, urgent and WB totals together
+    columns = np.column_stack([
+        np.ones(engine.size, dtype=np.int64),
+        engine.amount,
+        ranks < 2,
+        catalog.aggregates.west_bengal,
+    ])
+    counts, totals, urgent_counts, wb_counts = (passed.astype(np.int64) @ columns).T
+    
+    # Highest = first match in ranked order: top amount, then urgency, then position
+    best_amount = np.where(passed, engine.amount, -1).max(axis=1)
+    tied = passed & (engine.amount == best_amount[:, None])
+    best_rank = np.where(tied, ranks, 3).min(axis=1)
+    highest = (tied & (ranks == best_rank[:, None])).argmax(axis=1)
+    
+    statistics = []
+    for row in range(passed.shape[0]):
+        count = int(counts[row])
+        if count == 0:
+            statistics.append(calculate_statistics([]))
+            continue
+        
+        scholarship = engine.scholarships[highest[row]]
+        statistics.append({
+            "total_amount": int(totals[row]),
+            "avg_amount": int(totals[row]) // count,
+            "highest_scholarship": scholarship["name"],
+            "highest_amount": scholarship["amount"],
+            "urgent_count": int(urgent_counts[row]),
+            "total_scholarships": count,
+            "wb_scholarships": int(wb_counts[row]),
+            "national_scholarships": count - int(wb_counts[row])
+        })
+    return statistics
+
+def match_profile(student_data, limit=None, after=None, explain="full", catalog=None):
+    """Match a profile and return its matches, rejections and statistics.
+    
+    explain="full" renders prose reasons, "codes" returns compact reason codes
+    (field, required, actual) and "off" skips reasons and rejections entirely.
+    Pass limit (and optionally the id of the last scholarship already shown
+    as after) to build only one page of ranked matches.
+    """
+    if explain not in EXPLAIN_MODES:
+        raise ValueError(f"explain must be one of: {', '.join(EXPLAIN_MODES)}")
+    
+    matched = []
+    rejected = []
+    
+    percentage = student_data.get("percentage")
+    income = student_data.get("income")
+    category = student_data.get("category")
+    stream = student_data.get("stream")
+    state = student_data.get("state")
+    
+    catalog = catalog or current_catalog()
+    engine = catalog.engine
+    failures, candidates, statistics = evaluate_profile(student_data, catalog)
+    deadline_statuses = catalog.deadlines.statuses()
+    
+    if explain != "off":
+        for i in np.flatnonzero(failures):
+            scholarship = engine.scholarships[i]
+            code = reason_code(REASON_FIELDS[failures[i]], scholarship, student_data)
+            if explain == "codes":
+                code["id"] = scholarship["id"]
+                rejected.append(code)
+            else:
+                rejected.append({
+                    "scholarship": scholarship["name"],
+                    "reason": render_reason(code)
+                })
+    
+    # Every provided critical check passed, so the match is either full or unscored
+    max_score = sum(1 for value in (percentage, income, category) if value)
+    match_percentage = 100.0 if max_score > 0 else 0
+    
+    for i in _rank_matches(catalog, candidates, limit, after):
+        scholarship = engine.scholarships[i]
+        scholarship_copy = scholarship.copy()
+        scholarship_copy["eligibility_score"] = max_score
+        scholarship_copy["match_percentage"] = match_percentage
+        
+        if explain != "off":
+            checked = [field for field, value in (
+                ("percentage", percentage),
+                ("income", income),
+                ("category", category),
+                ("state", state and not engine.all_states[i]),
+                ("stream", stream and not engine.all_streams[i]),
+            ) if value]
+            codes = [reason_code(field, scholarship, student_data) for field in checked]
+            if explain == "full":
+                scholarship_copy["match_reasons"] = [render_reason(code, matched=True) for code in codes]
+            else:
+                scholarship_copy["match_reasons"] = codes
+        
+        days_left, urgency, status = deadline_statuses[i]
+        scholarship_copy["days_until_deadline"] = days_left
+        scholarship_copy["urgency"] = urgency
+        scholarship_copy["status"] = status
+        
+        matched.append(scholarship_copy)
+    
+    return {
+        "matched": matched,
+        "rejected": rejected,
+        "rejected_count": int(np.count_nonzero(failures)),
+        "statistics": statistics,
+        "catalog_version": catalog.version
+    }
+
+def match_scholarships(student_data, limit=None, after=None, explain="full"):
+    """Enhanced scholarship matching with strict percentage filtering"""
+    result = match_profile(student_data, limit=limit, after=after, explain=explain)
+    return result["matched"], result["rejected"]
+
+def calculate_statistics(matched_scholarships):
+    """Calculate comprehensive statistics"""
+    if not matched_scholarships:
+        return {
+            "total_amount": 0,
+            "avg_amount": 0,
+            "highest_scholarship": None,
+            "urgent_count": 0,
+            "total_scholarships": 0,
+            "wb_scholarships": 0,
+            "national_scholarships": 0
+        }
+    
+    # Single pass over the matches
+    total_amount = urgent = wb_count = 0
+    highest = None
+    for s in matched_scholarships:
+        total_amount += s["amount"]
+        if highest is None or s["amount"] > highest["amount"]:
+            highest = s
+        if s.get("urgency") in ("critical", "high"):
+            urgent += 1
+        if "West Bengal" in s.get("states", []):
+            wb_count += 1
+    
+    count = len(matched_scholarships)
+    return {
+        "total_amount": total_amount,
+        "avg_amount": total_amount // count,
+        "highest_scholarship": highest["name"],
+        "highest_amount": highest["amount"],
+        "urgent_count": urgent,
+        "total_scholarships": count,
+        "wb_scholarships": wb_count,
+        "national_scholarships": count - wb_count
+    }
+
+# ============================================================================
+# BATCH MATCHING
+# ============================================================================
+
+BATCH_CHUNK_SIZE = 1000
+BATCH_SPOOL_SIZE = 1024 * 1024
+
+def _read_batch_profiles(stream, file_format):
+    """Lazily yield (row_number, profile, error) from a JSONL or CSV byte stream.
+    
+    Lines are decoded one at a time, so a row that is not valid UTF-8 is
+    reported as a bad row instead of ending the stream.
+    """
+    undecodable = []
+    
+    def lines():
+        for line in stream:
+            try:
+                yield line.decode("utf-8-sig")
+            except UnicodeDecodeError:
+                undecodable.append(line)
+                yield line.decode("utf-8-sig", errors="replace")
+    
+    try:
+        if file_format == "csv":
+            rows = enumerate(csv.DictReader(lines()), start=1)
+        else:
+            rows = ((n, line) for n, line in enumerate(lines(), start=1) if line.strip())
+        
+        for row_number, raw in rows:
+            try:
+                if undecodable:
+                    undecodable.clear()
+                    raise ValueError("Row is not valid UTF-8")
+                if file_format != "csv":
+                    raw = json.loads(raw)
+                yield row_number, _coerce_profile(raw), None
+            except (ValueError, TypeError) as e:
+                yield row_number, None, str(e)
+    finally:
+        stream.close()
+
+def _chunked(iterable, size):
+    """Group an iterable into lists of at most size items"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def score_profile_batch(profiles, catalog):
+    """Match many profiles against the catalog in one vectorized pass.
+    
+    Yields (matched, statistics) per profile: compact matched entries in
+    match_scholarships order, and the statistics calculate_statistics would
+    produce for the equivalent single-profile call.
+    """
+    engine = catalog.engine
+    passed = engine.evaluate_batch(profiles) == EligibilityEngine.PASS
+    statuses = catalog.deadlines.statuses()
+    
+    # Within one profile the ranked order is a fixed order over the catalog
+    order, _ = catalog.rank_order()
+    ordered = passed[:, order]
+    
+    for row, statistics in enumerate(match_statistics(passed, catalog)):
+        matched = []
+        for i in order[ordered[row]]:
+            scholarship = engine.scholarships[i]
+            matched.append({
+                "id": scholarship["id"],
+                "name": scholarship["name"],
+                "amount": scholarship["amount"],
+                "deadline": scholarship["deadline"],
+                "urgency": statuses[i][1]
+            })
+        yield matched, statistics
+
+def generate_batch_results(rows, catalog):
+    """Stream NDJSON result lines for (row_number, profile, error) tuples.
+    
+    The whole upload is scored against one catalog snapshot.
+    """
+    for chunk in _chunked(rows, BATCH_CHUNK_SIZE):
+        valid = [(row_number, profile) for row_number, profile, error in chunk if error is None]
+        scored = score_profile_batch([profile for _, profile in valid], catalog)
+        results = {}
+        for (row_number, profile), (matched, statistics) in zip(valid, scored):
+            results[row_number] = {
+                "row": row_number,
+                "success": True,
+                "student": profile,
+                "total_matches": len(matched),
+                "matched_scholarships": matched,
+                "statistics": statistics
+            }
+        
+        for row_number, profile, error in chunk:
+            result = results.get(row_number) or {"row": row_number, "success": False, "error": error}
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+# ============================================================================
+# OCR BACKENDS
+# ============================================================================
+
+# auto: tesserocr when it is installed and initialises, pytesseract otherwise
+OCR_BACKEND = os.getenv('OCR_BACKEND', 'auto')
+# Language model for pages whose script is not detected or has no installed model
+OCR_LANG = os.getenv('OCR_LANG', 'eng')
+# Tesseract language model for each script that orientation and script detection reports
+SCRIPT_LANGUAGES = {
+    "Latin": "eng",
+    "Bengali": "ben",
+    "Devanagari": "hin",
+    "Gujarati": "guj",
+    "Gurmukhi": "pan",
+    "Oriya": "ori",
+    "Tamil": "tam",
+    "Telugu": "tel",
+    "Kannada": "kan",
+    "Malayalam": "mal",
+    "Arabic": "urd"
+}
+WORD_FIELDS = ("text", "left", "top", "width", "height", "conf")
+
+class OCRBackend(ABC):
+    """Engine that turns a page image into text"""
+    
+    name = None
+    
+    @abstractmethod
+    def image_to_string(self, image, psm=None, lang=None):
+        """Text of an image"""
+    
+    @abstractmethod
+    def image_to_data(self, image, psm=None, lang=None):
+        """Recognised words as parallel lists keyed by WORD_FIELDS"""
+    
+    @abstractmethod
+    def detect_script(self, image):
+        """Orientation and script of a page as {"rotate", "orientation_conf", "script", "script_conf"},
+        where rotate is the clockwise turn in degrees that makes the page upright"""
+    
+    @abstractmethod
+    def languages(self):
+        """Installed language models"""
+    
+    @abstractmethod
+    def version(self):
+        """Engine version string"""
+
+class PytesseractBackend(OCRBackend):
+    """Runs the tesseract CLI per call: every call writes a temp file, starts a
+    process and reloads the language models"""
+    
+    name = "pytesseract"
+    
+    def __init__(self, lang=OCR_LANG):
+        self.lang = lang
+        self._languages = None
+    
+    def _config(self, psm):
+        return f'--psm {psm}' if psm else ''
+    
+    def image_to_string(self, image, psm=None, lang=None):
+        return pytesseract.image_to_string(image, lang=lang or self.lang, config=self._config(psm))
+    
+    def image_to_data(self, image, psm=None, lang=None):
+        data = pytesseract.image_to_data(image, lang=lang or self.lang, config=self._config(psm),
+                                         output_type=pytesseract.Output.DICT)
+        return {field: data[field] for field in WORD_FIELDS}
+    
+    def detect_script(self, image):
+        osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+        return {key: osd[key] for key in ("rotate", "orientation_conf", "script", "script_conf")}
+    
+    def languages(self):
+        if self._languages is None:
+            self._languages = set(pytesseract.get_languages())
+        return self._languages
+    
+    def version(self):
+        return str(pytesseract.get_tesseract_version())
+
+class TesserocrBackend(OCRBackend):
+    """Keeps an initialised Tesseract API resident, one per thread.
+    
+    Language models load once per OCR worker process instead of once per
+    call, and images are handed over in memory rather than through temp files.
+    """
+    
+    name = "tesserocr"
+    
+    def __init__(self, lang=OCR_LANG):
+        self.lang = lang
+        self._local = threading.local()
+        # Initialise now so a missing install or language pack fails here, not mid-job
+        self._api(None)
+    
+    def _api(self, psm, lang=None):
+        """This thread's API for a language model (default self.lang), loading it on first use"""
+        apis = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+        lang = lang or self.lang
+        api = apis.get(lang)
+        if api is None:
+            api = apis[lang] = tesserocr.PyTessBaseAPI(lang=lang)
+        api.SetPageSegMode(psm if psm else tesserocr.PSM.AUTO)
+        return api
+    
+    def image_to_string(self, image, psm=None, lang=None):
+        api = self._api(psm, lang)
+        api.SetImage(image)
+        return api.GetUTF8Text()
+    
+    def image_to_data(self, image, psm=None, lang=None):
+        api = self._api(psm, lang)
+        api.SetImage(image)
+        api.Recognize()
+        data = {field: [] for field in WORD_FIELDS}
+        level = tesserocr.RIL.WORD
+        for word in tesserocr.iterate_level(api.GetIterator(), level):
+            text = word.GetUTF8Text(level)
+            box = word.BoundingBox(level)
+            if not text or box is None:
+                continue
+            left, top, right, bottom = box
+            data["text"].append(text)
+            data["left"].append(left)
+            data["top"].append(top)
+            data["width"].append(right - left)
+            data["height"].append(bottom - top)
+            data["conf"].append(word.Confidence(level))
+        return data
+    
+    def detect_script(self, image):
+        api = self._api(tesserocr.PSM.OSD_ONLY, "osd")
+        api.SetImage(image)
+        osd = api.DetectOrientationScript()
+        if not osd:
+            raise RuntimeError("Orientation and script detection found too little text")
+        # orient_deg is how far the page itself is turned clockwise
+        return {"rotate": (360 - osd["orient_deg"]) % 360, "orientation_conf": osd["orient_conf"],
+                "script": osd["script_name"], "script_conf": osd["script_conf"]}
+    
+    def languages(self):
+        return set(tesserocr.get_languages()[1])
+    
+    def version(self):
+        return tesserocr.tesseract_version().splitlines()[0]
+
+OCR_BACKENDS = {"pytesseract": PytesseractBackend, "tesserocr": TesserocrBackend}
+
+def resolve_ocr_backend_name(name=None):
+    """Backend name that a setting (default OCR_BACKEND) selects"""
+    name = name or OCR_BACKEND
+    if name == 'auto':
+        return "tesserocr" if TESSEROCR_SUPPORT else "pytesseract"
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {name}")
+    if name == "tesserocr" and not TESSEROCR_SUPPORT:
+        raise ValueError("OCR backend tesserocr is not installed")
+    return name
+
+def create_ocr_backend(name=None):
+    """Instantiate an OCR backend, falling back to pytesseract when auto-selected tesserocr fails"""
+    resolved = resolve_ocr_backend_name(name)
+    try:
+        return OCR_BACKENDS[resolved]()
+    except Exception as e:
+        if (name or OCR_BACKEND) != 'auto' or resolved == "pytesseract":
+            raise
+        logger.warning(f"tesserocr unavailable, falling back to pytesseract: {str(e)}")
+        return PytesseractBackend()
+
+_ocr_backend = None
+
+def language_for_script(script, backend):
+    """Language model to OCR a page of the given script with: the script's own
+    model when the backend has it installed, OCR_LANG otherwise"""
+    lang = SCRIPT_LANGUAGES.get(script)
+    return lang if lang and lang in backend.languages() else OCR_LANG
+
+def get_ocr_backend():
+    """The configured OCR backend, created once per process"""
+    global _ocr_backend
+    if _ocr_backend is None:
+        _ocr_backend = create_ocr_backend()
+    return _ocr_backend
+
+# ============================================================================
+# IMAGE PROCESSING FUNCTIONS
+# ============================================================================
+
+def allowed_file(filename):
+    """Check if file extension is allowed"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+PDF_DPI = 300
+PDF_PAGE_WINDOW = int(os.getenv('PDF_PAGE_WINDOW', 2))
+
+def pdf_page_count(source):
+    """Number of pages in a PDF DocumentSource, read from its metadata without rasterizing"""
+    path = source.filesystem_path()
+    if path:
+        return int(pdfinfo_from_path(path)["Pages"])
+    with source.open() as view:
+        return int(pdfinfo_from_bytes(view)["Pages"])
+
+def rasterize_pdf(source, first_page, last_page):
+    """Render pages first_page..last_page of a PDF DocumentSource at PDF_DPI.
+    
+    Poppler reads the shared memory block or spool file in place where the
+    platform exposes one as a path; otherwise pdf2image passes it the bytes.
+    """
+    path = source.filesystem_path()
+    if path:
+        return convert_from_path(path, dpi=PDF_DPI, first_page=first_page, last_page=last_page)
+    with source.open() as view:
+        return convert_from_bytes(view, dpi=PDF_DPI, first_page=first_page, last_page=last_page)
+
+def ocr_pdf_window(source, first_page, last_page):
+    """Rasterize and OCR pages first_page..last_page of a PDF (1-based, inclusive).
+    
+    Returns a (text, regions) pair per page and the StageTimings of the window.
+    """
+    timings = StageTimings()
+    with timings.stage("rasterize"):
+        images = rasterize_pdf(source, first_page, last_page)
+    pages = []
+    while images:
+        # Drop each page bitmap as soon as it is read so a window never holds more than it must
+        image = images.pop(0)
+        pages.append(ocr_page(image, dpi=PDF_DPI, timings=timings))
+        image.close()
+    return pages, timings
+
+def process_pdf(source, executor=None, pages_in_flight=None, on_progress=None, extractor=None, timings=None,
+                regions=None):
+    """Convert PDF to images and extract text.
+    
+    source is a DocumentSource or a file path. Pages are rasterized PDF_PAGE_WINDOW at a time rather than the whole
+    document up front. With an executor the windows are fanned out across it,
+    keeping at most pages_in_flight pages submitted, and the text is
+    reassembled in page order. on_progress(pages_done, pages_total) is called
+    as each window finishes.
+    
+    With an IncrementalExtractor, pages are fed to it in order and no further
+    pages are rasterized once it is complete; the returned text then covers
+    only the pages read and extractor.pages_skipped counts the rest.
+    Per-stage timings of every window read are merged into timings, and the
+    text regions of every page read are appended to regions, with their page
+    number and offsets into the returned text.
+    """
+    if not PDF_SUPPORT:
+        raise Exception("PDF support not available")
+    
+    try:
+        if isinstance(source, str):
+            source = DocumentSource.from_path(source)
+        total = pdf_page_count(source)
+        windows = [(first, min(first + PDF_PAGE_WINDOW - 1, total))
+                   for first in range(1, total + 1, PDF_PAGE_WINDOW)]
+        pages = {}
+        chunks = []
+        done_pages = 0
+        length = 0
+        
+        def collect(first, window):
+            """Store a finished window; True once the extractor needs no more pages"""
+            nonlocal done_pages, length
+            window_pages, window_timings = window
+            if timings is not None:
+                timings.merge(window_timings)
+            for offset, page in enumerate(window_pages):
+                pages[first + offset] = page
+            done_pages += len(window_pages)
+            if on_progress:
+                on_progress(done_pages, total)
+            # Feed the contiguous run of finished pages, in page order
+            while len(chunks) < total and len(chunks) + 1 in pages:
+                number = len(chunks) + 1
+                text, page_regions = pages.pop(number)
+                header = f"\n--- Page {number} ---\n"
+                if regions is not None:
+                    start = length + len(header)
+                    regions.extend(dict(region, page=number, start=region["start"] + start, end=region["end"] + start)
+                                   for region in page_regions)
+                chunks.append(header + text)
+                length += len(chunks[-1])
+                if extractor is not None:
+                    extractor.feed(chunks[-1])
+                    if extractor.complete():
+                        return True
+            return False
+        
+        skipped = 0
+        if executor is None:
+            for index, (first, last) in enumerate(windows):
+                if collect(first, ocr_pdf_window(source, first, last)):
+                    skipped = sum(last - first + 1 for first, last in windows[index + 1:])
+                    break
+        else:
+            max_windows = max(1, (pages_in_flight or PDF_PAGE_WINDOW) // PDF_PAGE_WINDOW)
+            queued = iter(windows)
+            in_flight = {}
+            for first, last in itertools.islice(queued, max_windows):
+                in_flight[executor.submit(ocr_pdf_window, source, first, last)] = (first, last)
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                if any(collect(in_flight.pop(future)[0], future.result()) for future in done):
+                    # Windows already running finish in the background; queued ones never start
+                    cancelled = [window for future, window in in_flight.items() if future.cancel()]
+                    skipped = sum(last - first + 1 for first, last in itertools.chain(cancelled, queued))
+                    break
+                for first, last in itertools.islice(queued, len(done)):
+                    in_flight[executor.submit(ocr_pdf_window, source, first, last)] = (first, last)
+        
+        if extractor is not None:
+            extractor.pages_total = total
+            extractor.pages_skipped = skipped
+        return "".join(chunks)
+    except Exception as e:
+        logger.error(f"PDF processing error: {str(e)}")
+        raise
+
+PREPROCESS_TARGET_DPI = int(os.getenv('PREPROCESS_TARGET_DPI', 300))
+PREPROCESS_MAX_UPSCALE = float(os.getenv('PREPROCESS_MAX_UPSCALE', 2.0))
+# auto: pick the denoise strength from the noise estimate; always/never force it
+PREPROCESS_DENOISE = os.getenv('PREPROCESS_DENOISE', 'auto')
+# Estimated noise sigma below which denoising is skipped / above which it runs at full strength
+NOISE_SKIP_BELOW = float(os.getenv('NOISE_SKIP_BELOW', 2.0))
+NOISE_FULL_ABOVE = float(os.getenv('NOISE_FULL_ABOVE', 6.0))
+NOISE_SAMPLE_SIZE = 1024
+# fastNlMeansDenoising (h, templateWindowSize, searchWindowSize) per strength
+DENOISE_PARAMS = {"light": (6, 7, 11), "full": (10, 7, 21)}
+# Pages of unknown resolution are assumed to be A4, whose long side is 11.69 inches
+A4_LONG_SIDE_INCHES = 11.69
+
+class StageTimings:
+    """Per-stage wall-clock totals and preprocessing decisions for one document"""
+    
+    def __init__(self):
+        self.ms = {}
+        self.decisions = {}
+    
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.ms[name] = self.ms.get(name, 0.0) + (time.perf_counter() - start) * 1000
+    
+    def note(self, name, value):
+        self.decisions.setdefault(name, []).append(value)
+    
+    def merge(self, other):
+        for name, ms in other.ms.items():
+            self.ms[name] = self.ms.get(name, 0.0) + ms
+        for name, values in other.decisions.items():
+            self.decisions.setdefault(name, []).extend(values)
+    
+    def to_dict(self):
+        return dict(self.decisions, timings_ms={name: round(ms, 2) for name, ms in self.ms.items()})
+
+_clahe = threading.local()
+
+def _get_clahe():
+    """CLAHE operator, created once per thread instead of once per image"""
+    if not hasattr(_clahe, "op"):
+        _clahe.op = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+    return _clahe.op
+
+def estimate_noise(gray):
+    """Estimated Gaussian noise sigma of a grayscale image (Immerkaer's method).
+    
+    Pixels on or next to edges are left out so that crisp printed text does
+    not read as noise. Sensor and scan noise is uniform across the page, so
+    only a central crop of at most NOISE_SAMPLE_SIZE pixels square is used.
+    """
+    height, width = gray.shape
+    top, left = max(0, (height - NOISE_SAMPLE_SIZE) // 2), max(0, (width - NOISE_SAMPLE_SIZE) // 2)
+    gray = gray[top:top + NOISE_SAMPLE_SIZE, left:left + NOISE_SAMPLE_SIZE]
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    response = np.abs(cv2.filter2D(gray.astype(np.float32), -1, kernel))[1:-1, 1:-1]
+    edges = cv2.dilate(cv2.Canny(gray, 100, 200), np.ones((3, 3), np.uint8))[1:-1, 1:-1]
+    flat = response[edges == 0]
+    if flat.size == 0:
+        return 0.0
+    return float(np.sqrt(np.pi / 2) * flat.mean() / 6)
+
+def normalize_resolution(gray, dpi=None):
+    """Rescale to PREPROCESS_TARGET_DPI; returns (image, scale factor)"""
+    if not dpi:
+        dpi = max(gray.shape) / A4_LONG_SIDE_INCHES
+    scale = min(PREPROCESS_TARGET_DPI / dpi, PREPROCESS_MAX_UPSCALE)
+    if 0.9 <= scale <= 1.1:
+        return gray, 1.0
+    size = (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gray, size, interpolation=interpolation), scale
+
+def denoise_strength(noise):
+    if PREPROCESS_DENOISE in ("always", "never"):
+        return "full" if PREPROCESS_DENOISE == "always" else None
+    if noise < NOISE_SKIP_BELOW:
+        return None
+    return "full" if noise > NOISE_FULL_ABOVE else "light"
+
+def binarize_image(image, dpi=None, timings=None):
+    """Grayscale, rescale, denoise, enhance and threshold a page.
+    
+    Returns the binarized page as an array together with the scale factor
+    applied to it. dpi is the scan resolution when known (PDF pages);
+    otherwise the page is assumed to be A4. Stage timings and decisions go to
+    timings if given.
+    """
+    timings = timings or StageTimings()
+    with timings.stage("grayscale"):
+        img_array = np.asarray(image)
+        
+        if len(img_array.shape) == 3:
+            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+        else:
+            gray = img_array
+    
+    # Bring oversized photos down (and tiny scans up) before the heavy stages
+    with timings.stage("normalize"):
+        gray, scale = normalize_resolution(gray, dpi)
+    timings.note("scale", round(scale, 3))
+    
+    with timings.stage("quality"):
+        noise = estimate_noise(gray)
+    strength = denoise_strength(noise)
+    timings.note("noise", round(noise, 2))
+    timings.note("denoise", strength or "skipped")
+    
+    # Denoise
+    if strength:
+        with timings.stage("denoise"):
+            gray = cv2.fastNlMeansDenoising(gray, None, *DENOISE_PARAMS[strength])
+    
+    # Enhance contrast
+    with timings.stage("contrast"):
+        enhanced = _get_clahe().apply(gray)
+    
+    # Threshold
+    with timings.stage("threshold"):
+        thresh = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    
+    return thresh, scale
+
+def preprocess_image(image, dpi=None, timings=None):
+    """Enhanced image preprocessing for better OCR"""
+    try:
+        return Image.fromarray(binarize_image(image, dpi, timings)[0])
+    except Exception as e:
+        logger.error(f"Image preprocessing error: {str(e)}")
+        return image
+
+# regions: OCR only detected text lines and table cells; page: OCR the whole page
+OCR_LAYOUT = os.getenv('OCR_LAYOUT', 'regions')
+# Regions taller than this many median line heights are logos, photos or seals,
+# and much shorter ones are stray punctuation or specks
+REGION_MAX_LINE_HEIGHTS = 3
+REGION_MIN_LINE_HEIGHT = 0.4
+# Ink coverage outside this range is a solid graphic or stray specks rather than text
+REGION_INK_RANGE = (0.04, 0.6)
+REGION_PADDING = 4
+REGION_ROW_GAP = 16
+REGION_CELL_GAP = 32
+
+# Detect each page's script and orientation and OCR it upright with that script's model only
+OCR_SCRIPT_DETECTION = os.getenv('OCR_SCRIPT_DETECTION', '1') != '0'
+# Resolution the detection pass runs at; it needs far less detail than OCR
+SCRIPT_DETECT_DPI = int(os.getenv('SCRIPT_DETECT_DPI', 150))
+# Detections less confident than this are ignored (OCR_LANG, no rotation)
+SCRIPT_MIN_CONFIDENCE = float(os.getenv('SCRIPT_MIN_CONFIDENCE', 1.0))
+ORIENTATION_MIN_CONFIDENCE = float(os.getenv('ORIENTATION_MIN_CONFIDENCE', 2.0))
+
+def detect_text_regions(binary):
+    """Text line and table cell boxes (x, y, w, h) of a binarized page, grouped into rows.
+    
+    Ruling lines are removed first so table cells come out separately, then
+    characters are smeared horizontally into words and lines. Boxes that are
+    too small, too tall or with the wrong ink coverage to be a line of text
+    are dropped. Rows are ordered top to bottom and boxes left to right.
+    """
+    ink = (binary == 0).astype(np.uint8) * 255
+    height, width = ink.shape
+    
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                  cv2.getStructuringElement(cv2.MORPH_RECT, (max(width // 20, 10), 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(height // 20, 10))))
+    text_ink = cv2.subtract(ink, cv2.bitwise_or(horizontal, vertical))
+    
+    # Wide enough to bridge the gaps between letters and words, tall enough to join i-dots to their stems
+    smeared = cv2.dilate(text_ink, cv2.getStructuringElement(cv2.MORPH_RECT,
+                                                             (max(width // 100, 3), max(width // 250, 3))))
+    contours, _ = cv2.findContours(smeared, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    
+    min_side = max(height // 400, 6)
+    boxes = [box for box in (cv2.boundingRect(c) for c in contours)
+             if box[2] >= min_side and box[3] >= min_side]
+    if not boxes:
+        return []
+    
+    line_height = float(np.median([box[3] for box in boxes]))
+    low, high = REGION_INK_RANGE
+    boxes = [(x, y, w, h) for x, y, w, h in boxes
+             if REGION_MIN_LINE_HEIGHT * line_height <= h <= REGION_MAX_LINE_HEIGHTS * line_height
+             and low <= np.count_nonzero(text_ink[y:y + h, x:x + w]) / (w * h) <= high]
+    
+    rows = []
+    for box in sorted(boxes, key=lambda b: b[1]):
+        center = box[1] + box[3] / 2
+        if rows and rows[-1][0] <= center <= rows[-1][1]:
+            rows[-1][2].append(box)
+            rows[-1][1] = max(rows[-1][1], box[1] + box[3])
+        else:
+            rows.append([box[1], box[1] + box[3], [box]])
+    return [sorted(row_boxes) for _, _, row_boxes in rows]
+
+def ocr_regions(binary, rows, timings, backend=None, lang=None):
+    """OCR the given regions of a page with a single Tesseract call.
+    
+    The regions are packed row by row onto a compact canvas, so Tesseract
+    never sees margins, graphics or the space between them. Returns the page
+    text and one {"bbox", "text", "start", "end"} dict per region, where
+    start/end are the region's offsets in the page text. backend defaults to
+    the configured OCR backend and lang to its default language model.
+    """
+    with timings.stage("layout"):
+        placements = []
+        canvas_width, canvas_height = 0, 0
+        for row in rows:
+            x_offset = 0
+            row_height = max(h for _, _, _, h in row) + 2 * REGION_PADDING
+            for box in row:
+                placements.append((box, x_offset, canvas_height))
+                x_offset += box[2] + 2 * REGION_PADDING + REGION_CELL_GAP
+            canvas_width = max(canvas_width, x_offset)
+            canvas_height += row_height + REGION_ROW_GAP
+        
+        canvas = np.full((canvas_height, canvas_width), 255, dtype=np.uint8)
+        for (x, y, w, h), left, top in placements:
+            canvas[top + REGION_PADDING:top + REGION_PADDING + h,
+                   left + REGION_PADDING:left + REGION_PADDING + w] = binary[y:y + h, x:x + w]
+    timings.note("ocr_pixel_ratio", round(canvas.size / binary.size, 3))
+    
+    with timings.stage("ocr"):
+        words = (backend or get_ocr_backend()).image_to_data(Image.fromarray(canvas), psm=6, lang=lang)
+    
+    # Give every recognised word to the region it sits in (or the nearest one)
+    region_words = [[] for _ in placements]
+    for text, left, top, w, h in zip(words["text"], words["left"], words["top"], words["width"], words["height"]):
+        if not text.strip():
+            continue
+        cx, cy = left + w / 2, top + h / 2
+        distances = [max(l - cx, cx - (l + bw + 2 * REGION_PADDING), 0) + max(t - cy, cy - (t + bh + 2 * REGION_PADDING), 0)
+                     for (_, _, bw, bh), l, t in placements]
+        region_words[distances.index(min(distances))].append((cx, text.strip()))
+    
+    regions, lines, offset, index = [], [], 0, 0
+    for row in rows:
+        parts = []
+        for box in row:
+            region_text = " ".join(text for _, text in sorted(region_words[index]))
+            index += 1
+            if not region_text:
+                continue
+            start = offset + sum(len(part) + 1 for part in parts)
+            parts.append(region_text)
+            regions.append({"bbox": list(box), "text": region_text, "start": start, "end": start + len(region_text)})
+        if parts:
+            line = " ".join(parts)
+            lines.append(line)
+            offset += len(line) + 1
+    return "\n".join(lines), regions
+
+# Turns that cv2.rotate applies for each clockwise rotation in degrees
+ROTATIONS = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180, 270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+def orient_page(binary, timings, backend):
+    """Detect the script and orientation of a binarized page on a low-resolution copy.
+    
+    Returns the page turned upright, the language model to OCR it with and
+    the clockwise rotation applied. The script (None when undetected) and
+    rotation are noted in timings.
+    """
+    if not OCR_SCRIPT_DETECTION:
+        return binary, OCR_LANG, 0
+    
+    with timings.stage("script"):
+        factor = SCRIPT_DETECT_DPI / PREPROCESS_TARGET_DPI
+        small = binary if factor >= 1 else cv2.resize(binary, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        try:
+            osd = backend.detect_script(Image.fromarray(small))
+        except Exception as e:
+            # Pages with little or no text leave Tesseract nothing to go on
+            logger.debug(f"Script detection failed: {str(e)}")
+            osd = None
+    
+    script = osd["script"] if osd and osd["script_conf"] >= SCRIPT_MIN_CONFIDENCE else None
+    rotate = osd["rotate"] if osd and osd["orientation_conf"] >= ORIENTATION_MIN_CONFIDENCE else 0
+    timings.note("script", script)
+    timings.note("rotate", rotate)
+    if rotate in ROTATIONS:
+        binary = cv2.rotate(binary, ROTATIONS[rotate])
+    else:
+        rotate = 0
+    return binary, language_for_script(script, backend), rotate
+
+def unrotate_box(box, rotate, shape):
+    """Map an (x, y, w, h) box on a page turned rotate degrees clockwise back
+    onto the page before the turn; shape is (height, width) of the turned page"""
+    x, y, w, h = box
+    height, width = shape
+    if rotate == 90:
+        return [y, width - x - w, h, w]
+    if rotate == 180:
+        return [width - x - w, height - y - h, w, h]
+    if rotate == 270:
+        return [height - y - h, x, h, w]
+    return [x, y, w, h]
+
+def ocr_page(image, dpi=None, timings=None, backend=None):
+    """Preprocess and OCR one page; returns its text and the regions the text came from.
+    
+    The page is turned upright and read with the language model of its
+    script first. Region boxes are in the pixel coordinates of the page as given.
+    """
+    timings = timings or StageTimings()
+    backend = backend or get_ocr_backend()
+    try:
+        binary, scale = binarize_image(image, dpi, timings)
+    except Exception as e:
+        logger.error(f"Image preprocessing error: {str(e)}")
+        with timings.stage("ocr"):
+            return backend.image_to_string(image), []
+    
+    binary, lang, rotate = orient_page(binary, timings, backend)
+    
+    rows = []
+    if OCR_LAYOUT == 'regions':
+        with timings.stage("layout"):
+            rows = detect_text_regions(binary)
+    if not rows:
+        with timings.stage("ocr"):
+            return backend.image_to_string(Image.fromarray(binary), lang=lang), []
+    
+    text, regions = ocr_regions(binary, rows, timings, backend, lang)
+    for region in regions:
+        box = unrotate_box(region["bbox"], rotate, binary.shape)
+        region["bbox"] = [round(value / scale) for value in box]
+    return text, regions
+
+def document_script(timings):
+    """Script detected on most pages of a document, None when no page had one"""
+    scripts = [script for script in timings.decisions.get("script", []) if script]
+    return max(scripts, key=scripts.count) if scripts else None
+
+def locate_fields(spans, regions):
+    """Page and box of the region each extracted field was read from"""
+    located = {}
+    for field, span in spans.items():
+        if span is None:
+            continue
+        for region in regions:
+            if region["start"] <= span[0] < region["end"]:
+                located[field] = {"page": region["page"], "bbox": region["bbox"]}
+                break
+    return located
+
+EXTRACTED_FIELDS = ("percentage", "income", "category", "name", "stream", "state")
+
+# Confidence of a field read after its label, from a specific keyword, from a bare
+# value (a % figure, a rupee amount) or from a two- or three-letter abbreviation
+LABELLED_CONFIDENCE = 0.9
+KEYWORD_CONFIDENCE = 0.8
+UNLABELLED_CONFIDENCE = 0.6
+SHORT_KEYWORD_CONFIDENCE = 0.5
+
+CATEGORY_KEYWORDS = {
+    "SC": ["scheduled caste", "scheduled castes", "sc", "s.c.", "s.c"],
+    "ST": ["scheduled tribe", "scheduled tribes", "st", "s.t.", "s.t"],
+    "OBC": ["other backward", "obc", "o.b.c", "o.b.c."],
+    "General": ["general", "gen"],
+    "Minority": ["minority", "muslim", "christian", "sikh", "buddhist", "jain"]
+}
+# Hindi names of the categories, as read from certificates
+CATEGORY_KEYWORDS_HI = {
+    "SC": ["अनुसूचित जाति"],
+    "ST": ["अनुसूचित जनजाति"],
+    "OBC": ["अन्य पिछड़ा वर्ग", "पिछड़ा वर्ग"],
+    "General": ["सामान्य"],
+    "Minority": ["अल्पसंख्यक"]
+}
+STREAM_KEYWORDS = {
+    "Science": ["science", "pcm", "pcb", "physics", "chemistry"],
+    "Commerce": ["commerce", "accountancy", "business"],
+    "Arts": ["arts", "humanities", "history", "geography"],
+    "Engineering": ["engineering", "b.tech", "btech"],
+    "Medical": ["medical", "mbbs", "medicine"]
+}
+# Labels a percentage (or a CGPA, converted) is read after
+PERCENTAGE_LABELS = ("percentage", "aggregate", "total marks", "marks", "marks obtained", "cgpa", "sgpa", "gpa")
+# Extraction focuses on West Bengal, plus the north-eastern states with schemes of their own
+STATE_KEYWORDS = {
+    "West Bengal": ["west bengal", "wb", "kolkata", "bengal",
+                    # Bengali and Hindi, as read from certificates in those scripts
+                    "পশ্চিমবঙ্গ", "পশ্চিম বঙ্গ", "কলকাতা", "पश्चिम बंगाल", "कोलकाता"],
+    "Arunachal Pradesh": ["arunachal pradesh", "arunachal"],
+    "Assam": ["assam", "guwahati"],
+    "Manipur": ["manipur", "imphal"],
+    "Meghalaya": ["meghalaya", "shillong"],
+    "Mizoram": ["mizoram", "aizawl"],
+    "Nagaland": ["nagaland", "kohima"],
+    "Sikkim": ["sikkim", "gangtok"],
+    "Tripura": ["tripura", "agartala"]
+}
+# Amounts written in lakhs: "2.5 lakh", "3 lacs", "3 लाख"
+LAKH = r'[ \t]*(?:lakhs?|lacs?|लाख)'
+LAKH_SUFFIX = re.compile(LAKH + '$', re.IGNORECASE)
+
+def parse_amount(text):
+    """Rupees in an amount as written: 250000, 2,50,000 or 2.5 lakh"""
+    number, lakhs = LAKH_SUFFIX.subn("", text)
+    value = float(number.replace(",", ""))
+    return int(round(value * 100000)) if lakhs else int(value)
+
+def _normalize_keyword(text):
+    return " ".join(text.lower().split())
+
+def _keyword_pattern(keywords):
+    """Regex alternation of keywords folded into a prefix trie.
+    
+    re tries alternatives one by one, so "science|sc|scheduled caste" costs a
+    branch per keyword at every position; as a trie it costs a branch per
+    distinct next character. Spaces match any run of whitespace.
+    """
+    root = {}
+    for keyword in {_normalize_keyword(k) for k in keywords}:
+        node = root
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def render(node):
+        branches = [(r"\s+" if char == " " else re.escape(char)) + render(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{pattern})?" if "" in node else pattern
+    
+    return render(root)
+
+class FieldExtractor:
+    """Single-pass extractor of profile fields from OCR text.
+    
+    Every label pattern, bare value and keyword is one alternative of a single
+    compiled regex, scanned over the text once. Keywords only match as whole
+    words, so "st" no longer fires inside "student" nor "sc" inside "school",
+    and not in "B.Sc" or "St. Xavier's" either. Each match is a candidate with
+    a confidence; a field takes its most confident candidate, the earliest one
+    on ties. It costs about as much as the cascade of searches it replaced;
+    what it buys is accuracy.
+    """
+    
+    # Word boundaries that also hold next to dotted abbreviations like "s.c."
+    START = r'(?<![A-Za-z0-9])'
+    END = r'(?![A-Za-z0-9])'
+    SEP = r'\s*[:\-]?\s*'
+    # A bare keyword is not the tail of a dotted abbreviation ("sc" in "B.Sc"),
+    # nor "st" naming a saint ("St. Xavier's", "St Paul's")
+    NOT_ABBREVIATION = r"(?<![A-Za-z]\.)(?!st(?:\.\s*[a-z]|\s+[a-z]+'s))"
+    NUMBER = r'\d+(?:\.\d+)?'
+    # 2.5 lakh, then 250000, 250,000 and the Indian grouping 2,50,000
+    AMOUNT = rf'\d+(?:\.\d+)?{LAKH}|\d{{1,3}}(?:,\d{{2,3}})+|\d+'
+    
+    def __init__(self, tables):
+        self.keywords = {}
+        for field, table in tables.items():
+            for value, keywords in table.items():
+                for keyword in keywords:
+                    self.keywords[_normalize_keyword(keyword)] = (field, value)
+        
+        def field_keywords(field):
+            return _keyword_pattern(k for keywords in tables[field].values() for k in keywords)
+        
+        S, E, SEP, NUMBER, AMOUNT = self.START, self.END, self.SEP, self.NUMBER, self.AMOUNT
+        rupee = rf"(?:₹|{S}(?:rs\.?|inr))"
+        # A labelled value that is not a known keyword ("Stream: General Studies") is
+        # consumed, so its words are not read as keywords of another field
+        OTHER = r"[A-Za-z]+(?:[ \t]+[A-Za-z]+)?"
+        name_value = (rf"(?P<name_v>[A-Za-z][A-Za-z.' ]*?)"
+                      rf"(?=[ \t]*(?:\n|$|{S}(?:percentage|marks|roll|father|mother|dob|class){E}))")
+        # Every alternative starts a word (or at ₹): the boundary is checked once
+        # up front, and each alternative is guarded by the characters it can start
+        # with, so a position is rejected without stepping into its branches. The
+        # name label's lookbehinds are the costliest test, so it is only reached at
+        # an n, s or c.
+        alternatives = [
+            rf"(?P<name>(?=[nsc])(?<!father's\s)(?<!mother's\s)(?<!father\s)(?<!mother\s)"
+            rf"(?:(?:(?:student|candidate)(?:'?s)?\s+name|name\s+of\s+(?:the\s+)?(?:student|candidate)|name|naam)\s*[:\-]?"
+            rf"|(?:student|candidate)\s*[:\-]){E}\s*{name_value})",
+            rf"(?P<pct>(?=[patmcsg]){_keyword_pattern(PERCENTAGE_LABELS)}{SEP}(?P<pct_v>{NUMBER})(?P<pct_sign>\s*%)?)",
+            rf"(?P<inc>(?=[afyiआ])(?:(?:annual|family|yearly)\s+)*(?:income|आय)(?:\s+per\s+annum)?(?:\s+(?:is|of))?{SEP}(?:{rupee}\s*)?"
+            rf"(?P<inc_v>{AMOUNT}){E})",
+            rf"(?P<cat>(?=c)(?:category|caste){SEP}(?P<cat_v>{field_keywords('category')}){E})",
+            rf"(?P<strm>(?=[sfbg])(?:stream|faculty|branch|group){SEP}(?:(?P<strm_v>{field_keywords('stream')}){E}|{OTHER}))",
+            rf"(?P<st>(?=[sd])(?:state|domicile){SEP}(?:(?P<st_v>{field_keywords('state')}){E}|{OTHER}))",
+            rf"(?P<pctb>(?=\d)(?P<pctb_v>{NUMBER})\s*(?:%|percent{E}|प्रतिशत))",
+            rf"(?P<gpa>(?=\d)(?P<gpa_v>\d{{1,2}}(?:\.\d+)?)[ \t]*(?:cgpa|sgpa|gpa){E})",
+            rf"(?P<incb>{rupee}\s*(?P<incb_v>{AMOUNT}){E}|(?P<incs_v>\d{{1,3}}(?:,\d{{2,3}})+|\d{{5,7}})\s*/-"
+            rf"|(?P<incl_v>{NUMBER}{LAKH}){E})",
+            rf"(?P<kw>(?=[{''.join(sorted({k[0] for k in self.keywords}))}]){self.NOT_ABBREVIATION}"
+            rf"{_keyword_pattern(self.keywords)}{E})",
+        ]
+        # Matching lowercased text case-sensitively skips re's per-character case
+        # folding; text whose length changes when lowercased is matched as is
+        pattern = rf"{S}(?:{'|'.join(alternatives)})"
+        self.pattern = re.compile(pattern)
+        self.folding_pattern = re.compile(pattern, re.IGNORECASE)
+    
+    def _candidates(self, text):
+        """(field, value, confidence, span) for every match in the text"""
+        lowered = text.lower()
+        matches = self.pattern.finditer(lowered) if len(lowered) == len(text) else self.folding_pattern.finditer(text)
+        for match in matches:
+            kind = match.lastgroup
+            if kind == "name":
+                start, end = match.span("name_v")
+                name = " ".join(text[start:end].split())
+                if len(name) > 1:
+                    yield "name", name, LABELLED_CONFIDENCE, match.span("name_v")
+            elif kind in ("pct", "pctb", "gpa"):
+                group = kind + "_v"
+                value = float(match.group(group))
+                if (kind == "gpa" or (kind == "pct" and not match.group("pct_sign"))) and value <= 10:
+                    # Convert CGPA to percentage
+                    value = round(value * 9.5, 2)
+                if value <= 100:
+                    confidence = UNLABELLED_CONFIDENCE if kind == "pctb" else LABELLED_CONFIDENCE
+                    yield "percentage", value, confidence, match.span(group)
+            elif kind in ("inc", "incb"):
+                group = "inc_v" if kind == "inc" else next(g for g in ("incb_v", "incs_v", "incl_v") if match.group(g))
+                confidence = LABELLED_CONFIDENCE if kind == "inc" else UNLABELLED_CONFIDENCE
+                yield "income", parse_amount(match.group(group)), confidence, match.span(group)
+            elif kind in ("cat", "strm", "st"):
+                group = kind + "_v"
+                if match.group(group) is None:
+                    continue
+                field, value = self.keywords[_normalize_keyword(match.group(group))]
+                yield field, value, LABELLED_CONFIDENCE, match.span(group)
+            elif kind == "kw":
+                keyword = _normalize_keyword(match.group("kw"))
+                field, value = self.keywords[keyword]
+                confidence = KEYWORD_CONFIDENCE if len(keyword) > 3 else SHORT_KEYWORD_CONFIDENCE
+                yield field, value, confidence, match.span("kw")
+    
+    def extract(self, text):
+        """Fields of the text as (data, confidence, spans) dicts keyed by field"""
+        data = {field: None for field in EXTRACTED_FIELDS}
+        confidence = {field: 0.0 for field in EXTRACTED_FIELDS}
+        spans = {field: None for field in EXTRACTED_FIELDS}
+        for field, value, score, span in self._candidates(text):
+            if score > confidence[field]:
+                data[field], confidence[field], spans[field] = value, score, span
+        return data, confidence, spans
+
+FIELD_EXTRACTOR = FieldExtractor({
+    "category": {value: keywords + CATEGORY_KEYWORDS_HI[value] for value, keywords in CATEGORY_KEYWORDS.items()},
+    "stream": STREAM_KEYWORDS,
+    "state": STATE_KEYWORDS
+})
+
+def extract_fields(text):
+    """Extract profile fields from OCR text, with a 0-1 confidence and source span for each"""
+    return FIELD_EXTRACTOR.extract(text)
+
+def extract_data(text):
+    """Enhanced data extraction with better pattern matching"""
+    data, _, _ = extract_fields(text)
+    return {field: data[field] for field in EXTRACTED_FIELDS}
+
+EARLY_EXIT_CONFIDENCE = float(os.getenv('EARLY_EXIT_CONFIDENCE', 0.8))
+EARLY_EXIT_FIELDS = ("percentage", "income", "category", "stream", "state", "name")
+
+class IncrementalExtractor:
+    """Accumulates OCR text page by page and reports when every field is settled.
+    
+    Extraction reruns over all text fed so far, so once every page has been
+    fed the result is exactly what extract_data gives for the whole document.
+    """
+    
+    def __init__(self, threshold=EARLY_EXIT_CONFIDENCE, fields=EARLY_EXIT_FIELDS):
+        self.threshold = threshold
+        self.fields = fields
+        self.text = ""
+        self.pages_fed = 0
+        self.pages_total = 0
+        self.pages_skipped = 0
+        self.data = extract_data("")
+        self.confidence = {field: 0.0 for field in self.data}
+    
+    def feed(self, page_text):
+        self.text += page_text
+        self.pages_fed += 1
+        data, self.confidence, _ = extract_fields(self.text)
+        self.data = {field: data[field] for field in self.data}
+    
+    def complete(self):
+        return all(self.confidence[field] >= self.threshold for field in self.fields)
+
+# ============================================================================
+# UPLOAD INGESTION
+# ============================================================================
+
+# Uploads up to this size stay in memory; larger ones are spooled to a temp file
+OCR_SPOOL_THRESHOLD = int(os.getenv('OCR_SPOOL_THRESHOLD', 4 * 1024 * 1024))
+# Where POSIX shared memory blocks appear as files (Linux)
+SHM_DIR = '/dev/shm'
+
+def _attach_shared_memory(name):
+    shm = shared_memory.SharedMemory(name=name)
+    # Attaching registers the block with this process's resource tracker, which
+    # would unlink it when the process exits; the uploading process owns it
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+class DocumentSource:
+    """Picklable handle on the bytes of one upload, held in shared memory or a spool file.
+    
+    OCR workers map the bytes rather than receiving a copy. The process that
+    received the upload owns them and frees them with discard().
+    """
+    
+    def __init__(self, filename, size, shm_name=None, path=None):
+        self.filename = filename
+        self.size = size
+        self.shm_name = shm_name
+        self.path = path
+    
+    @classmethod
+    def from_path(cls, path):
+        return cls(os.path.basename(path), os.path.getsize(path), path=path)
+    
+    @property
+    def is_pdf(self):
+        return self.filename.lower().endswith('.pdf')
+    
+    def filesystem_path(self):
+        """A path external tools can read the bytes from without a copy, if there is one"""
+        if self.path:
+            return self.path
+        candidate = os.path.join(SHM_DIR, self.shm_name)
+        return candidate if os.path.exists(candidate) else None
+    
+    @contextmanager
+    def open(self):
+        """The document bytes as a read-only memoryview"""
+        if self.size == 0:
+            yield memoryview(b"")
+            return
+        if self.shm_name:
+            shm = _attach_shared_memory(self.shm_name)
+            view = shm.buf[:self.size]
+            try:
+                yield view
+            finally:
+                view.release()
+                shm.close()
+        else:
+            with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+    
+    def discard(self):
+        if self.shm_name:
+            try:
+                # Only the owning process discards, so the block stays tracked until unlinked
+                shm = shared_memory.SharedMemory(name=self.shm_name)
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+class UploadBuffer:
+    """Where the multipart parser writes one uploaded file, chosen before its first byte arrives.
+    
+    Uploads whose request is at most OCR_SPOOL_THRESHOLD bytes are written
+    straight into a shared memory block; larger or unsized ones go to a named
+    temp file. The bytes are hashed as they arrive. Unless detach() hands them
+    to a DocumentSource, close() (run when the request ends) frees them.
+    """
+    
+    def __init__(self, capacity):
+        self.shm = None
+        self.file = None
+        self.size = 0
+        self.position = 0
+        self.digest = hashlib.sha256()
+        self.detached = False
+        if capacity is not None and capacity <= OCR_SPOOL_THRESHOLD:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(capacity, 1))
+        else:
+            self.file = tempfile.NamedTemporaryFile(prefix="upload-", delete=False)
+    
+    def write(self, data):
+        if self.shm:
+            self.shm.buf[self.position:self.position + len(data)] = data
+        else:
+            self.file.write(data)
+        self.digest.update(data)
+        self.position += len(data)
+        self.size = max(self.size, self.position)
+        return len(data)
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = base + offset
+        if self.file:
+            self.file.seek(self.position)
+        return self.position
+    
+    def tell(self):
+        return self.position
+    
+    def read(self, size=-1):
+        end = self.size if size is None or size < 0 else min(self.size, self.position + size)
+        if self.shm:
+            data = bytes(self.shm.buf[self.position:end])
+        else:
+            data = self.file.read(end - self.position)
+        self.position = end
+        return data
+    
+    def seekable(self):
+        return True
+    
+    def readable(self):
+        return True
+    
+    def detach(self, filename):
+        """Hand the bytes over to a DocumentSource, which from then on owns them"""
+        self.detached = True
+        if self.shm:
+            source = DocumentSource(filename, self.size, shm_name=self.shm.name)
+        else:
+            self.file.flush()
+            source = DocumentSource(filename, self.size, path=self.file.name)
+        self.close()
+        
+        exposed = source.filesystem_path() if source.shm_name else None
+        if exposed:
+            # The block was sized for the whole request body; trim it so tools
+            # reading it as a file see exactly the upload
+            os.truncate(exposed, self.size)
+        return source
+    
+    def close(self):
+        if self.shm:
+            self.shm.close()
+            if not self.detached:
+                self.shm.unlink()
+            self.shm = None
+        if self.file:
+            self.file.close()
+            if not self.detached:
+                os.remove(self.file.name)
+            self.file = None
+    
+    @property
+    def closed(self):
+        return self.shm is None and self.file is None
+
+class UploadRequest(FlaskRequest):
+    """Request that parses uploaded files into UploadBuffers"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadBuffer(total_content_length)
+
+app.request_class = UploadRequest
+
+# ============================================================================
+# OCR RESULT CACHE
+# ============================================================================
+
+# Private to the user running the app; never a shared temp directory
+APP_DATA_DIR = os.getenv('APP_DATA_DIR', os.path.join(os.path.expanduser('~'), '.scholar-connect'))
+
+def create_private_file(path):
+    """Create path, and its directory if missing, readable and writable by its owner only"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    # SQLite creates its -wal and -shm files with the database's mode
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    os.chmod(path, 0o600)
+
+OCR_CACHE_PATH = os.getenv('OCR_CACHE_PATH', os.path.join(APP_DATA_DIR, 'ocr-cache.sqlite3'))
+# Off unless set: the cache keeps what was read from identity and income documents
+OCR_CACHE_BYTES = int(os.getenv('OCR_CACHE_BYTES', 0))
+
+class OCRResultCache:
+    """On-disk LRU cache of OCR results keyed by upload content hash and OCR settings.
+    
+    Entries live in one SQLite file, so every worker process on the host
+    shares them and SQLite's locking keeps concurrent writers consistent.
+    Only the extracted fields and their page boxes are stored, never the
+    document text, and the file is readable by its owner alone. After each
+    insert the least recently used entries are evicted until the stored
+    payloads fit in max_bytes. A max_bytes of 0 disables the cache.
+    """
+    
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            create_private_file(path)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                    " key TEXT PRIMARY KEY, payload TEXT NOT NULL,"
+                    " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ocr_cache_last_used ON ocr_cache (last_used)")
+    
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+    
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+    
+    @staticmethod
+    def key(digest, config_version):
+        return f"{config_version}:{digest}"
+    
+    def get(self, key):
+        if not self.enabled:
+            return None
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT payload FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                if row:
+                    conn.execute("UPDATE ocr_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        finally:
+            conn.close()
+        
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+    
+    def put(self, key, result):
+        if not self.enabled:
+            return
+        payload = json.dumps(result)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO ocr_cache (key, payload, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, payload, len(payload.encode('utf-8')), time.time())
+                )
+                # Keep the most recently used entries whose running size fits the budget
+                conn.execute(
+                    "DELETE FROM ocr_cache WHERE key IN ("
+                    " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS running"
+                    " FROM ocr_cache) WHERE running > ?)",
+                    (self.max_bytes,)
+                )
+        finally:
+            conn.close()
+    
+    def clear(self):
+        if not self.enabled:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM ocr_cache")
+        finally:
+            conn.close()
+    
+    def stats(self):
+        entries, size = 0, 0
+        if self.enabled:
+            conn = self._connect()
+            try:
+                entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()
+            finally:
+                conn.close()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+OCR_CACHE = OCRResultCache(OCR_CACHE_PATH, OCR_CACHE_BYTES)
+
+# ============================================================================
+# OCR JOB PIPELINE
+# ============================================================================
+
+def _available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+# Gunicorn workers on the host; each one runs its own OCR pool
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', max(1, _available_cores() // WEB_CONCURRENCY)))
+OCR_QUEUE_SIZE = int(os.getenv('OCR_QUEUE_SIZE', OCR_WORKERS * 4))
+OCR_JOB_TTL = int(os.getenv('OCR_JOB_TTL', 3600))
+# "memory" keeps job state in the worker running the job; "sqlite" shares it
+# through OCR_JOB_PATH, so any worker can answer /jobs/<id> and its events
+OCR_JOB_STORE = os.getenv('OCR_JOB_STORE', 'sqlite' if WEB_CONCURRENCY > 1 else 'memory')
+OCR_JOB_PATH = os.getenv('OCR_JOB_PATH', os.path.join(APP_DATA_DIR, 'ocr-jobs.sqlite3'))
+# Seconds between checks for new events of a job running in another worker
+OCR_JOB_POLL = float(os.getenv('OCR_JOB_POLL', 0.5))
+# Bounds rasterized PDF pages held by one job's pool tasks at a time
+OCR_PAGES_IN_FLIGHT = int(os.getenv('OCR_PAGES_IN_FLIGHT', OCR_WORKERS * PDF_PAGE_WINDOW))
+# Stop OCRing a PDF once every profile field has been found with enough confidence
+OCR_EARLY_EXIT = os.getenv('OCR_EARLY_EXIT', '1') == '1'
+# Bump when preprocessing or extraction changes what a given upload produces
+OCR_PIPELINE_VERSION = 6
+
+def _ocr_config_version():
+    """Short hash of every setting that changes OCR output, used in OCR cache keys"""
+    backend = resolve_ocr_backend_name()
+    try:
+        # Installing a language model changes which pages are read with it
+        if backend == "tesserocr":
+            tesseract = tesserocr.tesseract_version().splitlines()[0]
+            languages = sorted(tesserocr.get_languages()[1])
+        else:
+            tesseract = str(pytesseract.get_tesseract_version())
+            languages = sorted(pytesseract.get_languages())
+    except Exception:
+        tesseract, languages = "unknown", []
+    settings = {
+        "pipeline": OCR_PIPELINE_VERSION,
+        "tesseract": tesseract,
+        "backend": backend,
+        "preprocess": [PREPROCESS_TARGET_DPI, PREPROCESS_MAX_UPSCALE, PREPROCESS_DENOISE,
+                       NOISE_SKIP_BELOW, NOISE_FULL_ABOVE],
+        "lang": OCR_LANG,
+        "languages": languages,
+        "script_detection": [OCR_SCRIPT_DETECTION, SCRIPT_DETECT_DPI, SCRIPT_MIN_CONFIDENCE,
+                             ORIENTATION_MIN_CONFIDENCE, SCRIPT_LANGUAGES],
+        "dpi": PDF_DPI,
+        "layout": OCR_LAYOUT,
+        "early_exit": OCR_EARLY_EXIT,
+        "early_exit_confidence": EARLY_EXIT_CONFIDENCE
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+OCR_CONFIG_VERSION = _ocr_config_version()
+
+def decode_image(buffer):
+    """Decode an uploaded image held in memory into a grayscale array"""
+    # np.frombuffer wraps the buffer without copying it
+    image = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        # OpenCV cannot decode GIFs; PIL can
+        with Image.open(io.BytesIO(buffer)) as pil_image:
+            image = np.asarray(pil_image.convert('L'))
+    return image
+
+def ocr_image(source):
+    """Preprocess and OCR one uploaded image (runs in the OCR pool); returns text, regions and StageTimings"""
+    timings = StageTimings()
+    with timings.stage("decode"):
+        with source.open() as view:
+            image = decode_image(view)
+    text, regions = ocr_page(image, timings=timings)
+    return text, [dict(region, page=1) for region in regions], timings
+
+class OCRQueueFull(Exception):
+    """Raised when the OCR pool already holds OCR_QUEUE_SIZE unfinished jobs"""
+
+class SQLiteJobLog:
+    """Events of OCR jobs in one SQLite file, shared by every worker process on the host.
+    
+    The worker running a job appends each of its events; any worker can read
+    a job's latest state or the events after the ones it has already sent.
+    A job is dropped once its last event is older than ttl seconds. Each
+    thread keeps its own connection.
+    """
+    
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        create_private_file(path)
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS ocr_job_events ("
+                    " job_id TEXT NOT NULL, seq INTEGER NOT NULL, payload TEXT NOT NULL,"
+                    " updated REAL NOT NULL, PRIMARY KEY (job_id, seq))"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ocr_job_events_updated ON ocr_job_events (updated)")
+        finally:
+            conn.close()
+    
+    def _connect(self):
+        # Opened lazily per thread, so a worker forked after import never shares one
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def append(self, job_id, seq, event):
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT INTO ocr_job_events (job_id, seq, payload, updated) VALUES (?, ?, ?, ?)",
+                         (job_id, seq, json.dumps(event, ensure_ascii=False), time.time()))
+    
+    def latest(self, job_id):
+        row = self._connect().execute(
+            "SELECT payload FROM ocr_job_events WHERE job_id = ? ORDER BY seq DESC LIMIT 1", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def events(self, job_id, after):
+        """Events of a job from sequence number after on"""
+        rows = self._connect().execute(
+            "SELECT payload FROM ocr_job_events WHERE job_id = ? AND seq >= ? ORDER BY seq", (job_id, after))
+        return [json.loads(payload) for payload, in rows]
+    
+    def prune(self):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM ocr_job_events WHERE job_id IN ("
+                " SELECT job_id FROM ocr_job_events GROUP BY job_id HAVING MAX(updated) < ?)",
+                (time.time() - self.ttl,)
+            )
+
+class OCRJob:
+    """State and progress events of one asynchronous OCR job"""
+    
+    TERMINAL = ("completed", "failed")
+    
+    def __init__(self, filename, source, cache_key=None, log=None):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.source = source
+        self.cache_key = cache_key
+        self.log = log
+        self.status = "queued"
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.updated = self.created
+        self.events = []
+        self.changed = threading.Condition()
+        self._publish()
+    
+    def _publish(self):
+        with self.changed:
+            self.updated = time.time()
+            event = self.to_dict()
+            if self.log is not None:
+                self.log.append(self.id, len(self.events), event)
+            self.events.append(event)
+            self.changed.notify_all()
+    
+    def update(self, status, result=None, error=None, progress=None):
+        self.status = status
+        self.progress = progress
+        self.result = result
+        self.error = error
+        self._publish()
+    
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created": datetime.fromtimestamp(self.created).isoformat(),
+            "updated": datetime.fromtimestamp(self.updated).isoformat()
+        }
+
+class OCRJobManager:
+    """Runs OCR jobs on a bounded process pool and tracks their state.
+    
+    The pool is created on first use with OCR_WORKERS processes, the host's
+    cores split between its gunicorn workers. Jobs beyond OCR_QUEUE_SIZE
+    unfinished ones are refused, so slow OCR backs up into 503 responses
+    instead of an unbounded queue. Each job is driven by a coordinator
+    thread, which lets a PDF fan its pages out across the pool. With a
+    SQLiteJobLog, jobs run by other workers can be looked up and followed.
+    """
+    
+    def __init__(self, workers, queue_size, job_ttl, log=None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.job_ttl = job_ttl
+        self.log = log
+        self.jobs = {}
+        self._pool = None
+        self._coordinators = ThreadPoolExecutor(max_workers=queue_size, thread_name_prefix="ocr-job")
+        self._lock = threading.Lock()
+    
+    def _executor(self):
+        if self._pool is None:
+            # spawn works the same on every platform and never forks a threaded server
+            context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._pool
+    
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id in [j.id for j in self.jobs.values() if j.status in OCRJob.TERMINAL and j.updated < cutoff]:
+            del self.jobs[job_id]
+        if self.log is not None:
+            self.log.prune()
+    
+    def pending(self):
+        return sum(1 for job in self.jobs.values() if job.status not in OCRJob.TERMINAL)
+    
+    def submit(self, filename, source, digest=None):
+        """Queue a DocumentSource for OCR, or complete it at once from the OCR cache when digest is known.
+        
+        The job takes ownership of the source and discards it when done.
+        """
+        cache_key = OCRResultCache.key(digest, OCR_CONFIG_VERSION) if digest else None
+        cached = OCR_CACHE.get(cache_key) if cache_key else None
+        
+        with self._lock:
+            self._prune()
+            if cached is None and self.pending() >= self.queue_size:
+                raise OCRQueueFull(f"OCR queue is full ({self.queue_size} jobs pending)")
+            
+            job = OCRJob(filename, source, cache_key, self.log)
+            self.jobs[job.id] = job
+            if cached is None:
+                self._coordinators.submit(self._run, job)
+        
+        if cached is not None:
+            try:
+                self._complete(job, cached, cached=True)
+            except Exception as e:
+                logger.error(f"OCR job {job.id} failed: {str(e)}")
+                job.update("failed", error=str(e))
+            finally:
+                source.discard()
+        return job
+    
+    def _ocr(self, job):
+        """Run a job's OCR on the pool; returns (fields, field regions and pages skipped, StageTimings)"""
+        executor = self._executor()
+        regions = []
+        pages_skipped = 0
+        if job.source.is_pdf:
+            def report(pages_done, pages_total):
+                job.update("processing", progress={"pages_done": pages_done, "pages_total": pages_total})
+            extractor = IncrementalExtractor() if OCR_EARLY_EXIT else None
+            timings = StageTimings()
+            text = process_pdf(job.source, executor=executor, pages_in_flight=OCR_PAGES_IN_FLIGHT,
+                               on_progress=report, extractor=extractor, timings=timings, regions=regions)
+            if extractor is not None:
+                pages_skipped = extractor.pages_skipped
+        else:
+            text, regions, timings = executor.submit(ocr_image, job.source).result()
+        
+        data, _, spans = extract_fields(text)
+        return {
+            "extracted_data": dict({field: data[field] for field in EXTRACTED_FIELDS}, script=document_script(timings)),
+            "field_regions": locate_fields(spans, regions),
+            "pages_skipped": pages_skipped
+        }, timings
+    
+    def _complete(self, job, ocr, cached, timings=None):
+        extracted = ocr["extracted_data"]
+        result = match_profile(extracted)
+        job.update("completed", result={
+            "extracted_data": extracted,
+            "field_regions": ocr["field_regions"],
+            "pages_skipped": ocr["pages_skipped"],
+            "cached": cached,
+            "preprocessing": timings.to_dict() if timings else None,
+            "matched_scholarships": result["matched"],
+            "total_matches": result["statistics"]["total_scholarships"],
+            "statistics": result["statistics"],
+            "catalog_version": result["catalog_version"]
+        })
+    
+    def _run(self, job):
+        try:
+            ocr, timings = self._ocr(job)
+            if job.cache_key:
+                OCR_CACHE.put(job.cache_key, ocr)
+            self._complete(job, ocr, cached=False, timings=timings)
+        except BrokenProcessPool as e:
+            # A crashed worker poisons the whole pool; start a fresh one for later jobs
+            with self._lock:
+                self._pool = None
+            logger.error(f"OCR job {job.id} failed: {str(e)}")
+            job.update("failed", error="OCR worker crashed")
+        except Exception as e:
+            logger.error(f"OCR job {job.id} failed: {str(e)}")
+            job.update("failed", error=str(e))
+        finally:
+            job.source.discard()
+    
+    def get(self, job_id):
+        """Current state of a job as a dict, or None for an unknown job"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self.log.latest(job_id) if self.log is not None else None
+    
+    def follow(self, job_id, keepalive=15):
+        """Yield each batch of a job's events, [] after keepalive idle seconds, until a terminal one"""
+        job = self.jobs.get(job_id)
+        sent = 0
+        while True:
+            if job is not None:
+                with job.changed:
+                    if sent == len(job.events):
+                        job.changed.wait(timeout=keepalive)
+                    events = job.events[sent:]
+            else:
+                # Run by another worker: poll the shared log
+                deadline = time.monotonic() + keepalive
+                events = self.log.events(job_id, sent)
+                while not events and time.monotonic() < deadline:
+                    time.sleep(OCR_JOB_POLL)
+                    events = self.log.events(job_id, sent)
+            
+            sent += len(events)
+            yield events
+            if events and events[-1]["status"] in OCRJob.TERMINAL:
+                return
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "backend": resolve_ocr_backend_name(),
+                "queue_size": self.queue_size,
+                "pages_in_flight": OCR_PAGES_IN_FLIGHT,
+                "pending": self.pending(),
+                "tracked_jobs": len(self.jobs),
+                "job_store": "sqlite" if self.log is not None else "memory"
+            }
+
+def create_ocr_job_log(name=None):
+    """Instantiate the shared job log a setting (default OCR_JOB_STORE) selects; "memory" needs none"""
+    name = name or OCR_JOB_STORE
+    if name == "memory":
+        return None
+    if name == "sqlite":
+        return SQLiteJobLog(OCR_JOB_PATH, OCR_JOB_TTL)
+    raise ValueError(f"Unknown OCR job store: {name}")
+
+OCR_JOBS = OCRJobManager(OCR_WORKERS, OCR_QUEUE_SIZE, OCR_JOB_TTL, create_ocr_job_log())
+
+app.secret_key = os.getenv('SESSION_SECRET', 'fallback-secret-key')
+
+# OAuth Configuration
+CLIENT_CONFIG = {
+    "web": {
+        "client_id": os.getenv('GOOGLE_CLIENT_ID'),
+        "client_secret": os.getenv('GOOGLE_CLIENT_SECRET'),
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "redirect_uris": [os.getenv('GOOGLE_REDIRECT_URI', 'http://localhost:5000/auth/callback')]
+    }
+}
+
+SCOPES = ['https://www.googleapis.com/auth/gmail.send']
+
+# Store login codes and OAuth tokens
+login_codes = {}
+user_tokens = {}
+
+# ============================================================================
+# CONVERSATION STORE
+# ============================================================================
+
+# "memory" keeps conversations in each worker process; "sqlite" shares them
+# between the workers on a host through CONVERSATION_PATH
+CONVERSATION_STORE = os.getenv('CONVERSATION_STORE', 'memory')
+CONVERSATION_PATH = os.getenv('CONVERSATION_PATH', os.path.join(APP_DATA_DIR, 'conversations.sqlite3'))
+CONVERSATION_MAX_ENTRIES = int(os.getenv('CONVERSATION_MAX_ENTRIES', 10000))
+CONVERSATION_MAX_BYTES = int(os.getenv('CONVERSATION_MAX_BYTES', 16 * 1024 * 1024))
+# Seconds a conversation is kept after its last message
+CONVERSATION_TTL = int(os.getenv('CONVERSATION_TTL', 1800))
+# Messages kept per conversation
+CONVERSATION_HISTORY = 10
+
+class ConversationStore(ABC):
+    """Chatbot conversations keyed by user id.
+    
+    A conversation is a JSON object holding the user's recent messages. Stores
+    are bounded by entries and bytes, evict the least recently used
+    conversation when full and drop one left idle for ttl seconds.
+    """
+    
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = self.expirations = 0
+    
+    @staticmethod
+    def _serialize(user_id, conversation):
+        """(payload, size) of a conversation; the size counts the key too"""
+        payload = json.dumps(conversation, ensure_ascii=False)
+        return payload, len(user_id.encode('utf-8')) + len(payload.encode('utf-8'))
+    
+    @abstractmethod
+    def get(self, user_id):
+        """The user's conversation, or None when there is none or it expired"""
+    
+    @abstractmethod
+    def put(self, user_id, conversation):
+        """Store the user's conversation, evicting others to stay within bounds"""
+    
+    @abstractmethod
+    def clear(self):
+        """Drop every conversation"""
+    
+    @abstractmethod
+    def stats(self):
+        """Occupancy and hit counters, as reported by /stats/cache"""
+    
+    def append(self, user_id, message):
+        """Add a message to the user's conversation, keeping the latest CONVERSATION_HISTORY"""
+        conversation = self.get(user_id) or {"messages": []}
+        conversation["messages"] = (conversation["messages"] + [message])[-CONVERSATION_HISTORY:]
+        self.put(user_id, conversation)
+        return conversation
+    
+    def _stats(self, backend, entries, size):
+        lookups = self.hits + self.misses
+        return {
+            "backend": backend,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+class MemoryConversationStore(ConversationStore):
+    """Conversations held by this process, safe to share between threads.
+    
+    Conversations are kept serialized, so their size is known and callers never
+    share a mutable copy. Every read or write renews a conversation's TTL and
+    moves it to the back, so the least recently used one is also the first
+    to expire and both expiry and eviction trim from the front.
+    """
+    
+    def __init__(self, max_entries, max_bytes, ttl):
+        super().__init__(max_entries, max_bytes, ttl)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def _discard(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+    
+    def _expire(self, now):
+        while self._entries:
+            user_id, (last_used, _, _) = next(iter(self._entries.items()))
+            if last_used + self.ttl > now:
+                break
+            self._discard(user_id)
+            self.expirations += 1
+    
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries[user_id] = (now, *entry[1:])
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+        return json.loads(entry[2])
+    
+    def put(self, user_id, conversation):
+        payload, size = self._serialize(user_id, conversation)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._discard(user_id)
+            if size > self.max_bytes:
+                return
+            self._entries[user_id] = (now, size, payload)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self):
+        with self._lock:
+            return self._stats("memory", len(self._entries), self._bytes)
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversations in one SQLite file, shared by every worker process on the host.
+    
+    Triggers keep running totals of entries and bytes, so a write checks the
+    bounds without scanning the table, and expired or least recently used
+    rows are found through the last_used index. Each thread keeps its own
+    connection. Hit and eviction counters are per process.
+    """
+    
+    def __init__(self, path, max_entries, max_bytes, ttl):
+        super().__init__(max_entries, max_bytes, ttl)
+        self.path = path
+        self._local = threading.local()
+        # Conversations quote users' marks, income and category
+        create_private_file(path)
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS conversations (
+                        user_id TEXT PRIMARY KEY, payload TEXT NOT NULL,
+                        size INTEGER NOT NULL, last_used REAL NOT NULL);
+                    CREATE INDEX IF NOT EXISTS conversations_last_used ON conversations (last_used);
+                    CREATE TABLE IF NOT EXISTS conversation_totals (
+                        id INTEGER PRIMARY KEY CHECK (id = 0),
+                        entries INTEGER NOT NULL, bytes INTEGER NOT NULL);
+                    INSERT OR IGNORE INTO conversation_totals
+                        SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM conversations;
+                    CREATE TRIGGER IF NOT EXISTS conversations_insert AFTER INSERT ON conversations BEGIN
+                        UPDATE conversation_totals SET entries = entries + 1, bytes = bytes + NEW.size; END;
+                    CREATE TRIGGER IF NOT EXISTS conversations_delete AFTER DELETE ON conversations BEGIN
+                        UPDATE conversation_totals SET entries = entries - 1, bytes = bytes - OLD.size; END;
+                    CREATE TRIGGER IF NOT EXISTS conversations_resize AFTER UPDATE OF size ON conversations BEGIN
+                        UPDATE conversation_totals SET bytes = bytes - OLD.size + NEW.size; END;
+                """)
+        finally:
+            conn.close()
+    
+    def _connect(self):
+        # Opened lazily per thread, so a worker forked after import never shares one
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            # WAL stays consistent on a crash at NORMAL; a lost last message is acceptable
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def get(self, user_id):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            row = conn.execute("SELECT payload FROM conversations WHERE user_id = ? AND last_used > ?",
+                               (user_id, now - self.ttl)).fetchone()
+            if row:
+                conn.execute("UPDATE conversations SET last_used = ? WHERE user_id = ?", (now, user_id))
+        
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+    
+    def put(self, user_id, conversation):
+        payload, size = self._serialize(user_id, conversation)
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            self.expirations += conn.execute("DELETE FROM conversations WHERE last_used <= ?",
+                                             (now - self.ttl,)).rowcount
+            if size > self.max_bytes:
+                conn.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
+                return
+            # An upsert, unlike INSERT OR REPLACE, fires the update trigger on the old row
+            conn.execute(
+                "INSERT INTO conversations (user_id, payload, size, last_used) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (user_id) DO UPDATE SET payload = excluded.payload,"
+                " size = excluded.size, last_used = excluded.last_used",
+                (user_id, payload, size, now)
+            )
+            entries, total = conn.execute("SELECT entries, bytes FROM conversation_totals").fetchone()
+            while entries > self.max_entries or total > self.max_bytes:
+                oldest, oldest_size = conn.execute(
+                    "SELECT user_id, size FROM conversations ORDER BY last_used LIMIT 1").fetchone()
+                conn.execute("DELETE FROM conversations WHERE user_id = ?", (oldest,))
+                entries, total = entries - 1, total - oldest_size
+                self.evictions += 1
+    
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM conversations")
+    
+    def stats(self):
+        entries, size = self._connect().execute("SELECT entries, bytes FROM conversation_totals").fetchone()
+        return self._stats("sqlite", entries, size)
+
+def create_conversation_store(name=None):
+    """Instantiate the conversation store a setting (default CONVERSATION_STORE) selects"""
+    name = name or CONVERSATION_STORE
+    if name == "memory":
+        return MemoryConversationStore(CONVERSATION_MAX_ENTRIES, CONVERSATION_MAX_BYTES, CONVERSATION_TTL)
+    if name == "sqlite":
+        return SQLiteConversationStore(CONVERSATION_PATH, CONVERSATION_MAX_ENTRIES, CONVERSATION_MAX_BYTES,
+                                       CONVERSATION_TTL)
+    raise ValueError(f"Unknown conversation store: {name}")
+
+CONVERSATIONS = create_conversation_store()
+
+# ============================================================================
+# CHATBOT
+# ============================================================================
+
+# intent: (weight, keywords). A query scores each intent whose keywords it
+# contains by that intent's weight. Question topics outweigh the West Bengal intent, so "documents
+# for West Bengal" gets the checklist, while the Kanyashree guide covers that
+# scheme's documents and process and outweighs them. Ties go to the intent
+# listed first.
+CHATBOT_INTENTS = {
+    "kanyashree": (3.0, ["kanyashree", "kanyasree", "kanyashri", "k1", "k2"]),
+    "eligibility": (2.0, ["eligible", "eligibility", "qualify", "can i get"]),
+    "documents": (2.0, ["document", "documents", "certificate", "certificates", "paper", "papers"]),
+    "deadlines": (2.0, ["deadline", "deadlines", "last date", "due date", "closing date", "when is"]),
+    "apply": (2.0, ["apply", "how to", "process", "application", "register"]),
+    "west_bengal": (1.5, ["west bengal", "wb", "bengal", "kolkata"]),
+    "scholarships": (1.0, ["scholarship", "scholarships", "amount", "money"])
+}
+# Reply for queries that match no intent
+DEFAULT_INTENT = "help"
+
+class IntentRouter:
+    """Routes a chatbot query to an intent with one scan of the query.
+    
+    The keywords of every intent are one compiled alternation matched on word
+    boundaries, so "wb" no longer fires inside another word. An intent with
+    any keyword in the query scores its weight, once however many of its
+    keywords appear, and the best-scoring intent wins.
+    """
+    
+    def __init__(self, intents):
+        self.weights = {intent: weight for intent, (weight, _) in intents.items()}
+        self.keywords = {}
+        for intent, (_, keywords) in intents.items():
+            for keyword in keywords:
+                self.keywords[_normalize_keyword(keyword)] = intent
+        self.pattern = re.compile(rf"(?<!\w){_keyword_pattern(self.keywords)}(?!\w)", re.IGNORECASE)
+    
+    def scores(self, query):
+        """Score of every intent with at least one keyword in the query"""
+        scores = {}
+        for match in self.pattern.finditer(query):
+            intent = self.keywords[_normalize_keyword(match.group())]
+            scores[intent] = self.weights[intent]
+        return scores
+    
+    def route(self, query):
+        """Best-scoring intent of the query, DEFAULT_INTENT when nothing matches"""
+        scores = self.scores(query)
+        if not scores:
+            return DEFAULT_INTENT
+        return max(self.weights, key=lambda intent: scores.get(intent, 0.0))
+
+CHATBOT_ROUTER = IntentRouter(CHATBOT_INTENTS)
+
+# Reply templates per language and intent, filled in from the catalog aggregates
+CHATBOT_TEMPLATES = {
+    "en": {
+        "west_bengal": """
+🎓 **West Bengal Scholarships**
+
+We have **6 special scholarships** for West Bengal students:
+
+**👧 For Girls:**
+• **Kanyashree K1**: ₹750/year (Class 8-12)
+• **Kanyashree K2**: ₹25,000 one-time (Age 18-19)
+
+**📚 For Higher Education:**
+• **Swami Vivekananda**: ₹15,000 (60%+ marks)
+• **Aikyashree**: ₹5,000 (Minority students)
+
+**🎯 For SC/ST:**
+• **Dr. Ambedkar Scholarship**: ₹12,000
+• **Taruner Swapna**: ₹8,000 (Technical courses)
+
+**Plus {unlisted} National Scholarships available!**
+
+👉 Enter your marks and category to find YOUR matches!
+
+Are you from West Bengal? Tell me your percentage! 😊
+""",
+        "kanyashree": """
+💝 **Kanyashree Prakalpa - Complete Guide**
+
+**K1 Scholarship (Annual):**
+• Amount: ₹750/year
+• For: Girls in Class 8-12
+• Eligibility: Must be unmarried, WB resident
+• No income limit!
+• Apply at: wbkanyashree.gov.in
+
+**K2 Scholarship (One-time):**
+• Amount: ₹25,000 (one-time)
+• For: Girls aged 18-19
+• Eligibility: Class 12 passed, enrolled in degree/diploma
+• Must be unmarried
+
+**Documents Needed:**
+✓ Aadhaar Card
+✓ Bank Account (girl's name)
+✓ School/College Certificate
+✓ Age Proof
+
+**Apply Online:**
+1. Visit wbkanyashree.gov.in
+2. Register with mobile/email
+3. Fill application
+4. Upload documents
+5. Submit!
+
+Money credited directly to bank! 💰
+""",
+        "scholarships": """
+🎓 **{total} Scholarships Available!**
+
+**West Bengal Special ({wb_count}):**
+💰 Kanyashree K2: ₹25,000
+💰 Swami Vivekananda: ₹15,000
+💰 Dr. Ambedkar (WB): ₹12,000
+
+**National High-Value:**
+💰 Central Sector SC: ₹2,00,000
+💰 INSPIRE: ₹80,000
+💰 AICTE Pragati: ₹50,000
+
+**By Category:**
+• SC/ST: {sc_st} scholarships
+• OBC: {obc} scholarships
+• General: {general} scholarships
+• Girls Special: 4 scholarships
+
+📝 **Tell me:**
+1. Your percentage/marks
+2. Your category (SC/ST/OBC/General)
+3. Your state
+
+I'll find perfect matches for YOU! 🎯
+""",
+        "eligibility": """
+✅ **Quick Eligibility Check**
+
+Tell me these 3 things:
+
+1️⃣ **Your Percentage** (e.g., 75%, 8.5 CGPA)
+2️⃣ **Family Income** (Annual, in ₹)
+3️⃣ **Your Category** (SC/ST/OBC/General/Minority)
+
+**Example:**
+"I have 72% marks, income is 3 lakh, OBC category"
+
+Then I'll instantly show you:
+✓ All scholarships you qualify for
+✓ Amount you can get
+✓ Deadlines
+✓ Documents needed
+
+**Quick Tips:**
+• 50%+ = Eligible for 12+ scholarships
+• 60%+ = Eligible for 18+ scholarships
+• 80%+ = Eligible for ALL scholarships!
+
+What's your percentage? 📊
+""",
+        "apply": """
+📝 **How to Apply - Step by Step**
+
+**Step 1: Check Eligibility** ✅
+• Find scholarships matching your profile
+• Note down required percentage & income
+
+**Step 2: Gather Documents** 📄
+Common documents needed:
+• Latest Marksheet
+• Income Certificate (Tehsildar)
+• Caste Certificate (if SC/ST/OBC)
+• Aadhaar Card
+• Bank Passbook (front page)
+• Passport photo
+
+**Step 3: Register on Portal** 👤
+• Visit scholarships.gov.in
+• Click "New Registration"
+• Use email/mobile to create account
+• Save Application ID & Password
+
+**Step 4: Fill Application** ✍️
+• Login to portal
+• Select your scholarship
+• Fill details carefully
+• Double-check spelling
+• Use CAPITAL LETTERS for name
+
+**Step 5: Upload Documents** 📤
+• Scan documents clearly
+• PDF/JPG format only
+• Max 200KB per file
+• All documents mandatory
+
+**Step 6: Submit & Track** 📍
+• Review before final submit
+• Take screenshot of confirmation
+• Note Application ID
+• Check status weekly
+
+**Timeline:**
+Application → 1-2 months verification → 3-6 months payment
+
+Need help with specific step? Ask me! 🤗
+""",
+        "documents": """
+📄 **Complete Document Checklist**
+
+**Academic Documents:**
+✓ Latest Marksheet (attested)
+✓ Previous year marksheet
+✓ School/College ID card
+✓ Admission letter (for new students)
+
+**Income Proof (Choose ONE):**
+✓ Income Certificate from Tehsildar ⭐
+✓ ITR (Income Tax Return)
+✓ Salary slips (last 6 months)
+✓ Ration Card
+
+**Category Certificate:**
+✓ SC/ST Certificate (lifetime valid)
+✓ OBC Certificate (valid 1 year only!)
+✓ OBC Non-Creamy Layer Certificate
+✓ EWS Certificate (valid 1 year)
+✓ Minority Certificate
+
+**Identity Proof:**
+✓ Aadhaar Card (mandatory!)
+✓ Bank Passbook (student's name)
+✓ Passport size photo (recent)
+
+**Where to Get Income Certificate:**
+📍 Tehsil Office / SDO Office
+⏱️ Processing: 7-15 days
+💰 Fee: ₹20-50
+📋 Needed: Ration card, voter ID, self-declaration
+
+**Pro Tips:**
+• Get OBC certificate renewed yearly
+• Income certificate valid for 6 months
+• Keep multiple photocopies
+• Scan all documents in advance
+
+Which document you need help with? 😊
+""",
+        "deadlines": """
+📅 **Important Deadlines 2025-26**
+
+**🔴 URGENT (Within 1 Month):**
+• **AICTE Pragati**: 31 Oct 2025
+• **PMSS**: 15 Oct 2025
+• **National Merit**: 31 Oct 2025
+• **Swami Vivekananda**: 31 Oct 2025
+
+**🟡 CLOSING SOON (Within 3 Months):**
+• **NMMS**: 30 Nov 2025
+• **Kanyashree K1**: 30 Nov 2025
+
+**🟢 OPEN NOW:**
+• **NSP Scholarships**: 31 Dec 2025
+• **Post-Matric SC/ST**: 31 Dec 2025
+• **INSPIRE**: 31 Dec 2025
+• **OBC Scholarship**: 15 Jan 2026
+• **Kanyashree K2**: 30 Jun 2026
+
+**⚠️ Pro Tips:**
+• Apply at least 15 days before deadline
+• Portal gets slow on last day
+• Keep documents ready NOW
+• Don't wait for last minute!
+
+Upload your marksheet to see YOUR personalized deadlines! ⏰
+""",
+        "help": """
+👋 **Hi! I'm your EduFund Scholarship Assistant!**
+
+I specialize in **West Bengal & National Scholarships**!
+
+**I can help you with:**
+
+🎓 **Find Scholarships**
+• Based on your marks
+• Based on your category
+• Based on your state
+
+📋 **Application Help**
+• What documents needed
+• How to apply online
+• Step-by-step guide
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+📅 **Important Dates**
+• Deadlines
+• Application windows
 
-# Set Tesseract path
-import platform
-if platform.system() == "Windows":
-    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-elif platform.system() == "Darwin":
-    if os.path.exists('/opt/homebrew/bin/tesseract'):
-        pytesseract.pytesseract.tesseract_cmd = '/opt/homebrew/bin/tesseract'
+💡 **Special Focus:**
+• West Bengal scholarships
+• Kanyashree (K1 & K2)
+• SC/ST/OBC schemes
+• Girls' scholarships
 
-# Conversation history
-conversation_history = {}
+**Quick Start:**
+Just tell me:
+"I have X% marks, Y income, Z category"
 
-# ============================================================================
-# REAL SCHOLARSHIP DATABASE - ACCURATE DATA
-# ============================================================================
+Or ask:
+• "Show West Bengal scholarships"
+• "How to apply for Kanyashree?"
+• "What documents do I need?"
+• "Check deadlines"
 
-SCHOLARSHIPS = [
-    # ==================== WEST BENGAL STATE SCHOLARSHIPS ====================
-    {
-        "id": 1,
-        "name": "Kanyashree Prakalpa (K1)",
-        "name_hi": "कन्याश्री प्रकल्प (K1)",
-        "min_percentage": 40,
-        "max_income": 999999999,  # No income limit
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 750,
-        "deadline": "30-06-2026",
-        "description": "Annual scholarship for girls in Class 8-12. ₹750/year to prevent dropout.",
-        "description_hi": "कक्षा 8-12 में लड़कियों के लिए वार्षिक छात्रवृत्ति।",
-        "apply_url": "https://wbkanyashree.gov.in",
-        "eligibility": ["Girls only", "Class 8-12", "West Bengal resident", "Unmarried"],
-        "documents": ["Aadhaar", "Bank Account", "School Certificate", "Age Proof"],
-        "eligible_streams": ["All"],
-        "states": ["West Bengal"]
-    },
-    {
-        "id": 2,
-        "name": "Kanyashree Prakalpa (K2)",
-        "name_hi": "कन्याश्री प्रकल्प (K2)",
-        "min_percentage": 45,
-        "max_income": 999999999,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 25000,
-        "deadline": "30-06-2026",
-        "description": "One-time grant for girls aged 18-19 pursuing higher education. Unmarried girls only.",
-        "description_hi": "उच्च शिक्षा प्राप्त करने वाली 18-19 वर्ष की लड़कियों के लिए एकमुश्त अनुदान।",
-        "apply_url": "https://wbkanyashree.gov.in",
-        "eligibility": ["Girls 18-19 years", "Class 12 passed", "Enrolled in degree/diploma", "Unmarried"],
-        "documents": ["Aadhaar", "Bank Account", "12th Marksheet", "College Admission Proof"],
-        "eligible_streams": ["All"],
-        "states": ["West Bengal"]
-    },
-    {
-        "id": 3,
-        "name": "Aikyashree Scholarship",
-        "name_hi": "ऐक्यश्री छात्रवृत्ति",
-        "min_percentage": 50,
-        "max_income": 250000,
-        "category": ["Minority"],
-        "amount": 5000,
-        "deadline": "31-12-2025",
-        "description": "For minority students (Muslim, Christian, Buddhist, Sikh, Jain, Parsi) in West Bengal.",
-        "description_hi": "पश्चिम बंगाल में अल्पसंख्यक छात्रों के लिए।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["Minority community", "Class 1-12", "West Bengal resident", "Income < ₹2.5 lakh"],
-        "documents": ["Minority Certificate", "Income Certificate", "Marksheet", "Aadhaar"],
-        "eligible_streams": ["All"],
-        "states": ["West Bengal"]
-    },
-    {
-        "id": 4,
-        "name": "Swami Vivekananda Merit-cum-Means Scholarship",
-        "name_hi": "स्वामी विवेकानंद मेरिट-कम-मीन्स छात्रवृत्ति",
-        "min_percentage": 60,
-        "max_income": 250000,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 15000,
-        "deadline": "31-10-2025",
-        "description": "For UG/PG students in West Bengal. Covers tuition fees up to ₹15,000.",
-        "description_hi": "पश्चिम बंगाल में UG/PG छात्रों के लिए।",
-        "apply_url": "https://svmcm.wbhed.gov.in",
-        "eligibility": ["60%+ in last exam", "UG/PG student", "Income < ₹2.5 lakh"],
-        "documents": ["Last exam marksheet", "Income Certificate", "Admission Proof"],
-        "eligible_streams": ["All"],
-        "states": ["West Bengal"]
-    },
-    {
-        "id": 5,
-        "name": "Dr. Ambedkar Post-Matric SC/ST Scholarship (WB)",
-        "name_hi": "डॉ. अम्बेडकर पोस्ट-मैट्रिक SC/ST छात्रवृत्ति",
-        "min_percentage": 50,
-        "max_income": 250000,
-        "category": ["SC", "ST"],
-        "amount": 12000,
-        "deadline": "31-12-2025",
-        "description": "West Bengal state scholarship for SC/ST students in higher education.",
-        "description_hi": "उच्च शिक्षा में SC/ST छात्रों के लिए पश्चिम बंगाल राज्य छात्रवृत्ति।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["SC/ST certificate", "Class 11+", "West Bengal domicile"],
-        "documents": ["Caste Certificate", "Income Certificate", "Marksheet", "Admission Proof"],
-        "eligible_streams": ["All"],
-        "states": ["West Bengal"]
-    },
-    {
-        "id": 6,
-        "name": "Taruner Swapna (Youth Dream) Scholarship",
-        "name_hi": "तरुणेर स्वप्न छात्रवृत्ति",
-        "min_percentage": 55,
-        "max_income": 400000,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 8000,
-        "deadline": "31-01-2026",
-        "description": "For West Bengal students pursuing technical/vocational courses.",
-        "description_hi": "तकनीकी/व्यावसायिक पाठ्यक्रमों में छात्रों के लिए।",
-        "apply_url": "https://wbhed.gov.in",
-        "eligibility": ["Technical/Vocational courses", "West Bengal resident"],
-        "documents": ["Marksheet", "Income Certificate", "Course Admission Proof"],
-        "eligible_streams": ["Engineering", "Polytechnic", "ITI"],
-        "states": ["West Bengal"]
-    },
-
-    # ==================== NATIONAL SCHOLARSHIPS ====================
-    {
-        "id": 7,
-        "name": "National Scholarship Portal - Pre-Matric SC",
-        "name_hi": "राष्ट्रीय छात्रवृत्ति पोर्टल - प्री-मैट्रिक SC",
-        "min_percentage": 50,
-        "max_income": 250000,
-        "category": ["SC"],
-        "amount": 3000,
-        "deadline": "31-10-2025",
-        "description": "For SC students in Class 9-10. Day scholars: ₹225/month, Hostellers: ₹525/month.",
-        "description_hi": "कक्षा 9-10 के SC छात्रों के लिए।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["SC certificate", "Class 9-10", "Income < ₹2.5 lakh"],
-        "documents": ["SC Certificate", "Income Certificate", "Marksheet", "Bank Details"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 8,
-        "name": "National Scholarship Portal - Pre-Matric ST",
-        "name_hi": "राष्ट्रीय छात्रवृत्ति पोर्टल - प्री-मैट्रिक ST",
-        "min_percentage": 50,
-        "max_income": 250000,
-        "category": ["ST"],
-        "amount": 3000,
-        "deadline": "31-10-2025",
-        "description": "For ST students in Class 9-10. Day scholars: ₹225/month, Hostellers: ₹525/month.",
-        "description_hi": "कक्षा 9-10 के ST छात्रों के लिए।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["ST certificate", "Class 9-10", "Income < ₹2.5 lakh"],
-        "documents": ["ST Certificate", "Income Certificate", "Marksheet", "Bank Details"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 9,
-        "name": "Post-Matric Scholarship for SC Students",
-        "name_hi": "SC छात्रों के लिए पोस्ट-मैट्रिक छात्रवृत्ति",
-        "min_percentage": 50,
-        "max_income": 250000,
-        "category": ["SC"],
-        "amount": 10000,
-        "deadline": "31-12-2025",
-        "description": "For SC students in Class 11 to PhD. Maintenance + tuition fees covered.",
-        "description_hi": "कक्षा 11 से PhD तक के SC छात्रों के लिए।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["SC certificate", "Class 11 onwards", "Income < ₹2.5 lakh"],
-        "documents": ["SC Certificate", "Income Certificate", "Admission Proof", "Bank Details"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 10,
-        "name": "Post-Matric Scholarship for ST Students",
-        "name_hi": "ST छात्रों के लिए पोस्ट-मैट्रिक छात्रवृत्ति",
-        "min_percentage": 50,
-        "max_income": 250000,
-        "category": ["ST"],
-        "amount": 10000,
-        "deadline": "31-12-2025",
-        "description": "For ST students in Class 11 to PhD. Maintenance + tuition fees covered.",
-        "description_hi": "कक्षा 11 से PhD तक के ST छात्रों के लिए।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["ST certificate", "Class 11 onwards", "Income < ₹2.5 lakh"],
-        "documents": ["ST Certificate", "Income Certificate", "Admission Proof"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 11,
-        "name": "Post-Matric Scholarship for OBC Students (Central)",
-        "name_hi": "OBC छात्रों के लिए पोस्ट-मैट्रिक छात्रवृत्ति",
-        "min_percentage": 50,
-        "max_income": 100000,
-        "category": ["OBC"],
-        "amount": 5000,
-        "deadline": "15-01-2026",
-        "description": "Central sector scheme for OBC (Non-Creamy Layer) students.",
-        "description_hi": "OBC (गैर-क्रीमी लेयर) छात्रों के लिए केंद्रीय योजना।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["OBC Non-Creamy Layer", "Class 11+", "Income < ₹1 lakh"],
-        "documents": ["OBC Certificate", "Income Certificate", "Non-Creamy Layer Certificate"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 12,
-        "name": "National Means-cum-Merit Scholarship (NMMS)",
-        "name_hi": "राष्ट्रीय मीन्स-कम-मेरिट छात्रवृत्ति",
-        "min_percentage": 55,
-        "max_income": 150000,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 12000,
-        "deadline": "30-11-2025",
-        "description": "₹12,000/year for Class 9-12. Students must pass NMMS exam conducted by state.",
-        "description_hi": "कक्षा 9-12 के लिए ₹12,000/वर्ष।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["55%+ in Class 8", "Pass NMMS test", "Income < ₹1.5 lakh"],
-        "documents": ["Class 8 Marksheet", "Income Certificate", "NMMS Pass Certificate"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 13,
-        "name": "Prime Minister's Scholarship Scheme (PMSS)",
-        "name_hi": "प्रधानमंत्री छात्रवृत्ति योजना",
-        "min_percentage": 75,
-        "max_income": 600000,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 30000,
-        "deadline": "15-10-2025",
-        "description": "For wards/widows of Ex-Servicemen, Ex-Coast Guard. ₹2500/month (Boys), ₹3000/month (Girls).",
-        "description_hi": "भूतपूर्व सैनिकों के बच्चों/विधवाओं के लिए।",
-        "apply_url": "https://ksb.gov.in",
-        "eligibility": ["Ex-servicemen dependent", "75%+ in 12th", "Professional courses"],
-        "documents": ["Ex-Servicemen Certificate", "12th Marksheet", "College Admission"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 14,
-        "name": "Central Sector Scheme - Top Class Education for SC",
-        "name_hi": "SC के लिए शीर्ष श्रेणी शिक्षा योजना",
-        "min_percentage": 60,
-        "max_income": 600000,
-        "category": ["SC"],
-        "amount": 200000,
-        "deadline": "31-10-2025",
-        "description": "Full tuition + living expenses for SC students in notified institutions (IITs, NITs, AIIMS, etc).",
-        "description_hi": "IIT, NIT, AIIMS आदि में SC छात्रों के लिए पूर्ण ट्यूशन।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["SC certificate", "Admission in notified institutes", "Income < ₹6 lakh"],
-        "documents": ["SC Certificate", "Income Certificate", "Admission Letter"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 15,
-        "name": "Post-Matric Scholarship for Minorities (Central)",
-        "name_hi": "अल्पसंख्यकों के लिए पोस्ट-मैट्रिक छात्रवृत्ति",
-        "min_percentage": 50,
-        "max_income": 200000,
-        "category": ["Minority"],
-        "amount": 10000,
-        "deadline": "31-12-2025",
-        "description": "For Muslim, Christian, Sikh, Buddhist, Jain, Parsi students. 30% seats reserved for girls.",
-        "description_hi": "मुस्लिम, ईसाई, सिख, बौद्ध, जैन, पारसी छात्रों के लिए।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["Notified minority community", "Class 11+", "Income < ₹2 lakh"],
-        "documents": ["Minority Certificate", "Income Certificate", "Marksheet"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 16,
-        "name": "AICTE Pragati Scholarship for Girls",
-        "name_hi": "लड़कियों के लिए AICTE प्रगति छात्रवृत्ति",
-        "min_percentage": 60,
-        "max_income": 800000,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 50000,
-        "deadline": "31-10-2025",
-        "description": "For 1 girl child per family in AICTE-approved degree courses. ₹50,000/year.",
-        "description_hi": "AICTE-स्वीकृत डिग्री पाठ्यक्रमों में प्रति परिवार 1 लड़की के लिए।",
-        "apply_url": "https://www.aicte-india.org/schemes/students-development-schemes/Pragati-Saksham",
-        "eligibility": ["Girl student", "AICTE approved college", "One girl per family", "Income < ₹8 lakh"],
-        "documents": ["Marksheet", "Admission Proof", "Income Certificate", "Single Girl Declaration"],
-        "eligible_streams": ["Engineering", "Pharmacy", "Architecture", "Management"],
-        "states": ["All States"]
-    },
-    {
-        "id": 17,
-        "name": "INSPIRE Scholarship (SHE)",
-        "name_hi": "INSPIRE छात्रवृत्ति",
-        "min_percentage": 85,
-        "max_income": 500000,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 80000,
-        "deadline": "31-12-2025",
-        "description": "For top 1% in Class 12 board exams pursuing BSc/BS/Integrated MSc in Natural Sciences.",
-        "description_hi": "बोर्ड परीक्षा में शीर्ष 1% छात्रों के लिए।",
-        "apply_url": "https://online-inspire.gov.in",
-        "eligibility": ["Top 1% in 12th boards (85%+)", "Natural Science courses", "Income < ₹5 lakh"],
-        "documents": ["12th Marksheet", "BSc/MSc Admission", "Income Certificate"],
-        "eligible_streams": ["Science"],
-        "states": ["All States"]
-    },
-    {
-        "id": 18,
-        "name": "Merit-cum-Means Based Scholarship (MCM)",
-        "name_hi": "मेरिट-कम-मीन्स आधारित छात्रवृत्ति",
-        "min_percentage": 80,
-        "max_income": 450000,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 20000,
-        "deadline": "15-01-2026",
-        "description": "For professional/technical courses: Engineering, Medical, Agriculture, Veterinary, Law, etc.",
-        "description_hi": "व्यावसायिक/तकनीकी पाठ्यक्रमों के लिए।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["80%+ in qualifying exam", "Professional courses", "Income < ₹4.5 lakh"],
-        "documents": ["Previous Marksheet", "Admission Letter", "Income Certificate"],
-        "eligible_streams": ["Engineering", "Medical", "Law", "Agriculture"],
-        "states": ["All States"]
-    },
-    {
-        "id": 19,
-        "name": "Begum Hazrat Mahal National Scholarship",
-        "name_hi": "बेगम हज़रत महल राष्ट्रीय छात्रवृत्ति",
-        "min_percentage": 50,
-        "max_income": 200000,
-        "category": ["Minority"],
-        "amount": 12000,
-        "deadline": "31-12-2025",
-        "description": "For minority girls from Class 9-12. ₹6,000 (9-10), ₹12,000 (11-12).",
-        "description_hi": "कक्षा 9-12 की अल्पसंख्यक लड़कियों के लिए।",
-        "apply_url": "https://maef.nic.in",
-        "eligibility": ["Minority girls", "Class 9-12", "50%+ marks", "Income < ₹2 lakh"],
-        "documents": ["Minority Certificate", "Marksheet", "Income Certificate"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 20,
-        "name": "Central Sector Scheme of National Merit Scholarship",
-        "name_hi": "राष्ट्रीय मेरिट छात्रवृत्ति योजना",
-        "min_percentage": 80,
-        "max_income": 600000,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 20000,
-        "deadline": "31-10-2025",
-        "description": "For students with 80%+ in Class 12. Continuation depends on 75% in UG/PG.",
-        "description_hi": "कक्षा 12 में 80%+ प्राप्त करने वाले छात्रों के लिए।",
-        "apply_url": "https://scholarships.gov.in",
-        "eligibility": ["80%+ in Class 12", "Degree/PG course", "Income < ₹6 lakh"],
-        "documents": ["12th Marksheet", "Admission Proof", "Income Certificate"],
-        "eligible_streams": ["All"],
-        "states": ["All States"]
-    },
-    {
-        "id": 21,
-        "name": "AICTE Saksham Scholarship for Differently-Abled",
-        "name_hi": "दिव्यांगों के लिए AICTE सक्षम छात्रवृत्ति",
-        "min_percentage": 60,
-        "max_income": 800000,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 50000,
-        "deadline": "31-10-2025",
-        "description": "For differently-abled students (40%+ disability) in AICTE-approved courses.",
-        "description_hi": "AICTE-स्वीकृत पाठ्यक्रमों में दिव्यांग छात्रों के लिए।",
-        "apply_url": "https://www.aicte-india.org",
-        "eligibility": ["40%+ disability", "AICTE approved courses", "Income < ₹8 lakh"],
-        "documents": ["Disability Certificate", "Marksheet", "Income Certificate"],
-        "eligible_streams": ["Engineering", "Pharmacy", "Architecture"],
-        "states": ["All States"]
-    },
-    {
-        "id": 22,
-        "name": "Ishan Uday - NE Region Scholarship",
-        "name_hi": "ईशान उदय - NE क्षेत्र छात्रवृत्ति",
-        "min_percentage": 60,
-        "max_income": 450000,
-        "category": ["General", "OBC", "SC", "ST"],
-        "amount": 100000,
-        "deadline": "31-10-2025",
-        "description": "For students from North-Eastern states pursuing UG in Central/State universities.",
-        "description_hi": "उत्तर-पूर्वी राज्यों के छात्रों के लिए।",
-        "apply_url": "https://www.ugc.ac.in",
-        "eligibility": ["NE state domicile", "60%+ in 12th", "Central/State university"],
-        "documents": ["Domicile Certificate", "12th Marksheet", "Admission Proof"],
-        "eligible_streams": ["All"],
-        "states": ["Arunachal Pradesh", "Assam", "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Sikkim", "Tripura"]
+What would you like to know? 😊
+"""
     }
-]
+}
 
-# ============================================================================
-# ENHANCED MATCHING ALGORITHM
-# ============================================================================
+def chatbot_language(requested=None):
+    """Reply language: the requested one when there are templates for it, English otherwise"""
+    return requested if requested in CHATBOT_TEMPLATES else "en"
 
-def match_scholarships(student_data):
-    """Enhanced scholarship matching with strict percentage filtering"""
-    matched = []
-    rejected = []
-    
-    percentage = student_data.get("percentage")
-    income = student_data.get("income")
-    category = student_data.get("category")
-    stream = student_data.get("stream")
-    state = student_data.get("state")
+def render_chatbot_responses(aggregates, lang):
+    """Every reply of one language, rendered for a catalog's aggregates"""
+    context = {
+        "total": aggregates.total,
+        "wb_count": aggregates.wb_count,
+        "sc_st": aggregates.sc_st,
+        "obc": aggregates.by_category.get('OBC', 0),
+        "general": aggregates.by_category.get('General', 0),
+        # The West Bengal reply names six schemes and counts the rest
+        "unlisted": aggregates.total - 6
+    }
+    return {intent: template.format(**context) for intent, template in CHATBOT_TEMPLATES[lang].items()}
+
+class ChatbotResponses:
+    """Chatbot replies rendered once per catalog snapshot and language.
     
-    for scholarship in SCHOLARSHIPS:
-        eligibility_score = 0
-        reasons = []
-        rejection_reason = None
-        max_score = 0
-        
-        # CRITICAL: Percentage check (MUST PASS)
-        if percentage:
-            max_score += 1
-            if percentage >= scholarship["min_percentage"]:
-                eligibility_score += 1
-                reasons.append(f"✓ Marks: {percentage:.1f}% (Required: {scholarship['min_percentage']}%+)")
-            else:
-                rejection_reason = f"Marks too low: {percentage:.1f}% < {scholarship['min_percentage']}% required"
-                rejected.append({
-                    "scholarship": scholarship["name"],
-                    "reason": rejection_reason
-                })
-                continue  # Skip this scholarship
-        
-        # Income check (MUST PASS if income provided)
-        if income:
-            max_score += 1
-            if income <= scholarship["max_income"]:
-                eligibility_score += 1
-                reasons.append(f"✓ Income: ₹{income:,} (Limit: ₹{scholarship['max_income']:,})")
-            else:
-                rejection_reason = f"Income too high: ₹{income:,} > ₹{scholarship['max_income']:,}"
-                rejected.append({
-                    "scholarship": scholarship["name"],
-                    "reason": rejection_reason
-                })
-                continue
-        
-        # Category check (MUST PASS if category provided)
-        if category:
-            max_score += 1
-            if category in scholarship["category"]:
-                eligibility_score += 1
-                reasons.append(f"✓ Category: {category} eligible")
-            else:
-                rejection_reason = f"Category mismatch: {category} not in {', '.join(scholarship['category'])}"
-                rejected.append({
-                    "scholarship": scholarship["name"],
-                    "reason": rejection_reason
-                })
-                continue
-        
-        # State filtering (Optional but important)
-        eligible_states = scholarship.get("states", ["All States"])
-        if "All States" not in eligible_states:
-            if state and state not in eligible_states:
-                rejection_reason = f"State not eligible: {state} (Only for: {', '.join(eligible_states)})"
-                rejected.append({
-                    "scholarship": scholarship["name"],
-                    "reason": rejection_reason
-                })
-                continue
-            elif state and state in eligible_states:
-                reasons.append(f"✓ State: {state} eligible")
-        
-        # Stream filtering (Optional)
-        eligible_streams = scholarship.get("eligible_streams", ["All"])
-        if "All" not in eligible_streams:
-            if stream and stream not in eligible_streams:
-                rejection_reason = f"Stream not eligible: {stream} (Only: {', '.join(eligible_streams)})"
-                rejected.append({
-                    "scholarship": scholarship["name"],
-                    "reason": rejection_reason
-                })
-                continue
-            elif stream and stream in eligible_streams:
-                reasons.append(f"✓ Stream: {stream} eligible")
-        
-        # Calculate match percentage
-        match_percentage = (eligibility_score / max_score * 100) if max_score > 0 else 0
-        
-        # Only include scholarships with good match
-        if eligibility_score >= max_score * 0.6:  # At least 60% match
-            scholarship_copy = scholarship.copy()
-            scholarship_copy["eligibility_score"] = eligibility_score
-            scholarship_copy["match_percentage"] = round(match_percentage, 1)
-            scholarship_copy["match_reasons"] = reasons
-            
-            # Calculate urgency based on deadline
-            try:
-                deadline_date = datetime.strptime(scholarship["deadline"], "%d-%m-%Y")
-                days_left = (deadline_date - datetime.now()).days
-                scholarship_copy["days_until_deadline"] = days_left
-                
-                if days_left < 0:
-                    scholarship_copy["urgency"] = "expired"
-                    scholarship_copy["status"] = "Deadline Passed"
-                elif days_left < 7:
-                    scholarship_copy["urgency"] = "critical"
-                    scholarship_copy["status"] = "Apply Now!"
-                elif days_left < 30:
-                    scholarship_copy["urgency"] = "high"
-                    scholarship_copy["status"] = "Closing Soon"
-                elif days_left < 90:
-                    scholarship_copy["urgency"] = "medium"
-                    scholarship_copy["status"] = "Open"
-                else:
-                    scholarship_copy["urgency"] = "low"
-                    scholarship_copy["status"] = "Open"
-            except:
-                scholarship_copy["days_until_deadline"] = None
-                scholarship_copy["urgency"] = "unknown"
-                scholarship_copy["status"] = "Check Website"
-            
-            matched.append(scholarship_copy)
+    Renderings are keyed on the snapshot itself, as the match cache is, so a
+    reload re-renders even when the file's version string was not bumped.
+    Only the current snapshot's renderings are kept; a reload renders afresh
+    on the first query in each language.
+    """
     
-    # Sort by: match percentage > amount > urgency
-    matched.sort(key=lambda x: (
-        -x.get("match_percentage", 0),
-        -x.get("amount", 0),
-        0 if x.get("urgency") == "critical" else 1 if x.get("urgency") == "high" else 2
-    ))
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rendered = {}
     
-    return matched, rejected
+    def get(self, catalog, lang, intent):
+        key = (catalog, lang)
+        responses = self._rendered.get(key)
+        if responses is None:
+            responses = render_chatbot_responses(catalog.aggregates, lang)
+            with self._lock:
+                rendered = {k: v for k, v in self._rendered.items() if k[0] is catalog}
+                rendered[key] = responses
+                self._rendered = rendered
+        return responses[intent]
 
-def calculate_statistics(matched_scholarships):
-    """Calculate comprehensive statistics"""
-    if not matched_scholarships:
-        return {
-            "total_amount": 0,
-            "avg_amount": 0,
-            "highest_scholarship": None,
-            "urgent_count": 0,
-            "total_scholarships": 0,
-            "wb_scholarships": 0,
-            "national_scholarships": 0
-        }
-    
-    total_amount = sum(s["amount"] for s in matched_scholarships)
-    avg_amount = total_amount // len(matched_scholarships) if matched_scholarships else 0
-    highest = max(matched_scholarships, key=lambda x: x["amount"])
-    urgent = sum(1 for s in matched_scholarships if s.get("urgency") in ["critical", "high"])
-    wb_count = sum(1 for s in matched_scholarships if "West Bengal" in s.get("states", []))
-    national_count = len(matched_scholarships) - wb_count
-    
-    return {
-        "total_amount": total_amount,
-        "avg_amount": avg_amount,
-        "highest_scholarship": highest["name"],
-        "highest_amount": highest["amount"],
-        "urgent_count": urgent,
-        "total_scholarships": len(matched_scholarships),
-        "wb_scholarships": wb_count,
-        "national_scholarships": national_count
-    }
+CHATBOT_RESPONSES = ChatbotResponses()
 
-# ============================================================================
-# IMAGE PROCESSING FUNCTIONS
-# ============================================================================
+# Catalog entries an answer to a specific question is assembled from
+CHATBOT_RESULTS = 3
+# Matches of a user's last profile kept for follow-ups, as [id, score] pairs
+CHATBOT_REFERENCE_SIZE = 50
+# Words that make a query a follow-up on the user's last results
+CHATBOT_FOLLOW_UPS = IntentRouter({
+    "reference": (1.0, ["those", "these", "them", "they", "above"]),
+    "highest": (1.0, ["highest", "maximum", "largest", "biggest", "most money"]),
+    "only": (1.0, ["only", "just"])
+})
+# Profile fields a follow-up narrows the results by: the entry field each is
+# checked against, and the value that field holds for schemes open to everyone
+CHATBOT_FOLLOW_UP_FILTERS = {
+    "category": ("category", None),
+    "stream": ("eligible_streams", "All"),
+    "state": ("states", "All States")
+}
+# Terms that only pick the topic of a query
+CHATBOT_KEYWORD_TERMS = frozenset(term for keyword in CHATBOT_ROUTER.keywords for term in search_terms(keyword))
+# Entry details that answer each topic; other topics get an overview
+CHATBOT_ENTRY_DETAILS = {
+    "documents": ("documents",),
+    "deadlines": ("deadline",),
+    "eligibility": ("eligibility", "min_percentage", "max_income"),
+    "apply": ("apply_url", "documents", "deadline")
+}
+CHATBOT_ENTRY_OVERVIEW = ("amount", "description", "eligibility", "deadline")
+CHATBOT_ENTRY_TEXT = {
+    "en": {
+        "title": "🔎 **Scholarships that fit your question**",
+        "amount": "Amount",
+        "deadline": "Deadline",
+        "eligibility": "Eligibility",
+        "min_percentage": "Minimum marks",
+        "max_income": "Family income up to",
+        "documents": "Documents",
+        "apply_url": "Apply at",
+        "footer": "Ask me about the documents, deadline or how to apply for any of these! 😊",
+        "follow_up_title": "📌 **From your last results**",
+        "follow_up_none": "None of your last results fit that. Tell me your marks and category again for a fresh list! 😊",
+        "profile_title": "🎯 **Your Matches**",
+        "profile_summary": "For {profile} you qualify for **{count} scholarships** worth **₹{total:,}** in all. The best of them:",
+        "profile_none": "For {profile} no scholarship in our catalog fits yet. Check your marks and income, or upload your marksheet! 📄",
+        "percentage": "{:g}% marks",
+        "income": "family income ₹{:,}",
+        "category": "{} category",
+        "stream": "{} stream",
+        "state": "{}"
+    }
+}
 
-def allowed_file(filename):
-    """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+def specific_terms(query):
+    """Search terms of a query that name something besides its topic, e.g. a course, state or group of students"""
+    return [term for term in search_terms(query) if term not in CHATBOT_KEYWORD_TERMS and not term.isdigit()]
 
-def process_pdf(filepath):
-    """Convert PDF to images and extract text"""
-    if not PDF_SUPPORT:
-        raise Exception("PDF support not available")
+def render_entry_answer(scholarships, intent, lang, heading=None):
+    """Chatbot answer assembled from catalog entries, showing the details the intent asks about"""
+    text = CHATBOT_ENTRY_TEXT[lang]
+    details = CHATBOT_ENTRY_DETAILS.get(intent, CHATBOT_ENTRY_OVERVIEW)
+    lines = ["", *(heading or [text["title"]]), ""]
     
-    try:
-        images = convert_from_path(filepath, dpi=300)
-        all_text = ""
-        
-        for i, image in enumerate(images):
-            processed_image = preprocess_image(image)
-            text = pytesseract.image_to_string(processed_image, lang='eng')
-            all_text += f"\n--- Page {i+1} ---\n{text}"
-        
-        return all_text
-    except Exception as e:
-        logger.error(f"PDF processing error: {str(e)}")
-        raise
+    for n, s in enumerate(scholarships, 1):
+        lines.append(f"**{n}. {s['name']}**")
+        for detail in details:
+            if detail == "description":
+                if s.get("description"):
+                    lines.append(f"• {s['description']}")
+            elif detail in ("amount", "max_income"):
+                # Income limits this high mean there is none
+                if s[detail] < 999999999:
+                    lines.append(f"• {text[detail]}: ₹{s[detail]:,}")
+            elif detail == "min_percentage":
+                lines.append(f"• {text[detail]}: {s[detail]}%")
+            elif isinstance(s.get(detail), list):
+                lines.append(f"• {text[detail]}: {', '.join(s[detail])}")
+            elif s.get(detail):
+                lines.append(f"• {text[detail]}: {s[detail]}")
+        lines.append("")
+    
+    lines.append(text["footer"])
+    return "\n".join(lines) + "\n"
 
-def preprocess_image(image):
-    """Enhanced image preprocessing for better OCR"""
-    try:
-        img_array = np.array(image)
-        
-        if len(img_array.shape) == 3:
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        else:
-            gray = img_array
-        
-        # Denoise
-        denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-        
-        # Enhance contrast
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(denoised)
-        
-        # Threshold
-        thresh = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-        
-        return Image.fromarray(thresh)
-    except Exception as e:
-        logger.error(f"Image preprocessing error: {str(e)}")
-        return image
+# Profile fields a chatbot query can state. A query is read as a profile when
+# it gives marks or income, or at least CHATBOT_PROFILE_MIN_FIELDS fields.
+CHATBOT_PROFILE_FIELDS = ("percentage", "income", "category", "stream", "state")
+CHATBOT_PROFILE_MIN_FIELDS = 2
 
-def extract_data(text):
-    """Enhanced data extraction with better pattern matching"""
-    data = {
-        "percentage": None,
-        "income": None,
-        "category": None,
-        "name": None,
-        "stream": None,
-        "state": None
-    }
+def chatbot_profile(query):
+    """Student profile stated in a chatbot query, such as "72% marks, 2.5 lakh income, OBC", or None"""
+    data = extract_data(query)
+    profile = {field: data[field] for field in CHATBOT_PROFILE_FIELDS}
+    stated = sum(value is not None for value in profile.values())
+    if profile["percentage"] is None and profile["income"] is None and stated < CHATBOT_PROFILE_MIN_FIELDS:
+        return None
+    return profile
+
+def render_profile_answer(profile, result, intent, lang):
+    """Chatbot answer listing a profile's top matches, with the details the intent asks about.
     
-    # Extract name
-    name_patterns = [
-        r'name[:\s]+([A-Za-z\s]+?)(?:\n|percentage|marks)',
-        r'student[:\s]+([A-Za-z\s]+?)(?:\n)',
-        r'naam[:\s]+([A-Za-z\s]+?)(?:\n)'
-    ]
-    for pattern in name_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            data["name"] = match.group(1).strip()
-            break
-    
-    # Extract percentage
-    percentage_patterns = [
-        r'(\d+\.?\d*)\s*%',
-        r'percentage[:\s]+(\d+\.?\d*)',
-        r'marks[:\s]+(\d+\.?\d*)',
-        r'cgpa[:\s]+(\d+\.?\d*)',
-    ]
-    for pattern in percentage_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            value = float(match.group(1))
-            # Convert CGPA to percentage if needed
-            if value <= 10:
-                data["percentage"] = round(value * 9.5, 2)
-            else:
-                data["percentage"] = value
-            break
-    
-    # Extract income
-    income_patterns = [
-        r'income[:\s]+₹?\s*(\d+)',
-        r'annual\s+income[:\s]+₹?\s*(\d+)',
-        r'₹\s*(\d{5,7})',
-        r'(\d{5,7})\s*/-'
-    ]
-    for pattern in income_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            data["income"] = int(match.group(1))
-            break
-    
-    # Extract category
-    categories = {
-        "SC": ["scheduled caste", "sc", "s.c.", "s.c"],
-        "ST": ["scheduled tribe", "st", "s.t.", "s.t"],
-        "OBC": ["other backward", "obc", "o.b.c"],
-        "General": ["general", "gen"],
-        "Minority": ["minority", "muslim", "christian", "sikh", "buddhist", "jain"]
-    }
+    Only the parsed values are shown, never the query text itself.
+    """
+    text = CHATBOT_ENTRY_TEXT[lang]
+    described = ", ".join(text[field].format(profile[field]) for field in CHATBOT_PROFILE_FIELDS
+                          if profile[field] is not None)
+    statistics = result["statistics"]
+    if not result["matched"]:
+        return f"\n{text['profile_title']}\n\n{text['profile_none'].format(profile=described)}\n"
     
-    text_lower = text.lower()
-    for category, keywords in categories.items():
-        if any(keyword in text_lower for keyword in keywords):
-            data["category"] = category
-            break
-    
-    # Extract stream
-    streams = {
-        "Science": ["science", "pcm", "pcb", "physics", "chemistry"],
-        "Commerce": ["commerce", "accountancy", "business"],
-        "Arts": ["arts", "humanities", "history", "geography"],
-        "Engineering": ["engineering", "b.tech", "btech"],
-        "Medical": ["medical", "mbbs", "medicine"]
-    }
+    summary = text["profile_summary"].format(profile=described, count=statistics["total_scholarships"],
+                                             total=statistics["total_amount"])
+    return render_entry_answer(result["matched"][:CHATBOT_RESULTS], intent, lang,
+                               heading=[text["profile_title"], "", summary])
+
+def match_reference(results):
+    """Compact reference to ranked (scholarship, score) results, as [id, score] pairs"""
+    return [[s["id"], round(float(score), 4)] for s, score in results[:CHATBOT_REFERENCE_SIZE]]
+
+def answer_follow_up(query, markers, intent, reference, catalog, lang):
+    """(response, reference) for a follow-up on the user's last results.
     
-    for stream, keywords in streams.items():
-        if any(keyword in text_lower for keyword in keywords):
-            data["stream"] = stream
-            break
+    The referenced entries are looked up by id, so nothing is matched again.
+    A category, stream or state named in the query narrows them, keeping
+    schemes open to every stream or state unless the query says "only" or
+    "just", and the narrowed set becomes the new reference; "highest" picks
+    the largest amount.
+    """
+    text = CHATBOT_ENTRY_TEXT[lang]
+    positions = catalog.engine.position_by_id
+    results = [(catalog.scholarships[positions[id_]], score) for id_, score in reference if id_ in positions]
     
-    # Extract state (focus on West Bengal)
-    if any(word in text_lower for word in ["west bengal", "wb", "kolkata", "bengal"]):
-        data["state"] = "West Bengal"
+    data = extract_data(query)
+    strict = "only" in markers
+    filters = [(key, (data[field],) if strict else (data[field], universal))
+               for field, (key, universal) in CHATBOT_FOLLOW_UP_FILTERS.items() if data[field]]
+    results = [(s, score) for s, score in results
+               if all(any(value in s.get(key, ()) for value in values) for key, values in filters)]
+    if not results:
+        return f"\n{text['follow_up_title']}\n\n{text['follow_up_none']}\n", reference
     
-    return data
-
-app.secret_key = os.getenv('SESSION_SECRET', 'fallback-secret-key')
-
-# OAuth Configuration
-CLIENT_CONFIG = {
-    "web": {
-        "client_id": os.getenv('GOOGLE_CLIENT_ID'),
-        "client_secret": os.getenv('GOOGLE_CLIENT_SECRET'),
-        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-        "token_uri": "https://oauth2.googleapis.com/token",
-        "redirect_uris": [os.getenv('GOOGLE_REDIRECT_URI', 'http://localhost:5000/auth/callback')]
-    }
-}
-
-SCOPES = ['https://www.googleapis.com/auth/gmail.send']
-
-# Store login codes and OAuth tokens
-login_codes = {}
-user_tokens = {}
+    shown = [s for s, _ in results]
+    if "highest" in markers:
+        shown = [max(shown, key=lambda s: s["amount"])]
+    response = render_entry_answer(shown[:CHATBOT_RESULTS], intent, lang, heading=[text["follow_up_title"]])
+    return response, match_reference(results) if filters else reference
 
 # ============================================================================
 # API ROUTES
@@ -1007,6 +3831,75 @@ def logout():
 
 
     
+@app.route('/upload', methods=['POST', 'OPTIONS'])
+def upload_document():
+    """Queue an uploaded marksheet/certificate for OCR and return its job id"""
+    if request.method == 'OPTIONS':
+        return jsonify({"success": True}), 200
+    
+    try:
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return jsonify({"success": False, "error": "No file uploaded"}), 400
+        if not allowed_file(upload.filename):
+            return jsonify({"success": False, "error": "Unsupported file type"}), 400
+        
+        filename = secure_filename(upload.filename)
+        # The parser already wrote the file into an UploadBuffer and hashed it
+        digest = upload.stream.digest.hexdigest()
+        source = upload.stream.detach(filename)
+        
+        try:
+            job = OCR_JOBS.submit(filename, source, digest)
+        except OCRQueueFull as e:
+            source.discard()
+            response = jsonify({"success": False, "error": str(e)})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        except Exception:
+            source.discard()
+            raise
+        
+        body = {
+            "success": True,
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": url_for('get_job', job_id=job.id),
+            "events_url": url_for('stream_job_events', job_id=job.id)
+        }
+        if job.status == "completed":
+            # OCR cache hit: the result is already known
+            return jsonify(dict(body, result=job.result)), 200
+        return jsonify(body), 202
+    
+    except Exception as e:
+        logger.error(f"Upload error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll the state of an OCR job"""
+    job = OCR_JOBS.get(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    
+    return jsonify(dict(job, success=True)), 200
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-sent events with every state change of an OCR job"""
+    if not OCR_JOBS.get(job_id):
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    
+    def generate():
+        for events in OCR_JOBS.follow(job_id):
+            if not events:
+                yield ": keepalive\n\n"
+            for event in events:
+                yield f"event: {event['status']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 @app.route('/exams', methods=['GET'])
 def get_exams():
     exams = [
@@ -1062,32 +3955,227 @@ def get_all_scholarships():
     try:
         state = request.args.get('state')
         category = request.args.get('category')
+        stream = request.args.get('stream')
         min_amount = request.args.get('min_amount', type=int)
+        max_amount = request.args.get('max_amount', type=int)
+        deadline_before = request.args.get('deadline_before')
+        limit, after = _pagination_args(request.args)
         
-        filtered = SCHOLARSHIPS.copy()
+        if deadline_before:
+            try:
+                deadline_before = datetime.strptime(deadline_before, "%d-%m-%Y").toordinal()
+            except ValueError:
+                raise ValueError("deadline_before must be a DD-MM-YYYY date")
         
-        # Filter by state
-        if state:
-            filtered = [s for s in filtered if state in s.get("states", [])]
+        catalog = current_catalog()
+        index = catalog.filters
+        positions = index.positions(index.select(
+            state=state,
+            category=category,
+            stream=stream,
+            min_amount=min_amount or None,
+            max_amount=max_amount,
+            deadline_before=deadline_before or None
+        ))
+        total = len(positions)
         
-        # Filter by category
-        if category:
-            filtered = [s for s in filtered if category in s.get("category", [])]
+        # Catalog order is the listing order, so a cursor is just a position
+        if after is not None:
+            position = catalog.engine.position_by_id.get(after)
+            if position is None:
+                raise ValueError("Invalid cursor")
+            positions = positions[np.searchsorted(positions, position, side="right"):]
+        
+        next_cursor = None
+        if limit is not None and len(positions) > limit:
+            positions = positions[:limit]
+            next_cursor = encode_cursor(index.scholarships[positions[-1]]["id"])
         
-        # Filter by amount
-        if min_amount:
-            filtered = [s for s in filtered if s.get("amount", 0) >= min_amount]
+        filtered = [index.scholarships[i] for i in positions]
         
         return jsonify({
             "success": True,
             "scholarships": filtered,
-            "total": len(filtered)
+            "total": total,
+            "next_cursor": next_cursor,
+            "catalog_version": catalog.version
         }), 200
     
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         logger.error(f"Scholarships error: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
     
+@app.route('/scholarships/search', methods=['GET', 'OPTIONS'])
+def search_scholarships():
+    """Full-text search over scholarship names, descriptions, eligibility and documents"""
+    if request.method == 'OPTIONS':
+        return jsonify({"success": True}), 200
+    
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"success": False, "error": "No query provided"}), 400
+        limit = request.args.get('limit', SEARCH_DEFAULT_RESULTS, type=int)
+        if not 1 <= limit <= SEARCH_MAX_RESULTS:
+            raise ValueError(f"limit must be between 1 and {SEARCH_MAX_RESULTS}")
+        
+        catalog = current_catalog()
+        results = [dict(catalog.scholarships[i], score=score) for i, score in catalog.search.search(query, limit)]
+        
+        return jsonify({
+            "success": True,
+            "query": query,
+            "scholarships": results,
+            "total": len(results),
+            "catalog_version": catalog.version
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Scholarship search error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/manual', methods=['POST', 'OPTIONS'])
+def manual_entry():
+    """Match scholarships for a manually entered student profile"""
+    if request.method == 'OPTIONS':
+        return jsonify({"success": True}), 200
+    
+    try:
+        data = request.json or {}
+        student_data = _coerce_profile(data)
+        params = {**request.args.to_dict(), **data}
+        limit, after = _pagination_args(params)
+        explain = params.get('explain', 'full')
+        
+        # Fetch one extra match to learn whether another page exists
+        fetch = limit + 1 if limit is not None else None
+        result = match_profile(student_data, limit=fetch, after=after, explain=explain)
+        matched = result["matched"]
+        
+        next_cursor = None
+        if limit is not None and len(matched) > limit:
+            matched = matched[:limit]
+            next_cursor = encode_cursor(matched[-1]["id"])
+        
+        response = {
+            "success": True,
+            "student_data": student_data,
+            "matched_scholarships": matched,
+            "total_matches": result["statistics"]["total_scholarships"],
+            "rejected_count": result["rejected_count"],
+            "statistics": result["statistics"],
+            "next_cursor": next_cursor,
+            "catalog_version": result["catalog_version"]
+        }
+        if explain != 'off':
+            response["rejected_scholarships"] = result["rejected"]
+        
+        return jsonify(response), 200
+    
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Manual entry error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/scholarships/upcoming', methods=['GET', 'OPTIONS'])
+def get_upcoming_scholarships():
+    """Get scholarships whose deadline falls within the next N days"""
+    if request.method == 'OPTIONS':
+        return jsonify({"success": True}), 200
+    
+    try:
+        within_days = request.args.get('within_days', 30, type=int)
+        if within_days < 0:
+            return jsonify({"success": False, "error": "within_days must be non-negative"}), 400
+        
+        deadlines = current_catalog().deadlines
+        statuses = deadlines.statuses()
+        upcoming = []
+        for i in deadlines.upcoming(within_days):
+            scholarship_copy = deadlines.scholarships[i].copy()
+            days_left, urgency, status = statuses[i]
+            scholarship_copy["days_until_deadline"] = days_left
+            scholarship_copy["urgency"] = urgency
+            scholarship_copy["status"] = status
+            upcoming.append(scholarship_copy)
+        
+        return jsonify({
+            "success": True,
+            "within_days": within_days,
+            "scholarships": upcoming,
+            "total": len(upcoming)
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Upcoming scholarships error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/match/batch', methods=['POST', 'OPTIONS'])
+def match_batch():
+    """Score an uploaded JSONL/CSV file of student profiles, streaming NDJSON results"""
+    if request.method == 'OPTIONS':
+        return jsonify({"success": True}), 200
+    
+    try:
+        upload = request.files.get('file')
+        if upload:
+            # Multipart files are closed once the view returns, so hand the
+            # generator its own spooled copy to read while streaming
+            stream, filename = tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_SIZE), upload.filename or ''
+            upload.save(stream)
+            stream.seek(0)
+        else:
+            stream, filename = request.stream, ''
+        
+        file_format = request.args.get('format')
+        if not file_format:
+            is_csv = filename.lower().endswith('.csv') or request.mimetype == 'text/csv'
+            file_format = 'csv' if is_csv else 'jsonl'
+        if file_format not in ('csv', 'jsonl'):
+            return jsonify({"success": False, "error": "format must be csv or jsonl"}), 400
+        
+        rows = _read_batch_profiles(stream, file_format)
+        results = generate_batch_results(rows, current_catalog())
+        return Response(stream_with_context(results), mimetype='application/x-ndjson')
+    
+    except Exception as e:
+        logger.error(f"Batch match error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/stats/catalog', methods=['GET'])
+def get_catalog_stats():
+    """Catalog-wide counts per category, state and stream plus amount distribution"""
+    catalog = current_catalog()
+    return jsonify({
+        "success": True,
+        "catalog_version": catalog.version,
+        "catalog": catalog.aggregates.to_dict(),
+        "search": catalog.search.stats()
+    }), 200
+
+@app.route('/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """Hit-rate counters for the match result cache and conversation store occupancy"""
+    return jsonify({
+        "success": True,
+        "match_cache": MATCH_CACHE.stats(),
+        "conversations": CONVERSATIONS.stats()
+    }), 200
+
+@app.route('/stats/ocr', methods=['GET'])
+def get_ocr_stats():
+    """OCR pool size, job queue occupancy and OCR cache usage"""
+    return jsonify({
+        "success": True,
+        "ocr_jobs": OCR_JOBS.stats(),
+        "ocr_cache": OCR_CACHE.stats()
+    }), 200
+
 @app.route('/application-guidance', methods=['GET', 'OPTIONS'])
 def get_application_guidance():
     """Get application guidance content"""
@@ -1163,317 +4251,72 @@ def chatbot_query():
     try:
         data = request.json
         query = data.get('query', '').lower()
-        user_id = data.get('user_id', 'default')
+        user_id = str(data.get('user_id', 'default'))
         
         if not query:
             return jsonify({"success": False, "error": "No query provided"}), 400
         
-        # Initialize conversation history
-        if user_id not in conversation_history:
-            conversation_history[user_id] = []
+        conversation = CONVERSATIONS.append(user_id, query)
         
-        conversation_history[user_id].append(query)
-        if len(conversation_history[user_id]) > 10:
-            conversation_history[user_id] = conversation_history[user_id][-10:]
-        
-        response = generate_chatbot_response(query)
+        lang = chatbot_language(data.get('language'))
+        previous = conversation.get("matches")
+        # A follow-up naming fields ("only SC in West Bengal") narrows the last
+        # results; one that states marks or income is a new profile to match
+        profile = chatbot_profile(query)
+        if previous and CHATBOT_FOLLOW_UPS.scores(query) and (
+                profile is None or (profile["percentage"] is None and profile["income"] is None)):
+            profile = None
+        if profile is None:
+            response, reference = generate_chatbot_response(query, lang, previous)
+            if reference is not previous:
+                CONVERSATIONS.put(user_id, dict(conversation, matches=reference))
+            return jsonify({
+                "success": True,
+                "query": query,
+                "language": lang,
+                "response": response
+            }), 200
         
+        # A stated profile is matched here and now, from the match cache when it has been seen
+        result = match_profile(profile, limit=CHATBOT_REFERENCE_SIZE, explain="off")
+        matches = match_reference([(s, s["match_percentage"]) for s in result["matched"]])
+        CONVERSATIONS.put(user_id, dict(conversation, matches=matches))
         return jsonify({
             "success": True,
             "query": query,
-            "response": response
+            "language": lang,
+            "response": render_profile_answer(profile, result, CHATBOT_ROUTER.route(query), lang),
+            "student_data": profile,
+            "matched_scholarships": result["matched"][:CHATBOT_RESULTS],
+            "total_matches": result["statistics"]["total_scholarships"],
+            "statistics": result["statistics"],
+            "catalog_version": result["catalog_version"]
         }), 200
     
     except Exception as e:
         logger.error(f"Chatbot error: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-def generate_chatbot_response(query):
-    """Generate intelligent responses with WB focus"""
-    query = query.lower()
-    
-    # West Bengal specific queries
-    if any(word in query for word in ['west bengal', 'wb', 'bengal', 'kolkata']):
-        return f"""
-🎓 **West Bengal Scholarships**
-
-We have **6 special scholarships** for West Bengal students:
-
-**👧 For Girls:**
-• **Kanyashree K1**: ₹750/year (Class 8-12)
-• **Kanyashree K2**: ₹25,000 one-time (Age 18-19)
-
-**📚 For Higher Education:**
-• **Swami Vivekananda**: ₹15,000 (60%+ marks)
-• **Aikyashree**: ₹5,000 (Minority students)
-
-**🎯 For SC/ST:**
-• **Dr. Ambedkar Scholarship**: ₹12,000
-• **Taruner Swapna**: ₹8,000 (Technical courses)
-
-**Plus {len(SCHOLARSHIPS) - 6} National Scholarships available!**
-
-👉 Enter your marks and category to find YOUR matches!
-
-Are you from West Bengal? Tell me your percentage! 😊
-"""
-    
-    # Kanyashree specific
-    if 'kanyashree' in query:
-        return """
-💝 **Kanyashree Prakalpa - Complete Guide**
-
-**K1 Scholarship (Annual):**
-• Amount: ₹750/year
-• For: Girls in Class 8-12
-• Eligibility: Must be unmarried, WB resident
-• No income limit!
-• Apply at: wbkanyashree.gov.in
-
-**K2 Scholarship (One-time):**
-• Amount: ₹25,000 (one-time)
-• For: Girls aged 18-19
-• Eligibility: Class 12 passed, enrolled in degree/diploma
-• Must be unmarried
-
-**Documents Needed:**
-✓ Aadhaar Card
-✓ Bank Account (girl's name)
-✓ School/College Certificate
-✓ Age Proof
-
-**Apply Online:**
-1. Visit wbkanyashree.gov.in
-2. Register with mobile/email
-3. Fill application
-4. Upload documents
-5. Submit!
-
-Money credited directly to bank! 💰
-"""
-    
-    # General scholarship query
-    if any(word in query for word in ['scholarship', 'amount', 'money']):
-        wb_count = sum(1 for s in SCHOLARSHIPS if "West Bengal" in s.get("states", []))
-        return f"""
-🎓 **{len(SCHOLARSHIPS)} Scholarships Available!**
-
-**West Bengal Special ({wb_count}):**
-💰 Kanyashree K2: ₹25,000
-💰 Swami Vivekananda: ₹15,000
-💰 Dr. Ambedkar (WB): ₹12,000
-
-**National High-Value:**
-💰 Central Sector SC: ₹2,00,000
-💰 INSPIRE: ₹80,000
-💰 AICTE Pragati: ₹50,000
-
-**By Category:**
-• SC/ST: {sum(1 for s in SCHOLARSHIPS if 'SC' in s['category'] or 'ST' in s['category'])} scholarships
-• OBC: {sum(1 for s in SCHOLARSHIPS if 'OBC' in s['category'])} scholarships
-• General: {sum(1 for s in SCHOLARSHIPS if 'General' in s['category'])} scholarships
-• Girls Special: 4 scholarships
-
-📝 **Tell me:**
-1. Your percentage/marks
-2. Your category (SC/ST/OBC/General)
-3. Your state
-
-I'll find perfect matches for YOU! 🎯
-"""
-    
-    # Eligibility check
-    if any(word in query for word in ['eligible', 'qualify', 'can i get']):
-        return """
-✅ **Quick Eligibility Check**
-
-Tell me these 3 things:
-
-1️⃣ **Your Percentage** (e.g., 75%, 8.5 CGPA)
-2️⃣ **Family Income** (Annual, in ₹)
-3️⃣ **Your Category** (SC/ST/OBC/General/Minority)
-
-**Example:**
-"I have 72% marks, income is 3 lakh, OBC category"
-
-Then I'll instantly show you:
-✓ All scholarships you qualify for
-✓ Amount you can get
-✓ Deadlines
-✓ Documents needed
-
-**Quick Tips:**
-• 50%+ = Eligible for 12+ scholarships
-• 60%+ = Eligible for 18+ scholarships
-• 80%+ = Eligible for ALL scholarships!
-
-What's your percentage? 📊
-"""
-    
-    # Application process
-    if any(word in query for word in ['apply', 'how to', 'process']):
-        return """
-📝 **How to Apply - Step by Step**
-
-**Step 1: Check Eligibility** ✅
-• Find scholarships matching your profile
-• Note down required percentage & income
-
-**Step 2: Gather Documents** 📄
-Common documents needed:
-• Latest Marksheet
-• Income Certificate (Tehsildar)
-• Caste Certificate (if SC/ST/OBC)
-• Aadhaar Card
-• Bank Passbook (front page)
-• Passport photo
-
-**Step 3: Register on Portal** 👤
-• Visit scholarships.gov.in
-• Click "New Registration"
-• Use email/mobile to create account
-• Save Application ID & Password
-
-**Step 4: Fill Application** ✍️
-• Login to portal
-• Select your scholarship
-• Fill details carefully
-• Double-check spelling
-• Use CAPITAL LETTERS for name
-
-**Step 5: Upload Documents** 📤
-• Scan documents clearly
-• PDF/JPG format only
-• Max 200KB per file
-• All documents mandatory
-
-**Step 6: Submit & Track** 📍
-• Review before final submit
-• Take screenshot of confirmation
-• Note Application ID
-• Check status weekly
-
-**Timeline:**
-Application → 1-2 months verification → 3-6 months payment
-
-Need help with specific step? Ask me! 🤗
-"""
-    
-    # Documents query
-    if any(word in query for word in ['document', 'certificate', 'paper']):
-        return """
-📄 **Complete Document Checklist**
-
-**Academic Documents:**
-✓ Latest Marksheet (attested)
-✓ Previous year marksheet
-✓ School/College ID card
-✓ Admission letter (for new students)
-
-**Income Proof (Choose ONE):**
-✓ Income Certificate from Tehsildar ⭐
-✓ ITR (Income Tax Return)
-✓ Salary slips (last 6 months)
-✓ Ration Card
-
-**Category Certificate:**
-✓ SC/ST Certificate (lifetime valid)
-✓ OBC Certificate (valid 1 year only!)
-✓ OBC Non-Creamy Layer Certificate
-✓ EWS Certificate (valid 1 year)
-✓ Minority Certificate
-
-**Identity Proof:**
-✓ Aadhaar Card (mandatory!)
-✓ Bank Passbook (student's name)
-✓ Passport size photo (recent)
-
-**Where to Get Income Certificate:**
-📍 Tehsil Office / SDO Office
-⏱️ Processing: 7-15 days
-💰 Fee: ₹20-50
-📋 Needed: Ration card, voter ID, self-declaration
-
-**Pro Tips:**
-• Get OBC certificate renewed yearly
-• Income certificate valid for 6 months
-• Keep multiple photocopies
-• Scan all documents in advance
-
-Which document you need help with? 😊
-"""
-    
-    # Deadline query
-    if any(word in query for word in ['deadline', 'last date', 'when']):
-        return """
-📅 **Important Deadlines 2025-26**
-
-**🔴 URGENT (Within 1 Month):**
-• **AICTE Pragati**: 31 Oct 2025
-• **PMSS**: 15 Oct 2025
-• **National Merit**: 31 Oct 2025
-• **Swami Vivekananda**: 31 Oct 2025
-
-**🟡 CLOSING SOON (Within 3 Months):**
-• **NMMS**: 30 Nov 2025
-• **Kanyashree K1**: 30 Nov 2025
-
-**🟢 OPEN NOW:**
-• **NSP Scholarships**: 31 Dec 2025
-• **Post-Matric SC/ST**: 31 Dec 2025
-• **INSPIRE**: 31 Dec 2025
-• **OBC Scholarship**: 15 Jan 2026
-• **Kanyashree K2**: 30 Jun 2026
-
-**⚠️ Pro Tips:**
-• Apply at least 15 days before deadline
-• Portal gets slow on last day
-• Keep documents ready NOW
-• Don't wait for last minute!
-
-Upload your marksheet to see YOUR personalized deadlines! ⏰
-"""
+def generate_chatbot_response(query, lang="en", reference=None):
+    """Generate intelligent responses with WB focus.
     
-    # Default response
-    return """
-👋 **Hi! I'm your EduFund Scholarship Assistant!**
-
-I specialize in **West Bengal & National Scholarships**!
-
-**I can help you with:**
-
-🎓 **Find Scholarships**
-• Based on your marks
-• Based on your category
-• Based on your state
-
-📋 **Application Help**
-• What documents needed
-• How to apply online
-• Step-by-step guide
-
-📅 **Important Dates**
-• Deadlines
-• Application windows
-
-💡 **Special Focus:**
-• West Bengal scholarships
-• Kanyashree (K1 & K2)
-• SC/ST/OBC schemes
-• Girls' scholarships
-
-**Quick Start:**
-Just tell me:
-"I have X% marks, Y income, Z category"
-
-Or ask:
-• "Show West Bengal scholarships"
-• "How to apply for Kanyashree?"
-• "What documents do I need?"
-• "Check deadlines"
-
-What would you like to know? 😊
-"""
+    Follow-ups such as "documents for those" or "only West Bengal" are
+    answered from the reference to the user's last results. Questions naming
+    something the catalog knows about are answered from the entries that best
+    match them; the rest get their topic's pre-rendered reply. Returns
+    (response, reference to the results later follow-ups refer to).
+    """
+    catalog = current_catalog()
+    intent = CHATBOT_ROUTER.route(query)
+    if reference:
+        markers = CHATBOT_FOLLOW_UPS.scores(query)
+        if markers:
+            return answer_follow_up(query, markers, intent, reference, catalog, lang)
+    if any(term in catalog.search.vocabulary for term in specific_terms(query)):
+        # Weaker hits only share common words with the query, so follow-ups refer to the entries shown
+        hits = [(catalog.scholarships[i], score) for i, score in catalog.search.search(query, CHATBOT_RESULTS)]
+        return render_entry_answer([s for s, _ in hits], intent, lang), match_reference(hits)
+    return CHATBOT_RESPONSES.get(catalog, lang, intent), reference
 
 @app.errorhandler(413)
 def too_large(e):
@@ -1492,23 +4335,27 @@ def internal_error(e):
 # ============================================================================
 
 if __name__ == '__main__':
-    wb_count = sum(1 for s in SCHOLARSHIPS if "West Bengal" in s.get("states", []))
-    national_count = len(SCHOLARSHIPS) - wb_count
+    aggregates = current_catalog().aggregates
     
     print("\n" + "="*70)
     print("🎓 EDUFUND - REAL SCHOLARSHIP DATA (v3.0)")
     print("="*70)
     print(f"✓ Server: http://localhost:5000")
-    print(f"✓ Total Scholarships: {len(SCHOLARSHIPS)}")
-    print(f"  ├─ West Bengal: {wb_count} scholarships")
-    print(f"  └─ National: {national_count} scholarships")
+    print(f"✓ Total Scholarships: {aggregates.total} (catalog {CATALOG_RELOADER.catalog.version})")
+    print(f"  ├─ West Bengal: {aggregates.wb_count} scholarships")
+    print(f"  └─ National: {aggregates.national_count} scholarships")
     print(f"✓ PDF Support: {'✅ Enabled' if PDF_SUPPORT else '⚠️  Disabled'}")
     print("="*70)
     print("\n📝 **API Endpoints:**")
-    print("   POST /upload - Upload documents")
+    print("   POST /upload - Upload documents (returns an OCR job id)")
+    print("   GET  /jobs/<id> - OCR job status (/events for SSE progress)")
     print("   POST /manual - Manual entry")
     print("   GET  /scholarships - Get all scholarships")
+    print("   GET  /scholarships/upcoming - Deadlines in the next N days")
+    print("   GET  /scholarships/search?q= - Full-text scholarship search")
+    print("   POST /match/batch - Bulk matching (JSONL/CSV in, NDJSON out)")
     print("   POST /chatbot - Chat assistant")
+    print("   GET  /stats/catalog - Catalog aggregates")
     print("="*70 + "\n")
     
     app.run(debug=True, port=5000, host='0.0.0.0')
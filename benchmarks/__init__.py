@@ -0,0 +1,11 @@
+"""
+EDUFUND benchmark suite
+
+Run from the repository root, e.g.:
+    python -m benchmarks.matching --sizes 1000 10000 --save baseline.json
+    python -m benchmarks.matching --compare baseline.json
+    python -m benchmarks.ocr --pages 10
+    python -m benchmarks.extraction --documents 2000
+    python -m benchmarks.chatbot --requests 5000
+    python -m benchmarks.parity
+"""
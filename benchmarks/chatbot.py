@@ -0,0 +1,110 @@
+"""
+Benchmarks for the chatbot.
+
+Sends seeded synthetic queries through POST /chatbot with
+the Flask test client, times the intent router and reply lookup on their
+own, and reports how often queries are routed to the intent they were
+written for. Messages stating a student profile are timed end to end,
+including the match, and checked field by field against the profile they
+were written from. Follow-ups on those results are timed separately, as
+they are answered without matching again, and "only <state>" follow-ups
+are checked to keep just the entries that list that state.
+"""
+
+import argparse
+import logging
+import random
+import sys
+
+import app
+from benchmarks.harness import measure, environment, print_results, save_baseline, compare_baseline
+from benchmarks.synthetic import CHAT_FOLLOW_UPS, generate_chat_queries, generate_profile_messages
+
+def expected_profile(profile):
+    """What the chatbot should read from a generated profile message"""
+    return {
+        "percentage": profile["percentage"],
+        "income": profile["income"],
+        "category": profile["category"],
+        "stream": profile["stream"] if profile["stream"] in app.STREAM_KEYWORDS else None,
+        "state": profile["state"] if profile["state"] in app.STATE_KEYWORDS else None
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000, help="chatbot queries per scenario")
+    parser.add_argument("--seed", type=int, default=19)
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare results with a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="p50 slowdown counted as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+    
+    logging.getLogger("app").setLevel(logging.WARNING)
+    client = app.app.test_client()
+    queries = generate_chat_queries(args.requests, args.seed)
+    texts = [query for query, _ in queries]
+    messages = generate_profile_messages(args.requests, args.seed)
+    
+    def chatbot(query, user_id="benchmark"):
+        response = client.post("/chatbot", json={"query": query, "user_id": user_id})
+        assert response.status_code == 200, response.get_data(as_text=True)
+    
+    def follow_up(request):
+        chatbot(*request)
+    
+    def reply(query):
+        query = query.lower()
+        app.generate_chatbot_response(query, "en")
+    
+    results = {
+        "chatbot_request": measure(chatbot, texts),
+        "chatbot_reply": measure(reply, texts),
+        "intent_route": measure(app.CHATBOT_ROUTER.route, [query.lower() for query in texts]),
+        "chatbot_profile": measure(chatbot, [message for message, _ in messages]),
+        "profile_parse": measure(app.chatbot_profile, [message.lower() for message, _ in messages])
+    }
+    
+    # Every user states a profile, then asks one follow-up about its matches
+    rng = random.Random(args.seed)
+    for i, (message, _) in enumerate(messages):
+        chatbot(message, f"user-{i}")
+    results["chatbot_follow_up"] = measure(follow_up, [(rng.choice(CHAT_FOLLOW_UPS), f"user-{i}")
+                                                       for i in range(len(messages))])
+    print_results(results)
+    
+    expected = {query: intent if intent != "help" else app.DEFAULT_INTENT for query, intent in queries}
+    routed = sum(app.CHATBOT_ROUTER.route(query.lower()) == intent for query, intent in expected.items())
+    print(f"\nintent accuracy: {routed}/{len(expected)} distinct queries")
+    
+    parsed = sum(app.chatbot_profile(message.lower()) == expected_profile(profile) for message, profile in messages)
+    print(f"profile accuracy: {parsed}/{len(messages)} messages")
+    
+    # "only <state>" must keep exactly the earlier matches that list that state
+    catalog = app.current_catalog()
+    states_by_id = {s["id"]: s["states"] for s in catalog.scholarships}
+    states = sorted({state for listed in states_by_id.values() for state in listed} & set(app.STATE_KEYWORDS))
+    narrowed = checked = 0
+    for i, (message, _) in enumerate(messages[:500]):
+        user_id = f"narrow-{i}"
+        chatbot(message, user_id)
+        before = app.CONVERSATIONS.get(user_id).get("matches")
+        if not before:
+            continue
+        state = rng.choice(states)
+        chatbot(f"only {state}", user_id)
+        after = app.CONVERSATIONS.get(user_id)["matches"]
+        expected = [pair for pair in before if state in states_by_id[pair[0]]]
+        narrowed += after == expected or (not expected and after == before)
+        checked += 1
+    print(f"only-state narrowing: {narrowed}/{checked} follow-ups")
+    
+    meta = dict(environment(), seed=args.seed, requests=args.requests)
+    if args.save:
+        save_baseline(args.save, results, meta)
+    if args.compare and compare_baseline(args.compare, results, args.threshold):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
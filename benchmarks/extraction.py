@@ -0,0 +1,129 @@
+"""
+Benchmarks for field extraction from OCR text.
+
+Times the single-pass FieldExtractor behind extract_data against the regex
+cascade it replaced, on seeded synthetic marksheet texts, and reports how
+often each field comes out right.
+"""
+
+import argparse
+import logging
+import re
+import sys
+
+import app
+from benchmarks.harness import measure, environment, print_results, save_baseline, compare_baseline
+from benchmarks.synthetic import generate_document_texts
+
+def legacy_extract_data(text):
+    """extract_data as it was before the single-pass extractor"""
+    data = {
+        "percentage": None,
+        "income": None,
+        "category": None,
+        "name": None,
+        "stream": None,
+        "state": None
+    }
+    
+    name_patterns = [
+        r'name[:\s]+([A-Za-z\s]+?)(?:\n|percentage|marks)',
+        r'student[:\s]+([A-Za-z\s]+?)(?:\n)',
+        r'naam[:\s]+([A-Za-z\s]+?)(?:\n)'
+    ]
+    for pattern in name_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            data["name"] = match.group(1).strip()
+            break
+    
+    percentage_patterns = [
+        r'(\d+\.?\d*)\s*%',
+        r'percentage[:\s]+(\d+\.?\d*)',
+        r'marks[:\s]+(\d+\.?\d*)',
+        r'cgpa[:\s]+(\d+\.?\d*)',
+    ]
+    for pattern in percentage_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            value = float(match.group(1))
+            if value <= 10:
+                data["percentage"] = round(value * 9.5, 2)
+            else:
+                data["percentage"] = value
+            break
+    
+    income_patterns = [
+        r'income[:\s]+₹?\s*(\d+)',
+        r'annual\s+income[:\s]+₹?\s*(\d+)',
+        r'₹\s*(\d{5,7})',
+        r'(\d{5,7})\s*/-'
+    ]
+    for pattern in income_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            data["income"] = int(match.group(1))
+            break
+    
+    text_lower = text.lower()
+    for table, field in ((app.CATEGORY_KEYWORDS, "category"), (app.STREAM_KEYWORDS, "stream"), (app.STATE_KEYWORDS, "state")):
+        for value, keywords in table.items():
+            if any(keyword in text_lower for keyword in keywords):
+                data[field] = value
+                break
+    
+    return data
+
+def expected_fields(text, profile):
+    """What a correct extractor returns for a generated document"""
+    cgpa = re.search(r"CGPA: ([\d.]+)", text)
+    return {
+        "name": profile["name"],
+        "percentage": round(float(cgpa.group(1)) * 9.5, 2) if cgpa else profile["percentage"],
+        "income": profile["income"],
+        "category": profile["category"] if "Category:" in text else None,
+        "stream": profile["stream"] if profile["stream"] in app.STREAM_KEYWORDS else None,
+        "state": profile["state"] if profile["state"] in app.STATE_KEYWORDS else None
+    }
+
+def accuracy(extract, documents):
+    """Share of documents each field is extracted correctly from"""
+    correct = {field: 0 for field in app.EXTRACTED_FIELDS}
+    for text, profile in documents:
+        data = extract(text)
+        for field, value in expected_fields(text, profile).items():
+            correct[field] += data[field] == value
+    return {field: round(hits / len(documents), 3) for field, hits in correct.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=2000, help="synthetic documents to extract from")
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare results with a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="p50 slowdown counted as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+    
+    logging.getLogger("app").setLevel(logging.WARNING)
+    documents = generate_document_texts(args.documents, args.seed)
+    texts = [text for text, _ in documents]
+    extractors = {"extract_legacy": legacy_extract_data, "extract_single_pass": app.extract_data}
+    
+    results = {name: measure(extract, texts) for name, extract in extractors.items()}
+    print_results(results)
+    
+    print(f"\n{'accuracy':<32} " + " ".join(f"{field:>10}" for field in app.EXTRACTED_FIELDS))
+    for name, extract in extractors.items():
+        scores = accuracy(extract, documents)
+        print(f"{name:<32} " + " ".join(f"{scores[field]:>10}" for field in app.EXTRACTED_FIELDS))
+    
+    meta = dict(environment(), seed=args.seed, documents=args.documents)
+    if args.save:
+        save_baseline(args.save, results, meta)
+    if args.compare and compare_baseline(args.compare, results, args.threshold):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
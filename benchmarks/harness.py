@@ -0,0 +1,83 @@
+"""
+Timing, reporting and baseline comparison shared by the benchmark scripts
+"""
+
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+def measure(call, inputs, warmup=10):
+    """Time call(x) for every input; returns throughput and latency percentiles"""
+    for x in inputs[:warmup]:
+        call(x)
+    
+    latencies = np.empty(len(inputs))
+    started = time.perf_counter()
+    for i, x in enumerate(inputs):
+        t0 = time.perf_counter()
+        call(x)
+        latencies[i] = time.perf_counter() - t0
+    elapsed = time.perf_counter() - started
+    
+    return {
+        "requests": len(inputs),
+        "throughput_rps": round(len(inputs) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3)
+    }
+
+def environment():
+    """Metadata recorded alongside every baseline"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine()
+    }
+
+def print_results(results):
+    print(f"{'benchmark':<32} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<32} {r['throughput_rps']:>10} {r['p50_ms']:>10} {r['p99_ms']:>10}")
+
+def save_baseline(path, results, meta):
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\nBaseline saved to {path}")
+
+def compare_baseline(path, results, threshold):
+    """Print deltas against a saved baseline; returns names that regressed"""
+    with open(path) as f:
+        baseline = json.load(f)
+    
+    print(f"\nCompared with {path} (commit {baseline['meta'].get('commit')}):")
+    print(f"{'benchmark':<32} {'p50 Δ':>10} {'p99 Δ':>10} {'req/s Δ':>10}")
+    
+    regressions = []
+    for name, r in results.items():
+        base = baseline["results"].get(name)
+        if not base:
+            print(f"{name:<32} {'(new)':>10}")
+            continue
+        
+        p50 = r["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        p99 = r["p99_ms"] / base["p99_ms"] - 1 if base["p99_ms"] else 0.0
+        rps = r["throughput_rps"] / base["throughput_rps"] - 1 if base["throughput_rps"] else 0.0
+        flag = "  REGRESSION" if p50 > threshold else ""
+        print(f"{name:<32} {p50:>+10.1%} {p99:>+10.1%} {rps:>+10.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    
+    return regressions
@@ -0,0 +1,97 @@
+"""
+Benchmarks for matching, filtered listing, search and statistics.
+
+Every scenario runs in-process through the Flask test client against a
+seeded synthetic catalog swapped in as the current catalog snapshot.
+"""
+
+import argparse
+import logging
+import sys
+
+import app
+from benchmarks.harness import measure, environment, print_results, save_baseline, compare_baseline
+from benchmarks.synthetic import generate_catalog, generate_profiles, generate_listing_queries, generate_search_queries
+
+def install_catalog(size, seed):
+    """Build a synthetic snapshot and make it the app's current catalog"""
+    scholarships = generate_catalog(size, seed)
+    snapshot = app.CatalogSnapshot(scholarships, f"synthetic-{size}-{seed}")
+    app.CATALOG_RELOADER.catalog = snapshot
+    app.MATCH_CACHE.clear()
+    return snapshot
+
+def run_suite(size, requests, seed, cold, explain):
+    client = app.app.test_client()
+    snapshot = install_catalog(size, seed)
+    profiles = generate_profiles(requests, seed)
+    queries = generate_listing_queries(requests, seed)
+    searches = generate_search_queries(requests, seed)
+    results = {}
+    
+    def manual(profile):
+        if cold:
+            app.MATCH_CACHE.clear()
+        response = client.post("/manual", json=dict(profile, limit=20, explain=explain))
+        assert response.status_code == 200, response.get_data(as_text=True)
+    
+    def listing(query):
+        response = client.get("/scholarships", query_string=query)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    
+    def search(query):
+        response = client.get("/scholarships/search", query_string={"q": query, "limit": 10})
+        assert response.status_code == 200, response.get_data(as_text=True)
+    
+    def catalog_stats(_):
+        response = client.get("/stats/catalog")
+        assert response.status_code == 200, response.get_data(as_text=True)
+    
+    results[f"match_single@{size}"] = measure(manual, profiles)
+    results[f"listing_filtered@{size}"] = measure(listing, queries)
+    results[f"search_request@{size}"] = measure(search, searches)
+    results[f"search_topk@{size}"] = measure(lambda query: snapshot.search.search(query, 10), searches)
+    results[f"stats_catalog@{size}"] = measure(catalog_stats, queries)
+    
+    # Full-list statistics over the matches of a sample of profiles
+    sample = [app.match_scholarships(p, explain="off")[0] for p in profiles[:50]]
+    results[f"stats_matches@{size}"] = measure(app.calculate_statistics, sample * max(1, requests // 50), warmup=0)
+    
+    del snapshot
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="synthetic catalog sizes (up to 1000000)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cold", action="store_true", help="clear the match cache before every match request")
+    parser.add_argument("--explain", choices=["full", "codes", "off"], default="full",
+                        help="explain mode sent with match requests")
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare results with a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="p50 slowdown counted as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+    
+    logging.getLogger("app").setLevel(logging.WARNING)
+    original = app.CATALOG_RELOADER.catalog
+    
+    results = {}
+    try:
+        for size in args.sizes:
+            results.update(run_suite(size, args.requests, args.seed, args.cold, args.explain))
+    finally:
+        app.CATALOG_RELOADER.catalog = original
+    
+    print_results(results)
+    meta = dict(environment(), seed=args.seed, requests=args.requests, cold=args.cold, explain=args.explain)
+    if args.save:
+        save_baseline(args.save, results, meta)
+    if args.compare and compare_baseline(args.compare, results, args.threshold):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Benchmarks for the OCR backends on rendered synthetic marksheets.
+
+Every backend reads the same seeded pages through ocr_page, then a burst of
+single-line crops that isolates the fixed cost of each engine call. Backends
+that are not installed here are skipped.
+"""
+
+import argparse
+import logging
+import sys
+
+import app
+from benchmarks.harness import measure, environment, print_results, save_baseline, compare_baseline
+from benchmarks.synthetic import generate_page_images
+
+def line_crops(pages):
+    """The first text line of every page, as a small image"""
+    return [page.crop((230, 400, 2000, 480)) for page in pages]
+
+def run_backend(name, pages, lines):
+    try:
+        backend = app.create_ocr_backend(name)
+    except Exception as e:
+        print(f"Skipping {name}: {e}")
+        return {}
+    
+    return {
+        f"ocr_page[{name}]": measure(lambda page: app.ocr_page(page, backend=backend), pages, warmup=1),
+        f"ocr_line[{name}]": measure(lambda line: backend.image_to_string(line, psm=7), lines, warmup=2)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10, help="synthetic pages per backend")
+    parser.add_argument("--backends", nargs="+", default=list(app.OCR_BACKENDS), choices=list(app.OCR_BACKENDS))
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare results with a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="p50 slowdown counted as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+    
+    logging.getLogger("app").setLevel(logging.WARNING)
+    pages = generate_page_images(args.pages, args.seed)
+    lines = line_crops(pages) * 3
+    
+    results = {}
+    for name in args.backends:
+        results.update(run_backend(name, pages, lines))
+    
+    print_results(results)
+    meta = dict(environment(), seed=args.seed, pages=args.pages, layout=app.OCR_LAYOUT)
+    if args.save:
+        save_baseline(args.save, results, meta)
+    if args.compare and compare_baseline(args.compare, results, args.threshold):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Parity check of the eligibility engine against the loop it replaced.
+
+Runs every profile of a grid through match_scholarships and the engine's
+statistics, and through a copy of the original per-scholarship loop and
+calculate_statistics, and reports every profile where the matched entries,
+the rejections or the statistics differ. The grid sits on and around the
+thresholds of the shipped catalog; --size checks a seeded synthetic catalog
+instead. Exits with status 1 on any mismatch.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import random
+import sys
+import time
+from datetime import datetime
+
+import app
+from benchmarks.synthetic import generate_catalog
+
+# Profile values on, just below and just above the catalog's limits, plus
+# missing, empty and unknown ones
+PERCENTAGES = [None, 0, 39.5, 40, 50, 59.9, 60, 75, 85, 99.5]
+INCOMES = [None, 0, 1, 100000, 250000, 250001, 450000, 800000, 999999999, 10 ** 10]
+CATEGORIES = [None, "", "General", "OBC", "SC", "ST", "Minority", "EWS"]
+STATES = [None, "West Bengal", "Assam", "Bihar", "Kerala"]
+STREAMS = [None, "Science", "Engineering", "Arts", "Medical", "ITI"]
+
+def profile_grid():
+    """Every combination of the grid values as a profile"""
+    return [
+        {"percentage": percentage, "income": income, "category": category, "state": state, "stream": stream}
+        for percentage, income, category, state, stream in itertools.product(
+            PERCENTAGES, INCOMES, CATEGORIES, STATES, STREAMS)
+    ]
+
+def reference_match_scholarships(student_data, scholarships):
+    """match_scholarships as it was before the eligibility engine"""
+    matched = []
+    rejected = []
+    
+    percentage = student_data.get("percentage")
+    income = student_data.get("income")
+    category = student_data.get("category")
+    stream = student_data.get("stream")
+    state = student_data.get("state")
+    
+    for scholarship in scholarships:
+        eligibility_score = 0
+        reasons = []
+        max_score = 0
+        
+        if percentage:
+            max_score += 1
+            if percentage >= scholarship["min_percentage"]:
+                eligibility_score += 1
+                reasons.append(f"✓ Marks: {percentage:.1f}% (Required: {scholarship['min_percentage']}%+)")
+            else:
+                rejected.append({
+                    "scholarship": scholarship["name"],
+                    "reason": f"Marks too low: {percentage:.1f}% < {scholarship['min_percentage']}% required"
+                })
+                continue
+        
+        if income:
+            max_score += 1
+            if income <= scholarship["max_income"]:
+                eligibility_score += 1
+                reasons.append(f"✓ Income: ₹{income:,} (Limit: ₹{scholarship['max_income']:,})")
+            else:
+                rejected.append({
+                    "scholarship": scholarship["name"],
+                    "reason": f"Income too high: ₹{income:,} > ₹{scholarship['max_income']:,}"
+                })
+                continue
+        
+        if category:
+            max_score += 1
+            if category in scholarship["category"]:
+                eligibility_score += 1
+                reasons.append(f"✓ Category: {category} eligible")
+            else:
+                rejected.append({
+                    "scholarship": scholarship["name"],
+                    "reason": f"Category mismatch: {category} not in {', '.join(scholarship['category'])}"
+                })
+                continue
+        
+        eligible_states = scholarship.get("states", ["All States"])
+        if "All States" not in eligible_states:
+            if state and state not in eligible_states:
+                rejected.append({
+                    "scholarship": scholarship["name"],
+                    "reason": f"State not eligible: {state} (Only for: {', '.join(eligible_states)})"
+                })
+                continue
+            elif state and state in eligible_states:
+                reasons.append(f"✓ State: {state} eligible")
+        
+        eligible_streams = scholarship.get("eligible_streams", ["All"])
+        if "All" not in eligible_streams:
+            if stream and stream not in eligible_streams:
+                rejected.append({
+                    "scholarship": scholarship["name"],
+                    "reason": f"Stream not eligible: {stream} (Only: {', '.join(eligible_streams)})"
+                })
+                continue
+            elif stream and stream in eligible_streams:
+                reasons.append(f"✓ Stream: {stream} eligible")
+        
+        match_percentage = (eligibility_score / max_score * 100) if max_score > 0 else 0
+        
+        if eligibility_score >= max_score * 0.6:
+            scholarship_copy = scholarship.copy()
+            scholarship_copy["eligibility_score"] = eligibility_score
+            scholarship_copy["match_percentage"] = round(match_percentage, 1)
+            scholarship_copy["match_reasons"] = reasons
+            
+            try:
+                deadline_date = datetime.strptime(scholarship["deadline"], "%d-%m-%Y")
+                days_left = (deadline_date - datetime.now()).days
+                scholarship_copy["days_until_deadline"] = days_left
+                
+                if days_left < 0:
+                    scholarship_copy["urgency"] = "expired"
+                    scholarship_copy["status"] = "Deadline Passed"
+                elif days_left < 7:
+                    scholarship_copy["urgency"] = "critical"
+                    scholarship_copy["status"] = "Apply Now!"
+                elif days_left < 30:
+                    scholarship_copy["urgency"] = "high"
+                    scholarship_copy["status"] = "Closing Soon"
+                elif days_left < 90:
+                    scholarship_copy["urgency"] = "medium"
+                    scholarship_copy["status"] = "Open"
+                else:
+                    scholarship_copy["urgency"] = "low"
+                    scholarship_copy["status"] = "Open"
+            except (KeyError, TypeError, ValueError):
+                scholarship_copy["days_until_deadline"] = None
+                scholarship_copy["urgency"] = "unknown"
+                scholarship_copy["status"] = "Check Website"
+            
+            matched.append(scholarship_copy)
+    
+    matched.sort(key=lambda x: (
+        -x.get("match_percentage", 0),
+        -x.get("amount", 0),
+        0 if x.get("urgency") == "critical" else 1 if x.get("urgency") == "high" else 2
+    ))
+    
+    return matched, rejected
+
+def reference_calculate_statistics(matched_scholarships):
+    """calculate_statistics as it was before the eligibility engine"""
+    if not matched_scholarships:
+        return {
+            "total_amount": 0,
+            "avg_amount": 0,
+            "highest_scholarship": None,
+            "urgent_count": 0,
+            "total_scholarships": 0,
+            "wb_scholarships": 0,
+            "national_scholarships": 0
+        }
+    
+    total_amount = sum(s["amount"] for s in matched_scholarships)
+    highest = max(matched_scholarships, key=lambda x: x["amount"])
+    wb_count = sum(1 for s in matched_scholarships if "West Bengal" in s.get("states", []))
+    
+    return {
+        "total_amount": total_amount,
+        "avg_amount": total_amount // len(matched_scholarships),
+        "highest_scholarship": highest["name"],
+        "highest_amount": highest["amount"],
+        "urgent_count": sum(1 for s in matched_scholarships if s.get("urgency") in ["critical", "high"]),
+        "total_scholarships": len(matched_scholarships),
+        "wb_scholarships": wb_count,
+        "national_scholarships": len(matched_scholarships) - wb_count
+    }
+
+def canonical(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+def compare(profile, scholarships):
+    """Names of the parts of the engine's answer for a profile that differ from the reference"""
+    expected_matched, expected_rejected = reference_match_scholarships(profile, scholarships)
+    result = app.match_profile(profile)
+    differences = []
+    if canonical(result["matched"]) != canonical(expected_matched):
+        differences.append("matched")
+    if canonical(result["rejected"]) != canonical(expected_rejected):
+        differences.append("rejected")
+    if canonical(result["statistics"]) != canonical(reference_calculate_statistics(expected_matched)):
+        differences.append("statistics")
+    return differences
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=0,
+                        help="check a synthetic catalog of this size instead of the shipped one")
+    parser.add_argument("--profiles", type=int, default=0,
+                        help="check a seeded sample of this many grid profiles (default: all)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    
+    logging.getLogger("app").setLevel(logging.WARNING)
+    original = app.CATALOG_RELOADER.catalog
+    if args.size:
+        app.CATALOG_RELOADER.catalog = app.CatalogSnapshot(generate_catalog(args.size, args.seed),
+                                                           f"synthetic-{args.size}-{args.seed}")
+        app.MATCH_CACHE.clear()
+    scholarships = app.CATALOG_RELOADER.catalog.scholarships
+    
+    profiles = profile_grid()
+    if args.profiles:
+        profiles = random.Random(args.seed).sample(profiles, min(args.profiles, len(profiles)))
+    
+    mismatches = []
+    started = time.perf_counter()
+    try:
+        for profile in profiles:
+            differences = compare(profile, scholarships)
+            if differences:
+                mismatches.append((profile, differences))
+    finally:
+        app.CATALOG_RELOADER.catalog = original
+    elapsed = time.perf_counter() - started
+    
+    for profile, differences in mismatches[:20]:
+        print(f"MISMATCH {', '.join(differences)}: {canonical(profile)}")
+    print(f"{len(profiles)} profiles against {len(scholarships)} scholarships: "
+          f"{len(mismatches)} mismatches ({elapsed:.1f}s)")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
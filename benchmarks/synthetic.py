@@ -0,0 +1,278 @@
+"""
+Seeded synthetic scholarship catalogs, student profiles and documents for benchmarks
+"""
+
+import random
+from datetime import date, timedelta
+
+import cv2
+import numpy as np
+from PIL import Image
+
+CATEGORIES = ["General", "OBC", "SC", "ST", "Minority"]
+CATEGORY_WEIGHTS = [0.30, 0.40, 0.17, 0.08, 0.05]
+
+STATES = [
+    "West Bengal", "Uttar Pradesh", "Maharashtra", "Bihar", "Tamil Nadu", "Karnataka",
+    "Gujarat", "Rajasthan", "Madhya Pradesh", "Andhra Pradesh", "Telangana", "Kerala",
+    "Odisha", "Jharkhand", "Assam", "Punjab", "Haryana", "Chhattisgarh", "Delhi",
+    "Uttarakhand", "Himachal Pradesh", "Tripura", "Meghalaya", "Manipur", "Nagaland",
+    "Goa", "Arunachal Pradesh", "Mizoram", "Sikkim",
+]
+# Population-like skew, with West Bengal over-represented as in the real catalog
+STATE_WEIGHTS = [12, 16, 9, 8, 6, 5, 5, 5, 6, 4, 3, 3, 3, 3, 3, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+NE_STATES = ["Arunachal Pradesh", "Assam", "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Sikkim", "Tripura"]
+
+STREAMS = [
+    "Science", "Commerce", "Arts", "Engineering", "Medical", "Pharmacy", "Architecture",
+    "Management", "Law", "Agriculture", "Polytechnic", "ITI",
+]
+
+MIN_PERCENTAGES = [40, 45, 50, 55, 60, 65, 70, 75, 80, 85, 90]
+MIN_PERCENTAGE_WEIGHTS = [4, 6, 20, 10, 18, 8, 6, 8, 10, 6, 4]
+MAX_INCOMES = [100000, 150000, 200000, 250000, 300000, 400000, 450000, 500000, 600000, 800000, 999999999]
+MAX_INCOME_WEIGHTS = [4, 5, 8, 20, 6, 6, 4, 6, 10, 8, 8]
+
+GROUPS = ["girls", "minority students", "SC/ST students", "differently-abled students", "first-generation learners",
+          "rural students", "children of farmers", "wards of ex-servicemen"]
+COURSES = ["engineering", "medical", "pharmacy", "nursing", "law", "agriculture", "polytechnic diploma", "B.Sc",
+           "commerce", "arts", "Class 9-12"]
+DOCUMENTS = ["Aadhaar", "Marksheet", "Income Certificate", "Caste Certificate", "Bank Passbook", "Admission Proof",
+             "Disability Certificate", "Domicile Certificate"]
+
+def generate_catalog(size, seed=42):
+    """Catalog of `size` scholarships shaped like the real one"""
+    rng = random.Random(seed)
+    # Text fields draw from their own generator so the other fields stay as they were
+    text_rng = random.Random(f"{seed}-text")
+    today = date.today()
+    scholarships = []
+    
+    for i in range(size):
+        roll = rng.random()
+        if roll < 0.55:
+            states = ["All States"]
+        elif roll < 0.60:
+            states = list(NE_STATES)
+        else:
+            states = [rng.choices(STATES, STATE_WEIGHTS)[0]]
+        
+        if rng.random() < 0.35:
+            category = [rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0]]
+        else:
+            category = ["General", "OBC", "SC", "ST"]
+        
+        if rng.random() < 0.7:
+            streams = ["All"]
+        else:
+            streams = rng.sample(STREAMS, rng.randint(1, 4))
+        
+        amount = int(round(rng.lognormvariate(9.4, 1.0), -2)) or 500
+        deadline = today + timedelta(days=rng.randint(-120, 365))
+        group, course = text_rng.choice(GROUPS), text_rng.choice(COURSES)
+        
+        scholarships.append({
+            "id": i + 1,
+            "name": f"Synthetic Scholarship {i + 1}",
+            "name_hi": f"सिंथेटिक छात्रवृत्ति {i + 1}",
+            "min_percentage": rng.choices(MIN_PERCENTAGES, MIN_PERCENTAGE_WEIGHTS)[0],
+            "max_income": rng.choices(MAX_INCOMES, MAX_INCOME_WEIGHTS)[0],
+            "category": category,
+            "amount": amount,
+            "deadline": deadline.strftime("%d-%m-%Y"),
+            "description": f"Synthetic scholarship for {group} pursuing {course}.",
+            "description_hi": "बेंचमार्क के लिए सिंथेटिक छात्रवृत्ति।",
+            "apply_url": "https://scholarships.gov.in",
+            "eligibility": [group.capitalize(), course, f"Income < ₹{text_rng.randint(1, 8)} lakh"],
+            "documents": text_rng.sample(DOCUMENTS, text_rng.randint(2, 5)),
+            "eligible_streams": streams,
+            "states": states
+        })
+    
+    return scholarships
+
+def generate_profiles(count, seed=7):
+    """`count` student profiles resembling manual-entry traffic"""
+    rng = random.Random(seed)
+    profiles = []
+    
+    for _ in range(count):
+        profiles.append({
+            "name": "Benchmark Student",
+            "percentage": round(min(99.0, max(33.0, rng.gauss(68, 12))), 1),
+            "income": int(round(rng.lognormvariate(12.4, 0.6), -3)),
+            "category": rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0],
+            "stream": rng.choice(STREAMS) if rng.random() < 0.8 else None,
+            "state": rng.choices(STATES, STATE_WEIGHTS)[0] if rng.random() < 0.9 else None
+        })
+    
+    return profiles
+
+def generate_listing_queries(count, seed=11):
+    """Random /scholarships filter combinations"""
+    rng = random.Random(seed)
+    queries = []
+    
+    for _ in range(count):
+        query = {"limit": 50}
+        if rng.random() < 0.5:
+            query["state"] = rng.choices(STATES, STATE_WEIGHTS)[0]
+        if rng.random() < 0.5:
+            query["category"] = rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0]
+        if rng.random() < 0.3:
+            query["stream"] = rng.choice(STREAMS)
+        if rng.random() < 0.3:
+            query["min_amount"] = rng.choice([5000, 10000, 25000])
+        if rng.random() < 0.2:
+            query["max_amount"] = rng.choice([50000, 100000])
+        queries.append(query)
+    
+    return queries
+
+def generate_search_queries(count, seed=23):
+    """Random free-text scholarship searches such as: pharmacy girls in Assam"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        parts = [rng.choice(COURSES)]
+        if rng.random() < 0.6:
+            parts.append(rng.choice(GROUPS))
+        if rng.random() < 0.4:
+            parts.append(f"in {rng.choices(STATES, STATE_WEIGHTS)[0]}")
+        rng.shuffle(parts)
+        queries.append(" ".join(parts))
+    return queries
+
+SUBJECTS = ["English", "Bengali", "Mathematics", "Physics", "Chemistry", "Biology", "Accountancy", "History"]
+
+def marksheet_lines(profile, rng):
+    """Text lines of a marksheet for a profile, in the layouts seen on real uploads"""
+    lines = [
+        "WEST BENGAL COUNCIL OF HIGHER SECONDARY EDUCATION" if profile["state"] == "West Bengal"
+        else "BOARD OF SECONDARY EDUCATION",
+        f"Name: {profile['name']}",
+        f"Roll No: {rng.randint(100000, 999999)}",
+        f"Stream: {profile['stream'] or 'General Studies'}",
+    ]
+    # Some certificates carry no category line, leaving only abbreviations like B.Sc or St.
+    if rng.random() < 0.8:
+        lines.append(f"Category: {profile['category']}")
+    if profile["state"]:
+        lines.append(f"State: {profile['state']}")
+    lines.append(rng.choice([f"Percentage: {profile['percentage']} %",
+                             f"Total Marks: {profile['percentage']}%",
+                             f"CGPA: {round(profile['percentage'] / 9.5, 1)}"]))
+    lines.append(rng.choice([f"Annual Income: {profile['income']}",
+                             f"Family income Rs. {profile['income']}/-"]))
+    return lines
+
+DISTRACTORS = [
+    "St. Xavier's School", "Higher Secondary Examination 2024", "Controller of Examinations",
+    "This is to certify that the student named below has passed", "Signature of the Head of the Institution",
+    "Date of issue: 14-05-2024", "School Code: 10423", "Not valid without the seal of the school",
+    "Course: B.Sc (Honours)", "Eligible for M.Sc. admission", "St Paul's Higher Secondary School",
+]
+
+def generate_document_texts(count, seed=17):
+    """`count` OCR-like marksheet texts with the profile each was generated from"""
+    rng = random.Random(seed)
+    documents = []
+    
+    for profile in generate_profiles(count, seed):
+        lines = marksheet_lines(profile, rng)
+        for distractor in rng.sample(DISTRACTORS, 4):
+            lines.insert(rng.randint(1, len(lines)), distractor)
+        documents.append(("\n".join(lines), profile))
+    
+    return documents
+
+# Chatbot phrasings per intent; "help" ones match no intent
+CHAT_QUERIES = {
+    "west_bengal": ["Show West Bengal scholarships", "I am from Kolkata", "schemes in WB?"],
+    "kanyashree": ["How to apply for Kanyashree?", "What is K2?", "kanyashree documents"],
+    "scholarships": ["What scholarships are there", "how much money can I get", "scholarship amount"],
+    "eligibility": ["Am I eligible?", "can i get a scholarship with 60%", "do I qualify"],
+    "apply": ["How to apply", "application process please", "where do I register"],
+    "documents": ["What documents do I need", "documents for West Bengal scholarships", "income certificate"],
+    "deadlines": ["Check deadlines", "when is the last date", "deadline for NSP scholarship"],
+    "help": ["hello", "hi there", "I was wondering when I should start", "showbiz"],
+}
+
+# Follow-ups on the results of an earlier profile message
+CHAT_FOLLOW_UPS = ["what documents do I need for those?", "which has the highest amount?", "deadlines for them",
+                   "only West Bengal"]
+
+def generate_chat_queries(count, seed=19):
+    """Random chatbot queries as (query, expected intent) pairs"""
+    rng = random.Random(seed)
+    intents = list(CHAT_QUERIES)
+    queries = []
+    for _ in range(count):
+        intent = rng.choice(intents)
+        queries.append((rng.choice(CHAT_QUERIES[intent]), intent))
+    return queries
+
+def indian_grouping(amount):
+    """250000 written the Indian way, as 2,50,000"""
+    digits = str(amount)
+    head, tail = digits[:-3], digits[-3:]
+    groups = [head[max(0, i - 2):i] for i in range(len(head), 0, -2)][::-1]
+    return ",".join(groups + [tail]) if head else tail
+
+def generate_profile_messages(count, seed=29):
+    """Chatbot messages stating a student profile, as (message, profile) pairs.
+    
+    Incomes are written as lakhs, Indian-grouped rupees or plain numbers, and
+    the returned profile holds the values exactly as written.
+    """
+    rng = random.Random(seed)
+    messages = []
+    
+    for profile in generate_profiles(count, seed):
+        profile = dict(profile, percentage=round(profile["percentage"]))
+        form = rng.randrange(3)
+        if form == 0:
+            lakhs = max(0.5, round(profile["income"] / 100000, 1))
+            profile["income"] = int(round(lakhs * 100000))
+            income = f"{lakhs:g} lakh"
+        elif form == 1:
+            income = "₹" + indian_grouping(profile["income"])
+        else:
+            income = f"Rs. {profile['income']}"
+        
+        parts = [rng.choice([f"I have {profile['percentage']}% marks", f"I scored {profile['percentage']} percent"]),
+                 rng.choice([f"family income is {income}", f"income {income}"]),
+                 f"{profile['category']} category"]
+        if profile["stream"]:
+            parts.append(f"studying {profile['stream']}")
+        if profile["state"]:
+            parts.append(f"from {profile['state']}")
+        messages.append((", ".join(parts), profile))
+    
+    return messages
+
+def generate_page_images(count, seed=13, size=(2480, 3508)):
+    """`count` rendered A4 marksheet pages at 300 dpi, with a crest and a ruled marks table"""
+    rng = random.Random(seed)
+    width, height = size
+    pages = []
+    
+    for profile in generate_profiles(count, seed):
+        page = np.full((height, width), 235, dtype=np.uint8)
+        cv2.circle(page, (width - 350, 250), 140, 40, -1)
+        for i, line in enumerate(marksheet_lines(profile, rng)):
+            cv2.putText(page, line, (250, 450 + i * 110), cv2.FONT_HERSHEY_SIMPLEX, 1.6, 20, 3)
+        
+        top = 1500
+        subjects = rng.sample(SUBJECTS, 5)
+        for r in range(len(subjects) + 1):
+            cv2.line(page, (250, top + r * 110), (1650, top + r * 110), 20, 4)
+        for c in range(3):
+            cv2.line(page, (250 + c * 700, top), (250 + c * 700, top + len(subjects) * 110), 20, 4)
+        for r, subject in enumerate(subjects):
+            cv2.putText(page, subject, (280, top + r * 110 + 75), cv2.FONT_HERSHEY_SIMPLEX, 1.6, 20, 3)
+            cv2.putText(page, str(rng.randint(35, 99)), (980, top + r * 110 + 75), cv2.FONT_HERSHEY_SIMPLEX, 1.6, 20, 3)
+        
+        pages.append(Image.fromarray(page))
+    
+    return pages